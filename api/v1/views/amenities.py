@@ -104,7 +104,7 @@ def update_amenity(amenity_id):
             abort(400, 'Not a JSON')
 
         amenity_obj.name = data.get('name', amenity_obj.name)
-        storage.save()
+        amenity_obj.save()
 
         return jsonify(amenity_obj.to_dict()), 200
     except ValueError:
@@ -24,8 +24,8 @@ def list_cities_of_state(state_id):
     state_obj = storage.get("State", state_id)
     if state_obj is None:
         abort(404)
-    list_cities = [city.to_dict() for city in storage.all("City").values()
-                   if state_id == city.state_id]
+    list_cities = [city.to_dict()
+                   for city in storage.filter("City", state_id=state_id)]
     return jsonify(list_cities)
 
 
@@ -120,7 +120,7 @@ def update_city(city_id):
             abort(400, 'Not a JSON')
 
         city_obj.name = data.get('name', city_obj.name)
-        storage.save()
+        city_obj.save()
 
         return jsonify(city_obj.to_dict()), 200
     except ValueError:
@@ -4,7 +4,7 @@ Module defining API status route.
 """
 
 from api.v1.views import app_views
-from flask import jsonify
+from flask import abort, jsonify
 from models import storage
 from models.user import User
 from models.place import Place
@@ -36,3 +36,15 @@ def count():
     for cls in classes:
         count_dict[cls] = storage.count(classes[cls])
     return jsonify(count_dict)
+
+
+@app_views.route('/admin/pool')
+def pool_stats():
+    """
+    Retrieves the counts and timings of the database connection pool:
+    connections checked out, overflow, checkout wait histogram and
+    connect latency (404 in file storage, which has no pool)
+    """
+    if not hasattr(storage, "pool_stats"):
+        abort(404)
+    return jsonify(storage.pool_stats())
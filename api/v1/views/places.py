@@ -25,8 +25,8 @@ def list_places_of_city(city_id):
     if city_obj is None:
         abort(404)
 
-    list_places = [place.to_dict() for place in storage.all("Place").values()
-                   if city_id == place.city_id]
+    list_places = [place.to_dict()
+                   for place in storage.filter("Place", city_id=city_id)]
     return jsonify(list_places)
 
 
@@ -128,7 +128,7 @@ def update_place(place_id):
             if key in data:
                 setattr(place_obj, key, data[key])
 
-        storage.save()
+        place_obj.save()
         return jsonify(place_obj.to_dict()), 200
     except ValueError:
         abort(400, 'Invalid JSON')
@@ -4,14 +4,13 @@ Module containing views for Place Amenities objects.
 """
 from api.v1.views import app_views
 from flask import jsonify, abort, request
-from models import storage
+from models import storage, storage_t
 from models.place import Place
 from models.amenity import Amenity
 from datetime import datetime
 import uuid
-from os import getenv
 
-if getenv('HBNB_TYPE_STORAGE') == 'db':
+if storage_t == 'db':
     @app_views.route('/places/<place_id>/amenities')
     @app_views.route('/places/<place_id>/amenities/')
     def list_amenities_of_place(place_id):
@@ -24,15 +23,11 @@ if getenv('HBNB_TYPE_STORAGE') == 'db':
         Returns:
             JSON: A JSON representation of the list of Amenity objects.
         """
-        all_places = storage.all("Place").values()
-        place_obj = [obj.to_dict() for obj in all_places if obj.id == place_id]
-        if place_obj == []:
+        place_obj = storage.get("Place", place_id, expand="amenities")
+        if place_obj is None:
             abort(404)
-        list_amenities = []
-        for obj in all_places:
-            if obj.id == place_id:
-                for amenity in obj.amenities:
-                    list_amenities.append(amenity.to_dict())
+        list_amenities = [amenity.to_dict()
+                          for amenity in place_obj.amenities]
         return jsonify(list_amenities)
 
     @app_views.route('/places/<place_id>/amenities/<amenity_id>',
@@ -46,36 +41,28 @@ if getenv('HBNB_TYPE_STORAGE') == 'db':
             amenity_id (str): The ID of the amenity.
 
         Returns:
-            JSON: A JSON representation of the newly created
-            Amenity object with status code 200.
+            JSON: A JSON representation of the Amenity object with
+            status code 201, or 200 if it was already linked.
         """
-        all_places = storage.all("Place").values()
-        place_obj = [obj.to_dict() for obj in all_places if obj.id == place_id]
-        if place_obj == []:
+        place_obj = storage.get("Place", place_id)
+        if place_obj is None:
             abort(404)
 
-        all_amenities = storage.all("Amenity").values()
-        amenity_obj = [obj.to_dict() for obj in all_amenities
-                       if obj.id == amenity_id]
-        if amenity_obj == []:
+        amenity_obj = storage.get("Amenity", amenity_id)
+        if amenity_obj is None:
             abort(404)
 
-        amenities = []
-        for place in all_places:
-            if place.id == place_id:
-                for amenity in all_amenities:
-                    if amenity.id == amenity_id:
-                        place.amenities.append(amenity)
-                        storage.save()
-                        amenities.append(amenity.to_dict())
-                        return jsonify(amenities[0]), 200
-        return jsonify(amenities[0]), 201
+        if amenity_obj in place_obj.amenities:
+            return jsonify(amenity_obj.to_dict()), 200
+        place_obj.amenities.append(amenity_obj)
+        storage.save()
+        return jsonify(amenity_obj.to_dict()), 201
 
     @app_views.route('/places/<place_id>/amenities/<amenity_id>',
                      methods=['DELETE'])
     def delete_place_amenity(place_id, amenity_id):
         """
-        Deletes a Amenity object.
+        Unlinks a Amenity object from a Place.
 
         Args:
             place_id (str): The ID of the place.
@@ -84,26 +71,18 @@ if getenv('HBNB_TYPE_STORAGE') == 'db':
         Returns:
             JSON: An empty JSON response with status code 200.
         """
-        all_places = storage.all("Place").values()
-        place_obj = [obj.to_dict() for obj in all_places if obj.id == place_id]
-        if place_obj == []:
+        place_obj = storage.get("Place", place_id)
+        if place_obj is None:
             abort(404)
 
-        all_amenities = storage.all("Amenity").values()
-        amenity_obj = [obj.to_dict() for obj in all_amenities
-                       if obj.id == amenity_id]
-        if amenity_obj == []:
+        amenity_obj = storage.get("Amenity", amenity_id)
+        if amenity_obj is None:
             abort(404)
-        amenity_obj.remove(amenity_obj[0])
-
-        for obj in all_places:
-            if obj.id == place_id:
-                if obj.amenities == []:
-                    abort(404)
-                for amenity in obj.amenities:
-                    if amenity.id == amenity_id:
-                        storage.delete(amenity)
-                        storage.save()
+
+        if amenity_obj not in place_obj.amenities:
+            abort(404)
+        place_obj.amenities.remove(amenity_obj)
+        storage.save()
         return jsonify({}), 200
 else:
     @app_views.route('/places/<place_id>/amenities')
@@ -118,15 +97,11 @@ else:
         Returns:
             JSON: A JSON representation of the list of Amenity objects.
         """
-        all_places = storage.all("Place").values()
-        place_obj = [obj.to_dict() for obj in all_places if obj.id == place_id]
-        if place_obj == []:
+        place_obj = storage.get("Place", place_id)
+        if place_obj is None:
             abort(404)
-        list_amenities = []
-        for obj in all_places:
-            if obj.id == place_id:
-                for amenity in obj.amenities:
-                    list_amenities.append(amenity.to_dict())
+        list_amenities = [amenity.to_dict()
+                          for amenity in place_obj.amenities]
         return jsonify(list_amenities)
 
     @app_views.route('/places/<place_id>/amenities/<amenity_id>',
@@ -140,36 +115,29 @@ else:
             amenity_id (str): The ID of the amenity.
 
         Returns:
-            JSON: A JSON representation of the newly created
-            Amenity object with status code 200.
+            JSON: A JSON representation of the Amenity object with
+            status code 201, or 200 if it was already linked.
         """
-        all_places = storage.all("Place").values()
-        place_obj = [obj.to_dict() for obj in all_places if obj.id == place_id]
-        if place_obj == []:
+        place_obj = storage.get("Place", place_id)
+        if place_obj is None:
             abort(404)
 
-        all_amenities = storage.all("Amenity").values()
-        amenity_obj = [obj.to_dict() for obj in all_amenities
-                       if obj.id == amenity_id]
-        if amenity_obj == []:
+        amenity_obj = storage.get("Amenity", amenity_id)
+        if amenity_obj is None:
             abort(404)
 
-        amenities = []
-        for place in all_places:
-            if place.id == place_id:
-                for amenity in all_amenities:
-                    if amenity.id == amenity_id:
-                        place.amenities.append(amenity)
-                        storage.save()
-                        amenities.append(amenity.to_dict())
-                        return jsonify(amenities[0]), 200
-        return jsonify(amenities[0]), 201
+        if amenity_id in place_obj.amenity_ids:
+            return jsonify(amenity_obj.to_dict()), 200
+        # a new list, so that the change is recorded for the save
+        place_obj.amenity_ids = place_obj.amenity_ids + [amenity_id]
+        storage.save()
+        return jsonify(amenity_obj.to_dict()), 201
 
     @app_views.route('/places/<place_id>/amenities/<amenity_id>',
                      methods=['DELETE'])
     def delete_place_amenity(place_id, amenity_id):
         """
-        Deletes a Amenity object.
+        Unlinks a Amenity object from a Place.
 
         Args:
             place_id (str): The ID of the place.
@@ -178,26 +146,19 @@ else:
         Returns:
             JSON: An empty JSON response with status code 200.
         """
-        all_places = storage.all("Place").values()
-        place_obj = [obj.to_dict() for obj in all_places if obj.id == place_id]
-        if place_obj == []:
+        place_obj = storage.get("Place", place_id)
+        if place_obj is None:
+            abort(404)
+
+        amenity_obj = storage.get("Amenity", amenity_id)
+        if amenity_obj is None:
             abort(404)
 
-        all_amenities = storage.all("Amenity").values()
-        amenity_obj = [obj.to_dict() for obj in all_amenities
-                       if obj.id == amenity_id]
-        if amenity_obj == []:
+        if amenity_id not in place_obj.amenity_ids:
             abort(404)
-        amenity_obj.remove(amenity_obj[0])
-
-        for obj in all_places:
-            if obj.id == place_id:
-                if obj.amenities == []:
-                    abort(404)
-                for amenity in obj.amenities:
-                    if amenity.id == amenity_id:
-                        storage.delete(amenity)
-                        storage.save()
+        place_obj.amenity_ids = [id for id in place_obj.amenity_ids
+                                 if id != amenity_id]
+        storage.save()
         return jsonify({}), 200
 
 
@@ -212,9 +173,7 @@ def get_place_amenity(amenity_id):
     Returns:
         JSON: A JSON representation of the Amenity object.
     """
-    all_amenities = storage.all("Amenity").values()
-    amenity_obj = [obj.to_dict() for obj in all_amenities
-                   if obj.id == amenity_id]
-    if amenity_obj == []:
+    amenity_obj = storage.get("Amenity", amenity_id)
+    if amenity_obj is None:
         abort(404)
-    return jsonify(amenity_obj[0])
+    return jsonify(amenity_obj.to_dict())
@@ -25,10 +25,8 @@ def list_reviews_of_place(place_id):
     if place_obj is None:
         abort(404)
 
-    list_reviews = [review.to_dict() for review in storage
-                    .all("Review")
-                    .values()
-                    if place_id == review.place_id]
+    list_reviews = [review.to_dict() for review
+                    in storage.filter("Review", place_id=place_id)]
     return jsonify(list_reviews)
 
 
@@ -128,7 +126,7 @@ def update_review(review_id):
         if 'text' in data:
             review_obj.text = data['text']
 
-        storage.save()
+        review_obj.save()
         return jsonify(review_obj.to_dict()), 200
     except ValueError:
         abort(400, 'Invalid JSON')
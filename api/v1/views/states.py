@@ -106,7 +106,7 @@ def update_state(state_id):
             if key not in ['id', 'created_at', 'updated_at']:
                 setattr(state_obj, key, value)
 
-        storage.save()
+        state_obj.save()
 
         return jsonify(state_obj.to_dict()), 200
     except ValueError:
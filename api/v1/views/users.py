@@ -3,7 +3,8 @@
 Module containing views for User objects.
 """
 from api.v1.views import app_views
-from flask import jsonify, abort, request
+from flask import jsonify, abort, request, current_app, Response
+from flask import stream_with_context, url_for
 from models import storage
 from models.user import User
 
@@ -13,9 +14,32 @@ from models.user import User
 def list_users():
     """
     Retrieves a list of all User objects.
+
+    The list is streamed, a user at a time, so that the whole table is
+    never held. With ?limit=<n>, only a page of n users is returned,
+    sorted by id; the URL of the next page, ?limit=<n>&after=<token>, is
+    then in the Link header.
     """
-    list_users = [user.to_dict() for user in storage.all("User").values()]
-    return jsonify(list_users)
+    limit = request.args.get('limit')
+    if limit is None:
+        def stream():
+            """Yields the JSON list of the users, a user at a time"""
+            yield '['
+            for i, user in enumerate(storage.iter_all("User")):
+                yield (',' if i else '') + \
+                    current_app.json.dumps(user.to_dict())
+            yield ']\n'
+        return Response(stream_with_context(stream()),
+                        mimetype='application/json')
+    if not limit.isdigit() or int(limit) < 1:
+        abort(400, 'Invalid limit')
+    users, token = storage.page("User", int(limit),
+                                request.args.get('after'))
+    response = jsonify([user.to_dict() for user in users])
+    if token is not None:
+        response.headers['Link'] = '<{}>; rel="next"'.format(url_for(
+            'app_views.list_users', limit=limit, after=token))
+    return response
 
 
 @app_views.route('/users/<user_id>')
@@ -110,7 +134,7 @@ def update_user(user_id):
         if 'last_name' in data:
             user_obj.last_name = data['last_name']
 
-        storage.save()
+        user_obj.save()
 
         return jsonify(user_obj.to_dict()), 200
     except ValueError:
@@ -0,0 +1,14 @@
+#!/usr/bin/python3
+"""
+Compacts the files FileStorage keeps, offline: see models/engine/compact.py
+
+    ./compact.py [--format F] [--sharded] [--keep-orphans] file.json
+"""
+import os
+
+# the models package must not load the files this rewrites
+os.environ["HBNB_OFFLINE"] = "1"
+from models.engine import compact  # noqa: E402
+
+if __name__ == "__main__":
+    compact.main()
@@ -8,10 +8,19 @@ from os import getenv
 
 storage_t = getenv("HBNB_TYPE_STORAGE")
 
-if storage_t == "db":
+if getenv("HBNB_OFFLINE") == "1":
+    # tools working on the files themselves, e.g. compact.py
+    storage = None
+elif storage_t == "sqlite":
+    # the models are mapped with SQLAlchemy exactly as for MySQL
+    storage_t = "db"
+    from models.engine.sqlite_storage import SQLiteStorage
+    storage = SQLiteStorage()
+elif storage_t == "db":
     from models.engine.db_storage import DBStorage
     storage = DBStorage()
 else:
     from models.engine.file_storage import FileStorage
     storage = FileStorage()
-storage.reload()
+if storage is not None:
+    storage.reload()
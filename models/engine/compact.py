@@ -0,0 +1,331 @@
+#!/usr/bin/python3
+"""
+Contains the offline compaction of the files FileStorage writes
+
+The journal is folded into the data files, deleted and orphaned records
+(whose foreign keys point to objects that are gone) are dropped, and the
+records are written back sorted by class and id, in any of the formats.
+The records are streamed through sorted runs in temporary files, so only
+their keys and foreign keys, and a run of a few megabytes, are held in
+memory. The new files are read back and checked against the checksum of
+what was written before they replace the old ones. It is run through
+compact.py, at the root of the repository, which keeps the models package
+from loading the files first (HBNB_OFFLINE=1):
+
+    ./compact.py [--format F] [--sharded] [--keep-orphans] file.json
+"""
+
+import argparse
+import hashlib
+import heapq
+import json
+from models.engine import serializers, snapshot
+from models.engine.journal import Journal
+from models.engine.locks import FileLock
+import os
+import sys
+import tempfile
+import time
+
+# foreign keys: <class name> -> (attribute, class name it refers to)
+foreign_keys = {
+    "City": (("state_id", "State"),),
+    "Place": (("city_id", "City"), ("user_id", "User")),
+    "Review": (("place_id", "Place"), ("user_id", "User")),
+}
+# tuple - class names of the objects kept in sharded files
+shard_names = ("Amenity", "BaseModel", "City", "Place", "Review", "State",
+               "User")
+
+
+def shard(path, name):
+    """returns the path of the file holding the objects of a class"""
+    root, ext = os.path.splitext(path)
+    return "{}.{}{}".format(root, name, ext)
+
+
+def overlay(log):
+    """
+    returns the changes of a journal to apply over the data files
+
+    Returns:
+        tuple - The records replacing those of the files (None for a
+                deletion), then the attributes to change on the others
+    """
+    jo = {}
+    patches = {}
+    for rec in log.replay():
+        op, key = rec[0], rec[1]
+        if op != "~":
+            jo[key] = rec[2] if op == "+" else None
+            patches.pop(key, None)
+        elif key not in jo:
+            patches[key] = dict(patches.get(key, {}), **rec[2])
+        elif jo[key] is not None:
+            jo[key] = dict(jo[key], **rec[2])
+    return jo, patches
+
+
+def spill(pairs, tmp, size):
+    """
+    writes the pairs to sorted runs of about size bytes in the directory
+    tmp, the records of a run held serialized until it is written
+
+    Returns:
+        list - The paths of the runs
+    """
+    runs = []
+    chunk = []
+    held = 0
+
+    def flush():
+        """writes the chunk as a run, one [key, record] line each"""
+        chunk.sort(key=lambda pair: pair[0])
+        path = os.path.join(tmp, "run{}".format(len(runs)))
+        with open(path, "w") as f:
+            for key, line in chunk:
+                f.write(line)
+        runs.append(path)
+        chunk.clear()
+    for pair in pairs:
+        line = json.dumps(pair, separators=(",", ":")) + "\n"
+        chunk.append((pair[0], line))
+        held += len(line)
+        if held >= size:
+            flush()
+            held = 0
+    if chunk:
+        flush()
+    return runs
+
+
+def merge(runs):
+    """yields the (key, record) pairs of sorted runs, sorted by key"""
+    files = [open(path) for path in runs]
+    try:
+        for line in heapq.merge(*files, key=lambda line: json.loads(line)[0]):
+            yield tuple(json.loads(line))
+    finally:
+        for f in files:
+            f.close()
+
+
+def orphans(refs):
+    """
+    returns the keys whose foreign keys refer to missing objects, or to
+    orphans themselves
+
+    Parameters:
+        refs(dict) - The keys referred to by each key, every key included.
+    """
+    dead = set()
+    changed = True
+    while changed:
+        changed = False
+        for key, targets in refs.items():
+            if key not in dead and any(target not in refs or target in dead
+                                       for target in targets):
+                dead.add(key)
+                changed = True
+    return dead
+
+
+def canonical(key, record):
+    """returns the bytes a record is checksummed as, whatever its format"""
+    return key.encode("utf-8") + b"\0" + json.dumps(
+        record, sort_keys=True, separators=(",", ":")).encode("utf-8") + b"\n"
+
+
+def hashing(pairs, sha):
+    """yields the (key, record) pairs, adding each of them to sha"""
+    for key, record in pairs:
+        sha.update(canonical(key, record))
+        yield key, record
+
+
+def digest(pairs):
+    """returns the SHA-256 of the (key, record) pairs, in order"""
+    sha = hashlib.sha256()
+    for pair in hashing(pairs, sha):
+        pass
+    return sha.hexdigest()
+
+
+def write(f, name, pairs, count):
+    """
+    writes count (key, record) pairs, sorted, to the binary file f in the
+    format registered as name, one record at a time
+    """
+    if name == "indexed":
+        snapshot.dump(pairs, f)
+    elif name == "msgpack":
+        packer = serializers.msgpack.Packer(use_bin_type=True)
+        f.write(packer.pack_map_header(count))
+        for key, record in pairs:
+            f.write(packer.pack(key) + packer.pack(record))
+    else:
+        serializer = serializers.get_serializer(name)
+        comma, colon = (b", ", b": ") if name == "json" else (b",", b":")
+        f.write(b"{")
+        for i, (key, record) in enumerate(pairs):
+            f.write((comma if i else b"") + serializer.dumps(key) + colon +
+                    serializer.dumps(record))
+        f.write(b"}")
+
+
+def read_time(paths):
+    """returns the seconds taken to read every record of the files"""
+    began = time.perf_counter()
+    for path in paths:
+        if os.path.exists(path):
+            for pair in serializers.iterload(path):
+                pass
+    return time.perf_counter() - began
+
+
+def compact(path, name="json", sharded=False, keep_orphans=False,
+            run_size=1 << 22):
+    """
+    Rewrites the files FileStorage keeps at path, with the journal folded
+    in, in the format registered as name
+
+    The files are locked as FileStorage locks them for writing, so that
+    processes sharing them (HBNB_FILE_SHARED=1) wait, then reload.
+
+    Parameters:
+        path(str) - The path of the JSON file (__file_path).
+        name(str) - The format to write.
+        sharded(bool) - Whether the objects are kept one file per class.
+        keep_orphans(bool) - Whether to keep the orphaned records.
+        run_size(int) - The bytes of records sorted in memory at a time.
+
+    Returns:
+        dict - Sizes (bytes), record counts, read times (seconds) and
+               the checksum of the records written
+
+    Raises:
+        ValueError - if the files written do not read back the same
+    """
+    serializers.get_serializer(name)
+    if sharded:
+        paths = [shard(path, cls) for cls in shard_names]
+    else:
+        paths = [path]
+    log = Journal(path + ".log")
+    lock = FileLock(path + ".lock")
+    report = {}
+    with lock.exclusive(), tempfile.TemporaryDirectory(
+            dir=os.path.dirname(os.path.abspath(path))) as tmp:
+        existing = [p for p in paths if os.path.exists(p)]
+        report["size_before"] = sum(os.path.getsize(p) for p in existing)
+        report["journal_before"] = log.size()
+        report["read_before"] = read_time(existing)
+        began = time.perf_counter()
+        list(log.replay())
+        report["read_before"] += time.perf_counter() - began
+        jo, patches = overlay(log)
+        refs = {}
+        counts = {"read": 0, "deleted": 0}
+
+        def pairs():
+            """yields the records to keep, the journal applied"""
+            for p in existing:
+                for key, record in serializers.iterload(p):
+                    counts["read"] += 1
+                    if key in jo:
+                        continue
+                    if key in patches:
+                        record = dict(record, **patches[key])
+                    yield key, record
+            for key, record in jo.items():
+                if record is None:
+                    counts["deleted"] += 1
+                else:
+                    yield key, record
+
+        def indexed(pairs):
+            """notes the keys each record refers to on the way, unset
+            foreign keys ("" in file mode) referring to none"""
+            for key, record in pairs:
+                cls = key.partition(".")[0]
+                refs[key] = [
+                    "{}.{}".format(target, record[attr])
+                    for attr, target in foreign_keys.get(cls, ())
+                    if record.get(attr)]
+                yield key, record
+        runs = spill(indexed(pairs()), tmp, run_size)
+        dead = set() if keep_orphans else orphans(refs)
+        report["records_read"] = counts["read"]
+        report["deleted"] = counts["deleted"]
+        report["orphans"] = len(dead)
+        live = {}
+        for key in refs:
+            if key not in dead:
+                cls = key.partition(".")[0]
+                live[cls] = live.get(cls, 0) + 1
+        del refs
+        report["records_written"] = sum(live.values())
+
+        def kept(cls=None):
+            """yields the sorted records to write, of a class if given"""
+            for key, record in merge(runs):
+                if key not in dead and \
+                        (cls is None or key.partition(".")[0] == cls):
+                    yield key, record
+        outputs = {}
+        for cls in (shard_names if sharded else [None]):
+            dst = shard(path, cls) if cls else path
+            count = live.get(cls, 0) if cls else sum(live.values())
+            if cls and not count and dst not in existing:
+                continue
+            tmp_path = os.path.join(tmp, os.path.basename(dst))
+            sha = hashlib.sha256()
+            with open(tmp_path, "wb") as f:
+                write(f, name, hashing(kept(cls), sha), count)
+                f.flush()
+                os.fsync(f.fileno())
+            if digest(serializers.iterload(tmp_path)) != sha.hexdigest():
+                raise ValueError("{} does not read back".format(dst))
+            outputs[dst] = tmp_path
+        for dst, tmp_path in outputs.items():
+            os.replace(tmp_path, dst)
+        log.truncate()
+        lock.bump()
+        written = list(outputs)
+        report["size_after"] = sum(os.path.getsize(p) for p in written)
+        report["read_after"] = read_time(written)
+        report["checksum"] = digest(pair for dst in written
+                                    for pair in serializers.iterload(dst))
+    return report
+
+
+def main(argv=None):
+    """compacts the files named on the command line, printing a report"""
+    parser = argparse.ArgumentParser(
+        prog="compact.py",
+        description="Rewrites the FileStorage files, journal folded in, "
+                    "without deleted nor orphaned records, sorted by key.")
+    parser.add_argument("path", nargs="?", default="file.json")
+    parser.add_argument("--format", default=os.getenv("HBNB_FILE_FORMAT",
+                                                      "json"),
+                        choices=list(serializers.serializers))
+    parser.add_argument("--sharded", action="store_true",
+                        default=os.getenv("HBNB_FILE_SHARDED") == "1")
+    parser.add_argument("--keep-orphans", action="store_true")
+    parser.add_argument("--run-size", type=int, default=1 << 22)
+    args = parser.parse_args(argv)
+    try:
+        report = compact(args.path, args.format, args.sharded,
+                         args.keep_orphans, args.run_size)
+    except (ImportError, OSError, ValueError) as e:
+        print("compaction failed: {}".format(e), file=sys.stderr)
+        sys.exit(1)
+    print("{}: {} bytes + {} bytes of journal -> {} bytes".format(
+        args.path, report["size_before"], report["journal_before"],
+        report["size_after"]))
+    print("records: {} read, {} deleted, {} orphans dropped, {} written"
+          .format(report["records_read"], report["deleted"],
+                  report["orphans"], report["records_written"]))
+    print("read time: {:.2f}s -> {:.2f}s".format(report["read_before"],
+                                                 report["read_after"]))
+    print("checksum: sha256:{}".format(report["checksum"]))
@@ -7,14 +7,20 @@ import models
 from models.amenity import Amenity
 from models.base_model import BaseModel, Base
 from models.city import City
+from models.engine import predicates
+from models.engine.pool_metrics import PoolMetrics
+from models.engine.replicas import Replicas, RoutingSession
 from models.place import Place
 from models.review import Review
 from models.state import State
 from models.user import User
+from itertools import islice
 from os import getenv
 import sqlalchemy
 from sqlalchemy import create_engine
-from sqlalchemy.orm import scoped_session, sessionmaker
+from sqlalchemy.orm import joinedload, scoped_session, selectinload
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
 
 classes = {
     "Amenity": Amenity,
@@ -31,91 +37,464 @@ class DBStorage:
 
     __engine = None
     __session = None
+    # PoolMetrics - connections of the pool of the engine, counted and timed
+    __metrics = None
+    # Replicas - the engines reads are sent to, with the PoolMetrics of each
+    __replicas = None
+    __replica_metrics = None
 
     def __init__(self):
         """Instantiate a DBStorage object"""
+        HBNB_ENV = getenv("HBNB_ENV")
+        self.__metrics = PoolMetrics()
+        self.__engine = self.make_engine()
+        self.__metrics.watch(self.__engine)
+        engines = []
+        self.__replica_metrics = []
+        for url in self.replica_urls():
+            metrics = PoolMetrics()
+            engines.append(self.make_engine(url, metrics))
+            metrics.watch(engines[-1])
+            self.__replica_metrics.append(metrics)
+        self.__replicas = Replicas(
+            engines, self.replica_lag,
+            float(getenv("HBNB_MYSQL_REPLICA_MAX_LAG", 5)),
+            float(getenv("HBNB_MYSQL_REPLICA_CHECK", 1)))
+        if HBNB_ENV == "test":
+            Base.metadata.drop_all(self.__engine)
+
+    def make_engine(self, url=None, metrics=None):
+        """returns the engine connecting to the MySQL database, or to the
+        replica at url, its pool counted by metrics"""
         HBNB_MYSQL_USER = getenv("HBNB_MYSQL_USER")
         HBNB_MYSQL_PWD = getenv("HBNB_MYSQL_PWD")
         HBNB_MYSQL_HOST = getenv("HBNB_MYSQL_HOST")
         HBNB_MYSQL_DB = getenv("HBNB_MYSQL_DB")
-        HBNB_ENV = getenv("HBNB_ENV")
-        self.__engine = create_engine(
-            "mysql+mysqldb://{}:{}@{}/{}".format(
+        return create_engine(
+            url or "mysql+mysqldb://{}:{}@{}/{}".format(
                 HBNB_MYSQL_USER, HBNB_MYSQL_PWD, HBNB_MYSQL_HOST, HBNB_MYSQL_DB
-            )
+            ),
+            **self.pool_options(QueuePool, metrics)
         )
-        if HBNB_ENV == "test":
-            Base.metadata.drop_all(self.__engine)
 
-    def all(self, cls=None):
-        """query on the current database session"""
+    def replica_urls(self):
+        """returns the URLs of the read replicas, HBNB_MYSQL_REPLICAS
+        separated by commas"""
+        return [url.strip() for url in getenv("HBNB_MYSQL_REPLICAS",
+                                              "").split(",") if url.strip()]
+
+    def replica_lag(self, engine):
+        """
+        returns how many seconds a MySQL replica is behind its source, None
+        if it is not replicating
+
+        Replicas further behind than HBNB_MYSQL_REPLICA_MAX_LAG seconds
+        (default 5) are not read from; the lag is read again every
+        HBNB_MYSQL_REPLICA_CHECK seconds (default 1).
+        """
+        with engine.connect() as conn:
+            try:
+                row = conn.exec_driver_sql(
+                    "SHOW REPLICA STATUS").mappings().first()
+            except sqlalchemy.exc.DBAPIError:
+                # before MySQL 8.0.22
+                conn.rollback()
+                row = conn.exec_driver_sql(
+                    "SHOW SLAVE STATUS").mappings().first()
+        if row is None:
+            return None
+        lag = row.get("Seconds_Behind_Source",
+                      row.get("Seconds_Behind_Master"))
+        return None if lag is None else float(lag)
+
+    def pool_options(self, poolclass, metrics=None):
+        """
+        returns the options of create_engine() setting up its pool
+
+        The pool is a poolclass timing its checkouts, sized by the
+        environment when it is a QueuePool; unset variables keep the
+        defaults of SQLAlchemy:
+            HBNB_MYSQL_POOL_SIZE - connections kept open (5)
+            HBNB_MYSQL_MAX_OVERFLOW - connections opened past those (10)
+            HBNB_MYSQL_POOL_TIMEOUT - seconds to wait for one (30)
+            HBNB_MYSQL_POOL_RECYCLE - seconds after which a connection is
+                                      replaced, below the wait_timeout of
+                                      the server (-1, never)
+            HBNB_MYSQL_POOL_PRE_PING - 1 to test connections on checkout
+                                       and replace those found dropped
+        """
+        metrics = metrics or self.__metrics
+        options = {"poolclass": metrics.poolclass(poolclass)}
+        env = {"pool_recycle": ("HBNB_MYSQL_POOL_RECYCLE", int)}
+        if issubclass(poolclass, QueuePool):
+            env.update({
+                "pool_size": ("HBNB_MYSQL_POOL_SIZE", int),
+                "max_overflow": ("HBNB_MYSQL_MAX_OVERFLOW", int),
+                "pool_timeout": ("HBNB_MYSQL_POOL_TIMEOUT", float),
+            })
+        for option, (name, kind) in env.items():
+            if getenv(name):
+                options[option] = kind(getenv(name))
+        options["pool_pre_ping"] = getenv("HBNB_MYSQL_POOL_PRE_PING") == "1"
+        return options
+
+    def pool_stats(self):
+        """returns the counts and timings of the connection pool, see
+        PoolMetrics.stats, with those of each replica"""
+        stats = self.__metrics.stats()
+        if self.__replicas:
+            stats["replicas"] = self.__replicas.stats()
+            for replica, metrics in zip(stats["replicas"],
+                                        self.__replica_metrics):
+                replica["pool"] = metrics.stats()
+        return stats
+
+    def all(self, cls=None, expand=None):
+        """
+        query on the current database session
+
+        Parameters:
+            cls(class or str) - The class to be queried, every one if None.
+            expand(str or list) - Relationships of cls loaded along, see
+                                  __options.
+        """
         new_dict = {}
         for clss in classes:
             if cls is None or cls is classes[clss] or cls is clss:
-                objs = self.__session.query(classes[clss]).all()
+                query = self.__session.query(classes[clss])
+                if cls is not None:
+                    query = query.options(
+                        *self.__options(classes[clss], expand))
+                objs = query.all()
                 for obj in objs:
                     key = obj.__class__.__name__ + "." + obj.id
                     new_dict[key] = obj
         return new_dict
 
+    def iter_all(self, cls=None, batch_size=1000):
+        """
+        yields the objects of the database, or those of cls, fetching
+        batch_size rows at a time
+
+        The rows are streamed (yield_per), through a server-side cursor
+        with MySQL, so only a batch of objects is held at a time. The
+        session should not run other queries before the iteration ends.
+        """
+        cls = classes.get(cls, cls)
+        for clss in classes.values():
+            if cls is None or cls is clss:
+                query = self.__session.query(clss)
+                yield from query.yield_per(batch_size)
+
     def new(self, obj):
         """add the object to the current database session"""
         self.__session.add(obj)
+        self.__forget_counts()
+
+    def new_many(self, objs):
+        """add each of objs to the current database session, to be
+        inserted together at the next flush"""
+        self.__session.add_all(list(objs))
+        self.__forget_counts()
+
+    def import_records(self, records, cls=None, batch=10000):
+        """
+        Inserts the objects of records, e.g. read from a seed file, and
+        commits them
+
+        Records are inserted a batch at a time, each batch by a single
+        executemany that bypasses the session, in one transaction.
+
+        Parameters:
+            records(iterable) - Dictionaries of attributes, as to_dict()
+                                returns them.
+            cls(class or str) - The class of the records that carry no
+                                "__class__".
+            batch(int) - The number of records inserted at a time.
+
+        Returns:
+            int - The number of records imported
+
+        Raises:
+            ValueError - if cls or the "__class__" of a record is not a
+                         class of the models, or if a record has no
+                         "__class__" and cls is None: nothing is imported
+        """
+        default = classes.get(cls, cls)
+        if default is not None and default not in classes.values():
+            raise ValueError("unknown class: {}".format(
+                getattr(default, "__name__", default)))
+        records = iter(records)
+        count = 0
+        try:
+            while True:
+                chunk = list(islice(records, batch))
+                if not chunk:
+                    break
+                rows = {}
+                for record in chunk:
+                    klass = self.__import_class(record, default)
+                    # built for the ids and dates they fill in
+                    obj = klass(**record)
+                    columns = klass.__table__.columns
+                    rows.setdefault(klass, []).append(
+                        {key: value for key, value in vars(obj).items()
+                         if key in columns})
+                for klass, values in rows.items():
+                    self.__session.execute(sqlalchemy.insert(klass), values)
+                count += len(chunk)
+            self.__session.commit()
+        except Exception:
+            self.__session.rollback()
+            raise
+        finally:
+            self.__forget_counts()
+        return count
+
+    @staticmethod
+    def __import_class(record, default):
+        """
+        returns the class of a record to import, default if it carries
+        no "__class__"
+
+        Raises:
+            ValueError - if there is no such class
+        """
+        name = record.get("__class__")
+        if name is None:
+            if default is None:
+                raise ValueError("record {} has no __class__ and no class "
+                                 "was given".format(record.get("id")))
+            return default
+        if name not in classes:
+            raise ValueError("record {} has an unknown __class__: {}".format(
+                record.get("id"), name))
+        return classes[name]
 
     def save(self):
         """commit all changes of the current database session"""
         self.__session.commit()
+        self.__forget_counts()
 
-    def get(self, cls, id):
+    def get(self, cls, id, expand=None):
         """
         Get an object by its class and id from the current database session
 
+        An object already in the identity map of the session comes back
+        without a query.
+
         Parameters:
-            cls(class) - The class to be queried.
+            cls(class or str) - The class, or class name, to be queried.
             id(int) - The id of the record to be returned.
+            expand(str or list) - Relationships loaded along, joined to the
+                                  query of the object, see __options.
 
         Returns:
            obj - The object queried or None otherwise
         """
-        try:
-            res = self.__session.query(cls).filter_by(id=id).one()
-            return res
-        except Exception as e:
+        cls = classes.get(cls, cls)
+        if cls not in classes.values() or id is None:
             return None
+        return self.__session.get(
+            cls, id, options=self.__options(cls, expand, joinedload))
+
+    def get_many(self, cls, ids):
+        """
+        Get the objects of a class with the given ids, by a single IN
+        query for each 500 of them
+
+        Parameters:
+            cls(class or str) - The class, or class name, to be queried.
+            ids(iterable) - The ids of the records to be returned.
+
+        Returns:
+            list - The objects found, in the order of ids
+        """
+        cls = classes.get(cls, cls)
+        if cls not in classes.values():
+            return []
+        ids = list(dict.fromkeys(ids))
+        found = {}
+        for start in range(0, len(ids), 500):
+            for obj in self.__session.query(cls).filter(
+                    cls.id.in_(ids[start:start + 500])):
+                found[obj.id] = obj
+        return [found[id] for id in ids if id in found]
+
+    def filter(self, cls, order_by=None, limit=None, expand=None,
+               **criteria):
+        """
+        Lists the objects of a class that meet every criterion, selected
+        by the database: WHERE, ORDER BY and LIMIT
+
+        Parameters:
+            cls(class or str) - The class to be queried.
+            order_by(str or list) - Attributes to sort by, each prefixed by
+                                    "-" for a descending order.
+            limit(int) - The most objects to return.
+            expand(str or list) - Relationships loaded along, see
+                                  __options.
+            criteria - <attribute>=<value> or <attribute>__<op>=<value>,
+                       see models/engine/predicates.py.
+
+        Returns:
+            list - The matching objects
+        """
+        cls = classes.get(cls, cls)
+        query = self.__session.query(cls).options(
+            *self.__options(cls, expand))
+        for attr, op, value in predicates.parse(criteria):
+            column = getattr(cls, attr)
+            if op == "in":
+                query = query.filter(column.in_(value))
+            else:
+                query = query.filter(predicates.operators[op](column, value))
+        for attr, descending in predicates.ordering(order_by):
+            column = getattr(cls, attr)
+            query = query.order_by(column.desc() if descending else column)
+        if limit is not None:
+            query = query.limit(limit)
+        return query.all()
+
+    def page(self, cls, limit=100, after=None):
+        """
+        Lists a page of the objects of a class, sorted by id: a query
+        seeking past the previous page (WHERE id > after), so each page
+        costs the same however deep it is
+
+        Parameters:
+            cls(class or str) - The class to be queried.
+            limit(int) - The most objects to return.
+            after(str) - The continuation token of the previous page.
+
+        Returns:
+            tuple - The objects, then the token of the next page, None if
+                    this is the last one
+
+        Raises:
+            ValueError - if limit is less than 1
+        """
+        if limit < 1:
+            raise ValueError("limit must be at least 1")
+        criteria = {} if after is None else {"id__gt": after}
+        objs = self.filter(cls, order_by="id", limit=limit + 1, **criteria)
+        if len(objs) > limit:
+            return objs[:limit], objs[limit - 1].id
+        return objs, None
+
+    @staticmethod
+    def __options(cls, expand, strategy=selectinload):
+        """
+        returns the loader options loading relationships of cls along with
+        it, instead of by a query per object when they are first read
+
+        Parameters:
+            cls(class) - The class queried.
+            expand(str or list) - Relationship names, e.g. "cities", or
+                                  paths of them, e.g. "cities.places".
+            strategy(function) - selectinload: a single IN query for each
+                                 relationship, whatever the number of
+                                 objects; or joinedload: a JOIN with the
+                                 query of the objects.
+
+        Raises:
+            ValueError - if a name is not a relationship
+        """
+        if expand is None:
+            return []
+        if isinstance(expand, str):
+            expand = [expand]
+        options = []
+        for path in expand:
+            option = None
+            owner = cls
+            for name in path.split("."):
+                attr = getattr(owner, name, None)
+                if not hasattr(getattr(attr, "property", None), "mapper"):
+                    raise ValueError("{} has no relationship {}".format(
+                        owner.__name__, name))
+                if option is None:
+                    option = strategy(attr)
+                else:
+                    option = getattr(option, strategy.__name__)(attr)
+                owner = attr.property.mapper.class_
+            options.append(option)
+        return options
 
     def count(self, cls=None):
         """
         Counts the number of objects in storage
 
+        Every class is counted by a single query, whose result is kept
+        by the session of the current thread until its next new, delete,
+        save or close.
+
         Paramters:
-            cls(class, default=None) - The class to be queried.
+            cls(class or str, default=None) - The class to be queried.
 
         Returns:
             int - Number of records found
         """
         try:
-            count = 0
+            counts = self.__count_all()
             if cls is not None:
-                count += self.__session.query(cls).count()
-            else:
-                for cls in classes.values():
-                    count += self.__session.query(cls).count()
-            return count
+                cls = classes.get(cls, cls)
+                return counts[cls.__name__]
+            return sum(counts.values())
         except Exception as e:
             print("Error while counting elements: ", str(e))
 
+    def __count_all(self):
+        """returns the number of rows of each class, by class name, kept
+        in the info of the session of the current thread, which they were
+        counted in"""
+        info = self.__session().info
+        counts = info.get("counts")
+        if counts is None:
+            query = sqlalchemy.union_all(*[
+                sqlalchemy.select(sqlalchemy.literal(name),
+                                  sqlalchemy.func.count()).select_from(cls)
+                for name, cls in classes.items()])
+            counts = dict(self.__session.execute(query).all())
+            info["counts"] = counts
+        return counts
+
+    def __forget_counts(self):
+        """drops the counts kept by the session of the current thread"""
+        if self.__session is not None and self.__session.registry.has():
+            self.__session().info.pop("counts", None)
+
     def delete(self, obj=None):
         """delete from the current database session obj if not None"""
         if obj is not None:
             self.__session.delete(obj)
+            self.__forget_counts()
+
+    def delete_many(self, objs, cls=None):
+        """
+        delete from the current database session each of objs
+
+        Parameters:
+            objs(iterable) - The objects, or their ids when cls is given:
+                             those are loaded by get_many, so that their
+                             relationships are deleted as by delete.
+        """
+        if cls is not None:
+            objs = self.get_many(cls, objs)
+        for obj in objs:
+            self.__session.delete(obj)
+        self.__forget_counts()
 
     def reload(self):
         """reloads data from the database"""
         Base.metadata.create_all(self.__engine)
-        sess_factory = sessionmaker(bind=self.__engine, expire_on_commit=False)
+        sess_factory = sessionmaker(bind=self.__engine, expire_on_commit=False,
+                                    class_=RoutingSession,
+                                    replicas=self.__replicas)
         Session = scoped_session(sess_factory)
         self.__session = Session
 
     def close(self):
         """call remove() method on the private session attribute"""
+        self.__forget_counts()
         self.__session.remove()
@@ -3,14 +3,26 @@
 Contains the FileStorage class
 """
 
-import json
+import atexit
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from itertools import islice
 from models.amenity import Amenity
 from models.base_model import BaseModel
 from models.city import City
 from models.place import Place
 from models.review import Review
 from models.state import State
+from models.engine.journal import Journal
+from models.engine.locks import FileLock, ReadWriteLock
+from models.engine import parallel, predicates, serializers
+from models.engine.snapshot import Snapshot
 from models.user import User
+import os
+from os import getenv
+import threading
+import time
+from types import MappingProxyType
 
 classes = {
     "Amenity": Amenity,
@@ -22,6 +34,13 @@ classes = {
     "User": User,
 }
 
+# foreign keys kept in reverse indexes: <class name> -> attribute names
+references = {
+    "City": ("state_id",),
+    "Place": ("city_id", "user_id"),
+    "Review": ("place_id", "user_id"),
+}
+
 
 class FileStorage:
     """serializes instances to a JSON file & deserializes back to instances"""
@@ -30,81 +49,1235 @@ class FileStorage:
     __file_path = "file.json"
     # dictionary - empty but will store all objects by <class name>.id
     __objects = {}
+    # dictionary - the same objects partitioned by <class name>
+    __classes = {}
+    # set - dictionaries handed out by all() since they last changed, to
+    # be copied before they change: "" for __objects, else a class name
+    __frozen = set()
+    # dictionary - reverse indexes: (<class name>, fk) -> fk value -> objects
+    __refs = {}
+    # int - raw records (lazy mode, mapped snapshots) left in __objects
+    __raw = 0
+    # bool - append changes to a journal instead of rewriting __file_path
+    __journal = getenv("HBNB_FILE_JOURNAL") == "1"
+    # int - journal size (bytes) past which it is folded into the snapshot
+    __journal_limit = int(getenv("HBNB_FILE_JOURNAL_LIMIT", 4 * 1024 * 1024))
+    # Journal - log of the changes not yet folded into __file_path
+    __log = None
+    # dictionary - changes since the last save: <class name>.id -> obj/None
+    __pending = {}
+    # dictionary - changes staged for a group commit, not written yet
+    __inflight = {}
+    # dictionary - attributes changed on pending objects known to be on disk
+    __changes = {}
+    # dictionary - records last serialized for objects unchanged since
+    __cache = {}
+    # tuple - signature of the file and journal as last read or written
+    __signature = None
+    # bool - keep reloaded records as raw dicts until they are accessed
+    __lazy = getenv("HBNB_FILE_LAZY") == "1"
+    # serializer - writes the files, see models/engine/serializers.py
+    __format = serializers.get_serializer(getenv("HBNB_FILE_FORMAT", "json"))
+    # int - size (bytes) from which files are streamed in by reload()
+    __stream_size = int(getenv("HBNB_FILE_STREAM_SIZE", 64 * 1024 * 1024))
+    # int - processes reload() parses and builds the files on, in ranges
+    # of records, when nothing is loaded yet: 0 or 1 to do it in-process
+    __workers = int(getenv("HBNB_FILE_WORKERS", 0))
+    # dictionary - seconds spent in each phase of the last reload() that
+    # read the files
+    __timings = {}
+    # bool - keep one file per class next to __file_path
+    __sharded = getenv("HBNB_FILE_SHARDED") == "1"
+    # set - names of the classes changed since their file was last written
+    __dirty = set()
+    # dictionary - indexed snapshots mapped in memory: path -> Snapshot,
+    # holding the records not copied to __objects yet
+    __snapshots = {}
+    # set - keys deleted from __objects that are still in __snapshots
+    __hidden = set()
+    # set - names of the classes whose records were all copied to __objects
+    __pulled = set()
+    # set - (<class name>, fk, value) whose records were copied to __objects
+    __selected = set()
+    # bool - other processes write the files too: lock them while in use
+    # and catch up with the changes of the others before writing
+    __shared = getenv("HBNB_FILE_SHARED") == "1"
+    # FileLock - lock and generation counter shared with those processes
+    __flock = None
+    # int - generation of the files as last read or written
+    __generation = None
+    # ReadWriteLock - guards the objects, indexes and change tracking
+    __lock = ReadWriteLock()
+    # Lock - lets a single thread build the objects of raw records
+    __build_lock = threading.Lock()
+    # RLock - lets a single thread write the files or reload them
+    __io = threading.RLock()
+    # Condition - wakes up the save() calls waiting on a group commit
+    __commit = threading.Condition(threading.Lock())
+    # bool - a save() is writing a group commit
+    __committing = False
+    # float - seconds a group commit waits for more save() calls to join
+    __commit_window = float(getenv("HBNB_FILE_COMMIT_WINDOW", 0))
+    # float - write-behind: seconds save() leaves its changes to a
+    # background flusher before they are written, 0 to write them at once
+    __write_behind = float(getenv("HBNB_FILE_WRITE_BEHIND", 0))
+    # int - changes waiting past which the flusher writes them at once
+    __write_behind_limit = int(getenv("HBNB_FILE_WRITE_BEHIND_LIMIT", 1000))
+    # Condition - wakes up the flusher when save() stages changes
+    __flusher = threading.Condition(threading.Lock())
+    # int - pid of the process the flusher thread was started in
+    __flusher_pid = None
+    # bool - the flusher has to write without waiting any longer
+    __hurry = False
+    # int - tickets of the last save() staged and written to disk
+    __staged = 0
+    __written = 0
+    # list - journal records staged for the next group commit
+    __records = []
+
+    def all(self, cls=None, expand=None):
+        """
+        returns a read-only view of __objects, or of the objects of cls
 
-    def all(self, cls=None):
-        """returns the dictionary __objects"""
-        if cls is not None:
-            new_dict = {}
-            for key, value in self.__objects.items():
-                if cls == value.__class__ or cls == value.__class__.__name__:
-                    new_dict[key] = value
-            return new_dict
-        return self.__objects
+        The view is a snapshot: it never changes, so it can be walked
+        while other threads write. Nothing is copied until the next
+        change, which copies the dictionary instead of changing it.
+        expand is taken as by DBStorage, where it loads relationships
+        along: here they are read from the reverse indexes, in memory.
+        """
+        self.__fetch(None if cls is None else self.__name(cls))
+        with self.__lock.reading():
+            name = "" if cls is None else self.__name(cls)
+            if self.__raw:
+                objs = self.__classes.get(name, {}) if name \
+                    else self.__objects
+                for key in [k for k, v in objs.items() if type(v) is dict]:
+                    self.__load(key)
+            with self.__build_lock:
+                if name and name not in self.__classes:
+                    return MappingProxyType({})
+                self.__frozen.add(name)
+                return MappingProxyType(self.__classes[name] if name
+                                        else self.__objects)
+
+    def __thaw(self, name):
+        """
+        copies a dictionary handed out by all() before it changes
+
+        Parameters:
+            name(str) - A class name for its partition, "" for __objects.
+        """
+        if name in self.__frozen:
+            self.__frozen.discard(name)
+            if name:
+                self.__classes[name] = dict(self.__classes[name])
+            else:
+                FileStorage.__objects = dict(self.__objects)
+
+    def iter_all(self, cls=None, batch_size=1000):
+        """
+        yields the objects stored, or those of cls, a class at a time
+
+        Raw records (lazy mode, mapped snapshots) are built batch_size at
+        a time as the objects are consumed, not all before the first one
+        as by all(). Objects stored after the iteration of their class
+        started are not yielded.
+        """
+        names = list(classes) if cls is None else [self.__name(cls)]
+        for name in names:
+            self.__fetch(name)
+            with self.__lock.reading():
+                keys = list(self.__classes.get(name, {}))
+            for start in range(0, len(keys), batch_size):
+                with self.__lock.reading():
+                    objs = [self.__load(key)
+                            for key in keys[start:start + batch_size]]
+                for obj in objs:
+                    if obj is not None:
+                        yield obj
 
     def new(self, obj):
         """sets in __objects the obj with key <obj class name>.id"""
         if obj is not None:
-            key = obj.__class__.__name__ + "." + obj.id
+            with self.__lock.writing():
+                self.__add(obj)
+
+    def new_many(self, objs):
+        """sets in __objects each of objs, taking the lock once"""
+        with self.__lock.writing():
+            for obj in objs:
+                self.__add(obj)
+
+    def __add(self, obj):
+        """stores obj and queues it for the next save()"""
+        key = obj.__class__.__name__ + "." + obj.id
+        if self.__objects.get(key) is not obj:
+            self.__changes.pop(key, None)
+        self.__put(key, obj)
+        self.__cache.pop(key, None)
+        self.__pending[key] = obj
+
+    def import_records(self, records, cls=None, batch=10000):
+        """
+        Stores the objects of records, e.g. read from a seed file, and
+        saves them
+
+        Records are built and stored a batch at a time, taking the lock
+        once per batch, then written by a single save().
+
+        Parameters:
+            records(iterable) - Dictionaries of attributes, as to_dict()
+                                returns them.
+            cls(class or str) - The class of the records that carry no
+                                "__class__".
+            batch(int) - The number of records built at a time.
+
+        Returns:
+            int - The number of records imported
+
+        Raises:
+            ValueError - if cls or the "__class__" of a record is not a
+                         class of the models, or if a record has no
+                         "__class__" and cls is None: the objects stored
+                         by the import so far are removed
+        """
+        if cls is not None and self.__name(cls) not in classes:
+            raise ValueError("unknown class: {}".format(self.__name(cls)))
+        default = None if cls is None else classes[self.__name(cls)]
+        records = iter(records)
+        stored = []
+        try:
+            while True:
+                chunk = list(islice(records, batch))
+                if not chunk:
+                    break
+                objs = [self.__import_class(record, default)(**record)
+                        for record in chunk]
+                self.new_many(objs)
+                stored += objs
+        except Exception:
+            self.delete_many(stored)
+            raise
+        self.save()
+        return len(stored)
+
+    @staticmethod
+    def __import_class(record, default):
+        """
+        returns the class of a record to import, default if it carries
+        no "__class__"
+
+        Raises:
+            ValueError - if there is no such class
+        """
+        name = record.get("__class__")
+        if name is None:
+            if default is None:
+                raise ValueError("record {} has no __class__ and no class "
+                                 "was given".format(record.get("id")))
+            return default
+        if name not in classes:
+            raise ValueError("record {} has an unknown __class__: {}".format(
+                record.get("id"), name))
+        return classes[name]
+
+    def __put(self, key, obj):
+        """stores obj under key in __objects, its partition and indexes"""
+        if self.__objects.get(key, obj) is not obj:
+            self.__drop(key)
+        self.__thaw("")
+        if type(self.__objects.get(key)) is dict:
+            FileStorage.__raw -= 1
+        if type(obj) is dict:
+            FileStorage.__raw += 1
+        self.__objects[key] = obj
+        self.__hidden.discard(key)
+        name = key.partition(".")[0]
+        if name not in self.__classes:
+            self.__classes[name] = {}
+        self.__thaw(name)
+        self.__classes[name][key] = obj
+        for attr in references.get(name, ()):
+            index = self.__refs.setdefault((name, attr), {})
+            index.setdefault(self.__field(obj, attr), {})[key] = obj
+
+    def __drop(self, key):
+        """removes key from __objects, its partition and indexes"""
+        name = key.partition(".")[0]
+        self.__cache.pop(key, None)
+        if key not in self.__objects:
+            return
+        self.__thaw("")
+        self.__thaw(name)
+        obj = self.__objects.pop(key)
+        if type(obj) is dict:
+            FileStorage.__raw -= 1
+        self.__classes.get(name, {}).pop(key, None)
+        for attr in references.get(name, ()):
+            index = self.__refs.get((name, attr), {})
+            index.get(self.__field(obj, attr), {}).pop(key, None)
+
+    def __load(self, key):
+        """
+        builds the object stored under key if it is still a raw record
+
+        The new instance takes the place of the record in __objects, its
+        class partition and the reverse indexes.
+        """
+        record = self.__objects.get(key)
+        if type(record) is not dict:
+            return record
+        with self.__build_lock:
+            record = self.__objects.get(key)
+            if type(record) is not dict:
+                return record
+            obj = classes[record["__class__"]](**record)
+            name = key.partition(".")[0]
+            self.__thaw("")
+            self.__thaw(name)
             self.__objects[key] = obj
+            FileStorage.__raw -= 1
+            self.__classes[name][key] = obj
+            for attr in references.get(name, ()):
+                self.__refs[(name, attr)][self.__field(obj, attr)][key] = obj
+            return obj
+
+    def __snapshot(self, key):
+        """returns the mapped snapshot of the file key is written to"""
+        if not self.__snapshots:
+            return None
+        return self.__snapshots.get(self.__home(key.partition(".")[0]))
+
+    def __pull(self, key):
+        """
+        returns the object or raw record stored under key
+
+        A record only found in a mapped snapshot is copied to __objects.
+        """
+        obj = self.__objects.get(key)
+        if obj is None and key not in self.__hidden:
+            snap = self.__snapshot(key)
+            if snap is not None:
+                obj = snap.get(key)
+                if obj is not None:
+                    self.__put(key, obj)
+        return obj
+
+    def __fetch(self, name=None):
+        """
+        copies to __objects the records of a class, or of every class,
+        left in the mapped snapshots
+
+        It takes the lock for writing, so it is called before reading.
+        """
+        names = list(classes) if name is None else [name]
+        if not self.__snapshots or self.__pulled.issuperset(names):
+            return
+        with self.__lock.writing():
+            for name in names:
+                snap = self.__snapshots.get(self.__home(name))
+                if snap is not None and name not in self.__pulled:
+                    for key, record in snap.items(name + "."):
+                        if key not in self.__objects and \
+                                key not in self.__hidden:
+                            self.__put(key, record)
+                self.__pulled.add(name)
+
+    def __select(self, name, attr, values):
+        """
+        copies to __objects the records of a class left in the mapped
+        snapshots whose foreign key attr is one of values, instead of
+        every record of the class as __fetch does
+
+        It takes the lock for writing, so it is called before reading.
+        """
+        snap = self.__snapshots.get(self.__home(name)) \
+            if self.__snapshots else None
+        if snap is None or name in self.__pulled:
+            return
+        values = [value for value in dict.fromkeys(values)
+                  if (name, attr, value) not in self.__selected]
+        if not values:
+            return
+        with self.__lock.writing():
+            for key, record in snap.select(name + ".", attr, values):
+                if key not in self.__objects and key not in self.__hidden:
+                    self.__put(key, record)
+            self.__selected.update((name, attr, value) for value in values)
+
+    def __hide(self, key):
+        """keeps a key removed from __objects out of the mapped snapshots"""
+        snap = self.__snapshot(key)
+        if snap is not None and key in snap and key not in self.__objects:
+            self.__hidden.add(key)
+
+    @staticmethod
+    def __field(obj, attr):
+        """returns obj.<attr> of an object or of a raw record"""
+        if type(obj) is dict:
+            if attr in obj:
+                return obj[attr]
+            obj = classes[obj["__class__"]]
+        return getattr(obj, attr, None)
+
+    def touch(self, obj, attr, old):
+        """
+        records that obj.<attr> changed from old, as BaseModel reports it
+
+        A stored object is queued for the next save() with the names of
+        its changed attributes, its cached record is dropped and, for a
+        foreign key, it is moved to the right reverse index. In-place
+        changes (e.g. list.append) are not seen: re-assign or save() it.
+        """
+        name = obj.__class__.__name__
+        key = "{}.{}".format(name, obj.__dict__.get("id"))
+        if self.__objects.get(key) is not obj:
+            return
+        with self.__lock.writing():
+            if self.__objects.get(key) is not obj:
+                return
+            if attr in references.get(name, ()):
+                index = self.__refs.setdefault((name, attr), {})
+                index.get(old, {}).pop(key, None)
+                index.setdefault(getattr(obj, attr), {})[key] = obj
+            self.__cache.pop(key, None)
+            if key not in self.__pending:
+                self.__pending[key] = obj
+                self.__changes[key] = set()
+            if key in self.__changes:
+                self.__changes[key].add(attr)
+
+    def lookup(self, cls, attr, value):
+        """
+        Lists the objects of a class whose attribute equals a value
+
+        Parameters:
+            cls(class or str) - The class to be queried.
+            attr(str) - The attribute compared, e.g. "state_id".
+            value - The value attr must be equal to.
+
+        Returns:
+            list - The matching objects, found through the reverse index
+                   when attr is one of the indexed foreign keys
+        """
+        return self.filter(cls, **{attr: value})
+
+    def filter(self, cls, order_by=None, limit=None, expand=None,
+               **criteria):
+        """
+        Lists the objects of a class that meet every criterion
+
+        Parameters:
+            cls(class or str) - The class to be queried.
+            order_by(str or list) - Attributes to sort by, each prefixed by
+                                    "-" for a descending order.
+            limit(int) - The most objects to return.
+            expand(str or list) - Ignored, see all().
+            criteria - <attribute>=<value> or <attribute>__<op>=<value>,
+                       see models/engine/predicates.py.
+
+        Returns:
+            list - The matching objects. When a criterion is an equality or
+                   "in" on an indexed foreign key, only the objects found
+                   through its reverse index are compared, and only those
+                   are copied from a mapped snapshot.
+        """
+        name = self.__name(cls)
+        criteria = predicates.parse(criteria)
+        indexed = None
+        for attr, op, value in criteria:
+            if op in ("eq", "in") and attr in references.get(name, ()):
+                indexed = (attr, list(value) if op == "in" else [value])
+                break
+        if indexed is None:
+            self.__fetch(name)
+        else:
+            self.__select(name, *indexed)
+        with self.__lock.reading():
+            if indexed is not None:
+                index = self.__refs.get((name, indexed[0]), {})
+                keys = list(dict.fromkeys(
+                    key for value in indexed[1]
+                    for key in index.get(value, {})))
+            else:
+                keys = list(self.__classes.get(name, {}))
+            keys = [key for key in keys if all(
+                predicates.matches(self.__value(key, attr), op, value)
+                for attr, op, value in criteria)]
+            for attr, descending in reversed(predicates.ordering(order_by)):
+                keys.sort(key=lambda key: (
+                    (self.__value(key, attr) is None) != descending,
+                    self.__value(key, attr)), reverse=descending)
+            return [self.__load(key) for key in keys[:limit]]
+
+    def page(self, cls, limit=100, after=None):
+        """
+        Lists a page of the objects of a class, sorted by id
+
+        Parameters:
+            cls(class or str) - The class to be queried.
+            limit(int) - The most objects to return.
+            after(str) - The continuation token of the previous page.
+
+        Returns:
+            tuple - The objects, then the token of the next page, None if
+                    this is the last one
+
+        Raises:
+            ValueError - if limit is less than 1
+        """
+        if limit < 1:
+            raise ValueError("limit must be at least 1")
+        criteria = {} if after is None else {"id__gt": after}
+        objs = self.filter(cls, order_by="id", limit=limit + 1, **criteria)
+        if len(objs) > limit:
+            return objs[:limit], objs[limit - 1].id
+        return objs, None
+
+    def __value(self, key, attr):
+        """returns the attribute of the object under key, built first when
+        it is a raw record holding a date as a string"""
+        obj = self.__objects[key]
+        if type(obj) is dict and attr in ("created_at", "updated_at"):
+            obj = self.__load(key)
+        return self.__field(obj, attr)
+
+    @staticmethod
+    def __name(cls):
+        """returns the class name of cls, given as a class or a string"""
+        if isinstance(cls, str):
+            return cls
+        return cls.__name__
 
     def save(self):
-        """serializes __objects to the JSON file (path: __file_path)"""
-        json_objects = {}
-        for key in self.__objects:
-            json_objects[key] = self.__objects[key].to_dict()
-        with open(self.__file_path, "w") as f:
-            json.dump(json_objects, f)
+        """
+        serializes __objects to the JSON file (path: __file_path)
+
+        Concurrent calls are merged into group commits: the first call
+        waits __commit_window seconds, then writes the changes of every
+        call staged so far in a single fsync'd write, while the other
+        calls wait for the write that includes their changes.
+
+        In write-behind mode the changes are only staged: a background
+        thread writes them __write_behind seconds later, or as soon as
+        __write_behind_limit of them are waiting. flush() waits until
+        they are on disk.
+        """
+        with self.__lock.writing():
+            self.__stage()
+            FileStorage.__staged += 1
+            ticket = FileStorage.__staged
+            waiting = len(self.__inflight)
+        if self.__write_behind > 0:
+            self.__wake(waiting >= self.__write_behind_limit)
+        else:
+            self.__commit_until(ticket)
+
+    def flush(self):
+        """writes the changes of every save() so far, waiting until they are
+        on disk"""
+        self.__commit_until(FileStorage.__staged)
 
-    def get(self, cls, id):
+    def __commit_until(self, ticket):
+        """
+        writes group commits until the changes of a save() are on disk
+
+        Parameters:
+            ticket(int) - The ticket of that save().
+        """
+        with self.__commit:
+            while FileStorage.__written < ticket:
+                if FileStorage.__committing:
+                    self.__commit.wait()
+                    continue
+                FileStorage.__committing = True
+                self.__commit.release()
+                written = None
+                try:
+                    if self.__commit_window > 0:
+                        time.sleep(self.__commit_window)
+                    written = self.__flush()
+                finally:
+                    self.__commit.acquire()
+                    FileStorage.__committing = False
+                    if written is not None:
+                        FileStorage.__written = written
+                    self.__commit.notify_all()
+
+    def __wake(self, hurry=False):
+        """
+        wakes up the flusher, starting it in a process that has none yet
+
+        Parameters:
+            hurry(bool) - Whether to write without waiting any longer.
+        """
+        with self.__flusher:
+            if FileStorage.__flusher_pid != os.getpid():
+                if FileStorage.__flusher_pid is None:
+                    atexit.register(self.flush)
+                FileStorage.__flusher_pid = os.getpid()
+                threading.Thread(target=self.__flush_behind, daemon=True,
+                                 name="FileStorage flusher").start()
+            if hurry:
+                FileStorage.__hurry = True
+            self.__flusher.notify()
+
+    def __flush_behind(self):
+        """
+        writes the staged changes in the background, __write_behind
+        seconds after the first of them, sooner when it is hurried
+        """
+        while True:
+            with self.__flusher:
+                while FileStorage.__written >= FileStorage.__staged:
+                    self.__flusher.wait()
+                deadline = time.monotonic() + self.__write_behind
+                while not FileStorage.__hurry and \
+                        FileStorage.__written < FileStorage.__staged and \
+                        time.monotonic() < deadline:
+                    self.__flusher.wait(deadline - time.monotonic())
+                FileStorage.__hurry = False
+            try:
+                self.flush()
+            except Exception:
+                # e.g. a full disk: the changes stay staged, to be written
+                # by the next attempt or by flush(), which raises
+                time.sleep(self.__write_behind)
+
+    def __stage(self):
+        """moves the pending changes to the next group commit"""
+        for key in self.__pending:
+            self.__dirty.add(key.partition(".")[0])
+        if self.__journal:
+            for key, obj in self.__pending.items():
+                if obj is None:
+                    self.__records.append(["-", key])
+                elif key in self.__changes:
+                    record = self.__record(key, obj)
+                    self.__records.append(["~", key, {
+                        attr: record[attr] for attr in self.__changes[key]
+                        if attr in record}])
+                else:
+                    self.__records.append(["+", key, self.__record(key, obj)])
+        self.__inflight.update(self.__pending)
+        self.__pending.clear()
+        self.__changes.clear()
+
+    def __flush(self):
+        """
+        writes the staged changes to disk
+
+        Returns:
+            int - Ticket of the last save() whose changes were written
+        """
+        with self.__io, self.__locked(True):
+            if self.__shared:
+                self.reload()
+            if not self.__journal:
+                return self.compact()
+            log = self.__journal_file()
+            with self.__lock.writing():
+                written = FileStorage.__staged
+                records = self.__records
+                FileStorage.__records = []
+                self.__inflight.clear()
+            fresh = self.__stamp() == FileStorage.__signature
+            log.append(records)
+            if log.size() > self.__journal_limit:
+                self.compact()
+            elif fresh:
+                self.__sign()
+            return written
+
+    def compact(self):
+        """
+        writes __objects to __file_path and empties the journal
+
+        In sharded mode only the files of the classes changed since they
+        were last written are rewritten. Each file is replaced atomically
+        by a fsync'd temporary file. When other processes share the files,
+        their changes are read first, with the files locked.
+
+        Returns:
+            int - Ticket of the last save() whose changes were written
+        """
+        with self.__io, self.__locked(True):
+            if self.__shared:
+                self.reload()
+            with self.__lock.writing():
+                written = FileStorage.__staged
+                self.__inflight.clear()
+                indexed = self.__format.name == "indexed"
+                if self.__snapshots and not indexed:
+                    self.__unmap()
+                contents = {}
+                if self.__sharded:
+                    for name in self.__dirty:
+                        contents[self.__shard(name)] = self.__collect(
+                            self.__shard(name), self.__classes.get(name, {}))
+                else:
+                    contents[self.__file_path] = self.__collect(
+                        self.__file_path, self.__objects)
+                self.__dirty.clear()
+            for path, json_objects in contents.items():
+                self.__write(path, json_objects)
+            if indexed:
+                with self.__lock.writing():
+                    self.__swap(list(contents))
+            self.__journal_file().truncate()
+            self.__sign()
+            return written
+
+    def __collect(self, path, objs):
+        """
+        returns the records to write to path: those of objs, then those
+        of the snapshot mapped from path that are not in __objects
+
+        The mapped records are left encoded, to be copied as they are.
+        """
+        json_objects = {key: self.__record(key, obj)
+                        for key, obj in objs.items()}
+        snap = self.__snapshots.get(path)
+        if snap is not None:
+            for key, data in snap.items(raw=True):
+                if key not in json_objects and key not in self.__hidden:
+                    json_objects[key] = data
+        return json_objects
+
+    def __swap(self, paths):
+        """
+        maps the indexed snapshots just written to paths
+
+        They replace the snapshots mapped before, and the raw records of
+        their classes are dropped from __objects: they are in the files.
+        """
+        for path in paths:
+            old = self.__snapshots.get(path)
+            self.__snapshots[path] = Snapshot(path)
+            if old is not None:
+                old.close()
+        FileStorage.__hidden = set()
+        for key in self.__deleted():
+            self.__hide(key)
+        for name in list(self.__classes):
+            if self.__home(name) in paths:
+                self.__pulled.discard(name)
+                FileStorage.__selected = {selected for selected in
+                                          self.__selected
+                                          if selected[0] != name}
+                for key in [key for key, obj in self.__classes[name].items()
+                            if type(obj) is dict]:
+                    self.__drop(key)
+
+    def __unmap(self):
+        """copies what is left in the mapped snapshots and unmaps them"""
+        self.__fetch()
+        for snap in self.__snapshots.values():
+            snap.close()
+        FileStorage.__snapshots = {}
+        FileStorage.__hidden = set()
+        FileStorage.__pulled = set()
+        FileStorage.__selected = set()
+
+    def __write(self, path, json_objects):
+        """atomically replaces the file at path with json_objects"""
+        tmp = "{}.{}.tmp".format(path, os.getpid())
+        with open(tmp, "wb") as f:
+            f.write(self.__format.dumps(json_objects))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+
+    def __shard(self, name):
+        """returns the path of the file holding the objects of a class"""
+        root, ext = os.path.splitext(self.__file_path)
+        return "{}.{}{}".format(root, name, ext)
+
+    def __sign(self):
+        """records the signature of the files this process just wrote"""
+        FileStorage.__signature = self.__stamp()
+        if self.__shared:
+            FileStorage.__generation = self.__file_lock().bump()
+
+    def __file_lock(self):
+        """returns the FileLock kept next to __file_path"""
+        path = self.__file_path + ".lock"
+        if FileStorage.__flock is None or FileStorage.__flock.path != path:
+            FileStorage.__flock = FileLock(path)
+        return FileStorage.__flock
+
+    def __locked(self, exclusive=False):
+        """
+        returns a context holding the lock on the files for reading, or
+        writing, when other processes share them
+        """
+        if not self.__shared:
+            return nullcontext()
+        if exclusive:
+            return self.__file_lock().exclusive()
+        return self.__file_lock().shared()
+
+    def __unsaved(self, key):
+        """tells whether key has changes not written to disk yet"""
+        return key in self.__pending or key in self.__inflight
+
+    def __deleted(self):
+        """returns the keys deleted since they were last written to disk"""
+        return [key for changes in (self.__inflight, self.__pending)
+                for key, obj in changes.items() if obj is None]
+
+    def __home(self, name):
+        """returns the path of the file the objects of a class are kept in"""
+        if self.__sharded:
+            return self.__shard(name)
+        return self.__file_path
+
+    def __paths(self):
+        """returns the paths of the files holding the objects"""
+        if self.__sharded:
+            return [self.__shard(name) for name in classes]
+        return [self.__file_path]
+
+    @staticmethod
+    def __read(paths):
+        """
+        parses the files at paths, in parallel when there are several
+
+        Returns:
+            list - One dictionary per path ({} for a missing file), or
+                   None if any of them could not be read
+        """
+        def load(path):
+            """returns the content of one file, in any format"""
+            try:
+                with open(path, "rb") as f:
+                    return serializers.loads(f.read())
+            except FileNotFoundError:
+                return {}
+        try:
+            if len(paths) > 1:
+                with ThreadPoolExecutor() as pool:
+                    return list(pool.map(load, paths))
+            return [load(path) for path in paths]
+        except Exception:
+            return None
+
+    def __spread(self, paths, timings):
+        """
+        parses the files at paths and builds their objects on __workers
+        processes, each taking ranges of records
+
+        Parameters:
+            paths(list) - The files to read.
+            timings(dict) - Where to add the seconds spent in each phase:
+                            "split" to cut the files in ranges, "load" until
+                            every object is back, and the "decode" and
+                            "build" time of the workers, summed up.
+
+        Returns:
+            list - The (key, object) pairs of each range, or None if any
+                   of the files could not be read
+        """
+        began = time.perf_counter()
+        sizes = []
+        for path in paths:
+            try:
+                sizes.append(os.path.getsize(path))
+            except OSError:
+                sizes.append(0)
+        # a few ranges per worker, so that a slow one holds up less
+        target = max(sum(sizes) // (self.__workers * 4), 1024 * 1024)
+        ranges = []
+        try:
+            for path, size in zip(paths, sizes):
+                ranges += [(path, start, stop) for start, stop in
+                           parallel.split(path, classes, -(-size // target))]
+            timings["split"] = time.perf_counter() - began
+            began = time.perf_counter()
+            results = parallel.spread(ranges, classes, self.__workers)
+        except (OSError, ValueError):
+            return None
+        if results is None:
+            return None
+        timings["load"] = time.perf_counter() - began
+        timings["decode"] = sum(result[1] for result in results)
+        timings["build"] = sum(result[2] for result in results)
+        return [result[0] for result in results]
+
+    def timings(self):
+        """
+        returns the seconds spent in each phase of the last reload() that
+        read the files: "read" or, on a pool of workers, "split", "load",
+        "decode" and "build", then "merge" and "total"
+        """
+        return dict(self.__timings)
+
+    def __record(self, key, obj):
+        """returns the dictionary written to disk for obj, cached"""
+        if type(obj) is dict:
+            return obj
+        record = self.__cache.get(key)
+        if record is None:
+            record = obj.to_dict()
+            self.__cache[key] = record
+        return record
+
+    def __build(self, record):
+        """returns the object to store for a record read from disk"""
+        if self.__lazy or type(record) is not dict:
+            return record
+        return classes[record["__class__"]](**record)
+
+    def __journal_file(self):
+        """returns the Journal kept next to __file_path"""
+        path = self.__file_path + ".log"
+        if FileStorage.__log is None or FileStorage.__log.path != path:
+            FileStorage.__log = Journal(path)
+        return FileStorage.__log
+
+    def get(self, cls, id, expand=None):
         """
         Get an object by its class and id from the current database session
 
         Parameters:
-            cls(class) - The class to be queried.
+            cls(class or str) - The class, or class name, to be queried.
             id(int) - The id of the record to be returned.
+            expand(str or list) - Ignored, see all().
 
         Returns:
            obj - The object queried or None otherwise
         """
-        key = f"{cls.__name__}.{id}"
-        return self.__objects.get(key, None)
+        key = f"{self.__name(cls)}.{id}"
+        with self.__lock.reading():
+            obj = self.__load(key)
+            snap = self.__snapshot(key)
+            if obj is not None or snap is None or key not in snap or \
+                    key in self.__hidden:
+                return obj
+        with self.__lock.writing():
+            self.__pull(key)
+            return self.__load(key)
+
+    def get_many(self, cls, ids):
+        """
+        Get the objects of a class with the given ids
+
+        Parameters:
+            cls(class or str) - The class, or class name, to be queried.
+            ids(iterable) - The ids of the records to be returned.
+
+        Returns:
+            list - The objects found, in the order of ids
+        """
+        objs = (self.get(cls, id) for id in dict.fromkeys(ids))
+        return [obj for obj in objs if obj is not None]
 
     def count(self, cls=None):
         """
         Counts the number of objects in storage
 
         Paramters:
-            cls(class, default=None) - The class to be queried.
+            cls(class or str, default=None) - The class to be queried.
 
         Returns:
             int - Number of records found
         """
-        if cls is not None:
-            return sum(
-                1
-                for key in self.__objects
-                if key.startswith(cls.__name__ + ".")
-            )
-        else:
-            return len(self.__objects)
+        with self.__lock.reading():
+            if cls is not None:
+                return self.__count(self.__name(cls))
+            elif self.__snapshots:
+                return sum(self.__count(name)
+                           for name in set(classes) | set(self.__classes))
+            else:
+                return len(self.__objects)
+
+    def __count(self, name):
+        """returns the number of objects of a class, mapped ones included"""
+        objs = self.__classes.get(name, {})
+        snap = self.__snapshots.get(self.__home(name))
+        if snap is None or name in self.__pulled:
+            return len(objs)
+        return (len(objs) + snap.count(name + ".") -
+                sum(1 for key in objs if key in snap) -
+                sum(1 for key in self.__hidden
+                    if key.partition(".")[0] == name))
 
     def reload(self):
-        """deserializes the JSON file to __objects"""
-        try:
-            with open(self.__file_path, "r") as f:
-                jo = json.load(f)
-            for key in jo:
-                self.__objects[key] = classes[jo[key]["__class__"]](**jo[key])
-        except:
-            pass
+        """
+        deserializes the JSON file to __objects
+
+        Nothing is read when the files and the journal still carry the
+        signature seen at the last reload/save. When only the journal grew,
+        just the new records are replayed; otherwise the files that changed
+        are parsed and only the objects whose record differs are rebuilt.
+        Objects with unsaved changes are left untouched.
+        """
+        with self.__io, self.__locked():
+            log = self.__journal_file()
+            paths = self.__paths()
+            stamp = self.__stamp()
+            seen = FileStorage.__signature
+            generation = None
+            if self.__shared:
+                generation = self.__file_lock().generation()
+            if generation != FileStorage.__generation and stamp == seen:
+                # rewritten with the same size, inode and time
+                seen = None
+            elif stamp == seen:
+                return
+            if seen is not None and len(seen) == len(stamp) and \
+                    stamp[:-1] == seen[:-1] and stamp[-1] is not None:
+                records = list(log.replay(log.offset))
+                with self.__lock.writing():
+                    for rec in records:
+                        self.__replay(rec)
+                FileStorage.__signature = self.__stamp()
+                FileStorage.__generation = generation
+                return
+            changed = [i for i in range(len(paths)) if seen is None or
+                       len(seen) != len(stamp) or stamp[i] != seen[i]]
+            snapshots = self.__open(paths, changed)
+            if snapshots is not None and (snapshots or self.__snapshots):
+                records = list(log.replay())
+                with self.__lock.writing():
+                    self.__remap(snapshots, records)
+                FileStorage.__signature = self.__stamp()
+                FileStorage.__generation = generation
+                return
+            began = time.perf_counter()
+            timings = {}
+            if self.__workers > 1 and not self.__lazy and \
+                    not self.__objects and not self.__snapshots:
+                loaded = self.__spread([paths[i] for i in changed], timings)
+            else:
+                # big files are streamed in, the others are parsed whole
+                big = [i for i in changed if stamp[i] is not None and
+                       stamp[i][1] >= self.__stream_size]
+                loaded = self.__read([paths[i] for i in changed
+                                      if i not in big])
+                if loaded is not None:
+                    loaded = [content.items() for content in loaded]
+                    loaded += [serializers.iterload(paths[i]) for i in big]
+                timings["read"] = time.perf_counter() - began
+            if loaded is None:
+                return
+            records = list(log.replay())
+            merging = time.perf_counter()
+            with self.__lock.writing():
+                if self.__snapshots:
+                    self.__unmap()
+                try:
+                    self.__merge(changed, loaded, records)
+                except Exception:
+                    # a file streamed in turned out unreadable: the next
+                    # reload tries again
+                    return
+            timings["merge"] = time.perf_counter() - merging
+            timings["total"] = time.perf_counter() - began
+            FileStorage.__timings = timings
+            FileStorage.__signature = self.__stamp()
+            FileStorage.__generation = generation
+
+    def __open(self, paths, changed):
+        """
+        maps the files at paths, reusing the snapshots of unchanged ones
+
+        Returns:
+            dict - path -> Snapshot for each file there is, or None if
+                   any of them is not an indexed snapshot
+        """
+        snapshots = {}
+        for i, path in enumerate(paths):
+            if i not in changed and path in self.__snapshots:
+                snapshots[path] = self.__snapshots[path]
+                continue
+            try:
+                snapshots[path] = Snapshot(path)
+            except FileNotFoundError:
+                continue
+            except (OSError, ValueError):
+                for path, snap in snapshots.items():
+                    if self.__snapshots.get(path) is not snap:
+                        snap.close()
+                return None
+        return snapshots
+
+    def __remap(self, snapshots, records):
+        """
+        switches to newly mapped snapshots, with the journal on top
+
+        Objects whose record did not change are kept, raw records are
+        dropped: they are copied again from the snapshots when needed.
+        """
+        old = self.__snapshots
+        FileStorage.__snapshots = snapshots
+        FileStorage.__hidden = set()
+        FileStorage.__pulled = set()
+        FileStorage.__selected = set()
+        jo = {}
+        for rec in records:
+            op, key = rec[0], rec[1]
+            self.__dirty.add(key.partition(".")[0])
+            if op == "+":
+                jo[key] = rec[2]
+            elif op == "-":
+                jo[key] = None
+            else:
+                snap = self.__snapshot(key)
+                record = jo[key] if key in jo else \
+                    snap.get(key) if snap is not None else None
+                if record is not None:
+                    jo[key] = dict(record, **rec[2])
+        for key, obj in list(self.__objects.items()):
+            if key in jo or self.__unsaved(key):
+                continue
+            if type(obj) is dict:
+                self.__drop(key)
+            else:
+                snap = self.__snapshot(key)
+                self.__apply(key, snap.get(key) if snap is not None else None)
+        for key, record in jo.items():
+            self.__apply(key, record)
+        for key in self.__deleted():
+            self.__hide(key)
+        for path, snap in old.items():
+            if snapshots.get(path) is not snap:
+                snap.close()
+
+    def __merge(self, changed, loaded, records):
+        """
+        brings __objects in line with the files that were read again
+
+        Records are applied as the files yield them, the journal on top,
+        so that a file streamed in is never held whole in memory.
+
+        Parameters:
+            changed(list) - Indexes in __paths() of the files read again.
+            loaded(list) - The (key, record) pairs of each of those files,
+                           or of each range of records built on the pool.
+            records(list) - Every record of the journal.
+        """
+        jo = {}
+        patches = {}
+        scope = None
+        if self.__sharded:
+            scope = {list(classes)[i] for i in changed}
+        for rec in records:
+            if scope is None or rec[1].partition(".")[0] in scope:
+                self.__replay(rec, jo, patches)
+            else:
+                self.__replay(rec)
+        seen = set()
+        for pairs in loaded:
+            for key, record in pairs:
+                if key not in jo:
+                    if key in patches:
+                        if type(record) is not dict:
+                            # built by a worker of the pool
+                            record = record.to_dict()
+                        record = dict(record, **patches[key])
+                    self.__apply(key, record)
+                    seen.add(key)
+        for key, record in jo.items():
+            if record is not None:
+                self.__apply(key, record)
+                seen.add(key)
+        if scope is None:
+            keys = list(self.__objects)
+        else:
+            keys = [key for name in scope
+                    for key in self.__classes.get(name, {})]
+        for key in keys:
+            if key not in seen:
+                self.__apply(key, None)
+
+    def __replay(self, rec, jo=None, patches=None):
+        """
+        applies a journal record to __objects, or folds it into jo and
+        patches when the files it applies to are being read again
+
+        "+" records carry a full object, "~" records only the attributes
+        that changed and "-" records a deletion.
+
+        Parameters:
+            rec(list) - The journal record.
+            jo(dict) - The records replacing those of the files, None for
+                       a deletion.
+            patches(dict) - The attributes to change on records of the
+                            files.
+        """
+        op, key = rec[0], rec[1]
+        self.__dirty.add(key.partition(".")[0])
+        if jo is not None:
+            if op != "~":
+                jo[key] = rec[2] if op == "+" else None
+                patches.pop(key, None)
+            elif key not in jo:
+                patches[key] = dict(patches.get(key, {}), **rec[2])
+            elif jo[key] is not None:
+                jo[key] = dict(jo[key], **rec[2])
+        elif op == "+":
+            self.__apply(key, rec[2])
+        elif op == "-":
+            self.__apply(key, None)
+        elif not self.__unsaved(key) and self.__pull(key) is not None:
+            record = dict(self.__record(key, self.__objects[key]), **rec[2])
+            self.__put(key, self.__build(record))
+
+    def __apply(self, key, record):
+        """brings __objects[key] in line with a record read from disk"""
+        if self.__unsaved(key):
+            return
+        if record is None:
+            self.__drop(key)
+            self.__hide(key)
+            return
+        obj = self.__objects.get(key)
+        if obj is not None and self.__record(key, obj) == record:
+            return
+        self.__put(key, self.__build(record))
+
+    def __stamp(self):
+        """returns the (mtime, size, inode) of the files and the journal"""
+        stamp = []
+        for path in self.__paths() + [self.__journal_file().path]:
+            try:
+                st = os.stat(path)
+                stamp.append((st.st_mtime_ns, st.st_size, st.st_ino))
+            except OSError:
+                stamp.append(None)
+        return tuple(stamp)
 
     def delete(self, obj=None):
         """delete obj from __objects if it’s inside"""
         if obj is not None:
-            key = obj.__class__.__name__ + "." + obj.id
-            if key in self.__objects:
-                del self.__objects[key]
+            with self.__lock.writing():
+                self.__remove(obj.__class__.__name__ + "." + obj.id)
+
+    def delete_many(self, objs, cls=None):
+        """
+        deletes each of objs from __objects, taking the lock once
+
+        Parameters:
+            objs(iterable) - The objects, or their ids when cls is given.
+            cls(class or str) - The class of the objects with those ids.
+        """
+        if cls is None:
+            keys = [obj.__class__.__name__ + "." + obj.id for obj in objs]
+        else:
+            keys = [self.__name(cls) + "." + id for id in objs]
+        with self.__lock.writing():
+            for key in keys:
+                self.__remove(key)
+
+    def __remove(self, key):
+        """removes the object under key and queues it for the next save()"""
+        if self.__pull(key) is not None:
+            self.__drop(key)
+            self.__hide(key)
+            self.__pending[key] = None
+            self.__changes.pop(key, None)
 
     def close(self):
-        """call reload() method for deserializing the JSON file to objects"""
+        """call reload() to pick up changes other processes made on disk"""
         self.reload()
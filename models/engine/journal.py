@@ -0,0 +1,82 @@
+#!/usr/bin/python3
+"""
+Contains the Journal class
+"""
+
+import json
+import os
+
+
+class Journal:
+    """append-only log of the changes made on top of a FileStorage snapshot
+
+    Every record is a compact JSON array on its own line:
+        ["+", "<class name>.id", {...to_dict()...}]   object added/updated
+        ["~", "<class name>.id", {attribute: value}]  attributes updated
+        ["-", "<class name>.id"]                     object deleted
+    """
+
+    def __init__(self, path):
+        """Instantiate a Journal stored at path"""
+        self.path = path
+        # int - byte offset right after the last complete record read
+        self.offset = 0
+
+    def append(self, records):
+        """
+        appends the given records to the log, one line per record
+
+        offset only moves past them when nobody else appended since the
+        last replay, so foreign records are still picked up by a replay.
+        """
+        if not records:
+            return
+        lines = [json.dumps(rec, separators=(",", ":")) for rec in records]
+        with open(self.path, "a") as f:
+            start = f.tell()
+            f.write("\n".join(lines) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+            if start == self.offset:
+                self.offset = f.tell()
+
+    def replay(self, offset=0):
+        """
+        Yields the records written to the log after offset
+
+        A torn last line (crash in the middle of an append) is dropped
+        and cut from the file so that later appends stay readable.
+        """
+        try:
+            f = open(self.path, "rb")
+        except FileNotFoundError:
+            self.offset = 0
+            return
+        with f:
+            f.seek(offset)
+            self.offset = offset
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    break
+                if not line.endswith(b"\n"):
+                    break
+                self.offset += len(line)
+                yield rec
+        if self.offset < self.size():
+            with open(self.path, "r+b") as f:
+                f.truncate(self.offset)
+
+    def size(self):
+        """returns the size in bytes of the log, 0 if there is none"""
+        try:
+            return os.path.getsize(self.path)
+        except OSError:
+            return 0
+
+    def truncate(self):
+        """empties the log once its records are part of a snapshot"""
+        if os.path.exists(self.path):
+            open(self.path, "w").close()
+        self.offset = 0
@@ -0,0 +1,160 @@
+#!/usr/bin/python3
+"""
+Contains the ReadWriteLock and FileLock classes
+"""
+
+from contextlib import contextmanager
+import os
+import threading
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+class ReadWriteLock:
+    """lets many threads read at once, or a single thread write
+
+    The writing thread may take the lock again, for reading or writing.
+    Waiting writers go first so that a stream of readers cannot starve
+    them.
+    """
+
+    def __init__(self):
+        """Instantiate an unlocked ReadWriteLock"""
+        self.__cond = threading.Condition(threading.Lock())
+        self.__readers = 0
+        self.__writer = None
+        self.__depth = 0
+        self.__waiting = 0
+
+    def acquire_read(self):
+        """blocks until no thread is writing or waiting to write"""
+        me = threading.get_ident()
+        with self.__cond:
+            if self.__writer == me:
+                self.__depth += 1
+                return
+            while self.__writer is not None or self.__waiting:
+                self.__cond.wait()
+            self.__readers += 1
+
+    def release_read(self):
+        """releases a lock taken by acquire_read()"""
+        with self.__cond:
+            if self.__writer == threading.get_ident():
+                self.__depth -= 1
+                return
+            self.__readers -= 1
+            if self.__readers == 0:
+                self.__cond.notify_all()
+
+    def acquire_write(self):
+        """blocks until no other thread is reading or writing"""
+        me = threading.get_ident()
+        with self.__cond:
+            if self.__writer == me:
+                self.__depth += 1
+                return
+            self.__waiting += 1
+            while self.__writer is not None or self.__readers:
+                self.__cond.wait()
+            self.__waiting -= 1
+            self.__writer = me
+            self.__depth = 1
+
+    def release_write(self):
+        """releases a lock taken by acquire_write()"""
+        with self.__cond:
+            self.__depth -= 1
+            if self.__depth == 0:
+                self.__writer = None
+                self.__cond.notify_all()
+
+    @contextmanager
+    def reading(self):
+        """context manager holding the lock for reading"""
+        self.acquire_read()
+        try:
+            yield self
+        finally:
+            self.release_read()
+
+    @contextmanager
+    def writing(self):
+        """context manager holding the lock for writing"""
+        self.acquire_write()
+        try:
+            yield self
+        finally:
+            self.release_write()
+
+
+class FileLock:
+    """lock shared with other processes through a file, with a counter
+
+    The lock is taken with flock(), for reading (shared) or writing
+    (exclusive), on behalf of the whole process: the threads of a process
+    take turns on their own. Taking it again while it is held only nests,
+    and it cannot be taken for writing while held for reading.
+
+    The file holds the generation of the data it guards, bumped by each
+    writer so that readers can tell whether anything changed.
+    """
+
+    def __init__(self, path):
+        """Instantiate a FileLock on the file at path"""
+        self.path = path
+        self.__fd = None
+        self.__pid = None
+        self.__depth = 0
+
+    def __open(self):
+        """returns the descriptor of the file, opened by this process"""
+        if self.__pid != os.getpid():
+            # a descriptor inherited through fork() shares its lock
+            self.__fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            self.__pid = os.getpid()
+            self.__depth = 0
+        return self.__fd
+
+    def __acquire(self, mode):
+        """blocks until the lock is held in mode"""
+        fd = self.__open()
+        if self.__depth == 0 and fcntl is not None:
+            fcntl.flock(fd, mode)
+        self.__depth += 1
+
+    def __release(self):
+        """releases the lock once the outermost holder is done"""
+        self.__depth -= 1
+        if self.__depth == 0 and fcntl is not None:
+            fcntl.flock(self.__fd, fcntl.LOCK_UN)
+
+    @contextmanager
+    def shared(self):
+        """context manager holding the lock for reading"""
+        self.__acquire(fcntl.LOCK_SH if fcntl is not None else None)
+        try:
+            yield self
+        finally:
+            self.__release()
+
+    @contextmanager
+    def exclusive(self):
+        """context manager holding the lock for writing"""
+        self.__acquire(fcntl.LOCK_EX if fcntl is not None else None)
+        try:
+            yield self
+        finally:
+            self.__release()
+
+    def generation(self):
+        """returns the generation stored in the file, 0 for a new file"""
+        return int(os.pread(self.__open(), 20, 0) or 0)
+
+    def bump(self):
+        """increments the generation, with the lock held for writing"""
+        generation = self.generation() + 1
+        os.pwrite(self.__open(), str(generation).encode(), 0)
+        return generation
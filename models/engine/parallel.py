@@ -0,0 +1,220 @@
+#!/usr/bin/python3
+"""
+Contains the functions FileStorage uses to reload its files on a pool of
+processes
+
+A JSON file is cut between the records of its top-level object into
+ranges that the workers parse and build on their own, so that a single big
+file is spread over the pool as well as the shards. Each record starts with
+its key, '"<class name>.<id>":', right after the opening brace or a comma.
+Inside a JSON string every quote is escaped, so that pattern is only found
+at a key; to be safe, the record found there must also carry the class name
+and id its key names. Files in other formats are loaded whole.
+
+The workers are forked, so that they inherit the ranges and classes instead
+of having them pickled: reload() runs while the models package is still
+being imported, and pickling a reference to it from another thread, as a
+pool of processes does, would wait for that import to end. The objects
+come back pickled and are unpickled by the thread that forked the workers.
+"""
+
+import json
+import multiprocessing
+from multiprocessing.connection import wait
+import os
+import pickle
+import re
+import time
+from models.engine import serializers
+
+# int - bytes read at a time while looking for the start of a record
+WINDOW = 64 * 1024
+# int - bytes windows overlap by, so that no key is cut in two
+OVERLAP = 256
+
+
+def pattern(names):
+    """returns the expression matching the key of a record of names"""
+    names = b"|".join(re.escape(name.encode("utf-8")) for name in names)
+    return re.compile(rb'[{,]\s*"((?:' + names + rb')\.[^"\\]{1,200})"\s*:'
+                      rb'\s*(?={)')
+
+
+def check(f, at, key):
+    """tells whether the object at offset at is the record of key"""
+    size = WINDOW
+    decode = json.JSONDecoder().raw_decode
+    while True:
+        f.seek(at)
+        data = f.read(size)
+        try:
+            record = decode(data.decode("utf-8", "ignore"))[0]
+        except ValueError:
+            if len(data) < size:
+                return False
+            size *= 4
+            continue
+        return type(record) is dict and \
+            "{}.{}".format(record.get("__class__"), record.get("id")) == key
+
+
+def boundary(f, at, stop, keys):
+    """
+    returns the offset of the first key of a record at or past at, stop if
+    there is none before it
+    """
+    while at < stop:
+        f.seek(at)
+        data = f.read(min(WINDOW, stop - at))
+        for m in keys.finditer(data):
+            if at + m.end() > stop:
+                break
+            key = m.group(1).decode("utf-8")
+            if check(f, at + m.end(), key):
+                return at + m.start(1) - 1
+        if at + len(data) >= stop:
+            break
+        at += len(data) - OVERLAP
+    return stop
+
+
+def split(path, names, parts):
+    """
+    cuts the file at path into about parts ranges of whole records
+
+    Parameters:
+        path(str) - The file to cut.
+        names(iterable) - The class names the keys may start with.
+        parts(int) - The number of ranges wanted.
+
+    Returns:
+        list - (start, stop) byte ranges, [(None, None)] if the file is not
+               JSON: it is then loaded whole, [] if there is no such file
+    """
+    try:
+        size = os.path.getsize(path)
+    except FileNotFoundError:
+        return []
+    with open(path, "rb") as f:
+        head = f.read(OVERLAP)
+        if parts < 2 or not head.lstrip().startswith(b"{"):
+            return [(None, None)]
+        f.seek(max(0, size - OVERLAP))
+        tail = f.read()
+        if not tail.rstrip().endswith(b"}"):
+            return [(None, None)]
+        start = len(head) - len(head.lstrip()) + 1
+        stop = size - (len(tail) - len(tail.rstrip())) - 1
+        keys = pattern(names)
+        cuts = [start]
+        for i in range(1, parts):
+            at = start + (stop - start) * i // parts
+            if at > cuts[-1]:
+                cuts.append(boundary(f, at, stop, keys))
+        cuts.append(stop)
+    return [(lo, hi) for lo, hi in zip(cuts, cuts[1:]) if lo < hi]
+
+
+def load(path, start, stop, classes):
+    """
+    parses the records of a range of the file at path, the whole file when
+    start is None, and builds their objects
+
+    Parameters:
+        path(str) - The file to read.
+        start(int) - The offset of the first record of the range.
+        stop(int) - The offset past its last record.
+        classes(dict) - The classes to build, by name.
+
+    Returns:
+        tuple - The list of (key, object) pairs, then the seconds spent
+                decoding and building them
+    """
+    began = time.perf_counter()
+    with open(path, "rb") as f:
+        if start is None:
+            records = serializers.loads(f.read())
+        else:
+            f.seek(start)
+            data = f.read(stop - start).rstrip()
+            if data.endswith(b","):
+                data = data[:-1]
+            records = serializers.loads(b"{" + data + b"}")
+    decoded = time.perf_counter()
+    objs = [(key, classes[record["__class__"]](**record))
+            for key, record in records.items()]
+    return objs, decoded - began, time.perf_counter() - decoded
+
+
+def work(ranges, classes, conn):
+    """
+    loads ranges of records in a worker and sends what load() returned for
+    each of them on conn, pickled, or None if any could not be read
+
+    Parameters:
+        ranges(list) - The (index, path, start, stop) of each range.
+        classes(dict) - The classes to build, by name.
+        conn(Connection) - The end of the pipe to the parent process.
+    """
+    try:
+        results = [(i, load(path, start, stop, classes))
+                   for i, path, start, stop in ranges]
+    except Exception:
+        results = None
+    conn.send_bytes(pickle.dumps(results, pickle.HIGHEST_PROTOCOL))
+    conn.close()
+
+
+def spread(ranges, classes, workers):
+    """
+    loads ranges of records on forked worker processes
+
+    Parameters:
+        ranges(list) - The (path, start, stop) of each range.
+        classes(dict) - The classes to build, by name.
+        workers(int) - The number of processes to fork at most.
+
+    Returns:
+        list - What load() returned for each range, in order, or None if
+               any of them could not be read
+    """
+    sizes = [(stop or os.path.getsize(path)) - (start or 0)
+             for path, start, stop in ranges]
+    # the biggest ranges first, each to the least loaded worker
+    shares = [[0, []] for i in range(min(workers, len(ranges)))]
+    for i in sorted(range(len(ranges)), key=lambda i: -sizes[i]):
+        share = min(shares, key=lambda share: share[0])
+        share[0] += sizes[i]
+        share[1].append((i,) + ranges[i])
+    context = multiprocessing.get_context("fork")
+    procs = {}
+    for size, share in shares:
+        reader, writer = context.Pipe(duplex=False)
+        proc = context.Process(target=work, args=(share, classes, writer),
+                               daemon=True)
+        proc.start()
+        writer.close()
+        procs[reader] = proc
+    results = [None] * len(ranges)
+    failed = False
+    try:
+        while procs:
+            for reader in wait(list(procs)):
+                try:
+                    done = pickle.loads(reader.recv_bytes())
+                except Exception:
+                    # the worker died before sending its objects
+                    done = None
+                reader.close()
+                procs.pop(reader).join()
+                if done is None:
+                    failed = True
+                else:
+                    for i, result in done:
+                        results[i] = result
+    finally:
+        for reader, proc in procs.items():
+            proc.kill()
+            proc.join()
+            reader.close()
+    return None if failed else results
@@ -0,0 +1,164 @@
+#!/usr/bin/python3
+"""
+Contains the class PoolMetrics, which DBStorage uses to count and time the
+connections of its pool
+
+The pool of the engine is a subclass of its usual class whose checkouts
+are timed: that is how long a request waits for a connection once every
+one of them is checked out. Connections opened, checked out and in are
+counted through the pool events of the engine.
+"""
+
+from bisect import bisect_left
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError
+import threading
+import time
+
+
+class TimedPool:
+    """mixin timing how long the checkouts of a pool wait"""
+
+    # PoolMetrics - where the times are recorded
+    metrics = None
+
+    def _do_get(self):
+        """returns a connection of the pool, timing the wait for it"""
+        began = time.perf_counter()
+        try:
+            return super()._do_get()
+        except TimeoutError:
+            self.metrics.timed_out()
+            raise
+        finally:
+            self.metrics.waited(time.perf_counter() - began)
+
+
+class PoolMetrics:
+    """counts the connections of the pool of an engine and times them"""
+
+    # tuple - upper bounds, in seconds, of the buckets of the wait histogram
+    buckets = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+    def __init__(self):
+        """Instantiate a PoolMetrics object"""
+        self.__lock = threading.Lock()
+        # thread local - when the connection being opened was asked for,
+        # and the seconds spent opening connections during a checkout
+        self.__local = threading.local()
+        self.__engine = None
+        self.__waits = [0] * (len(self.buckets) + 1)
+        self.__wait_sum = 0.0
+        self.__wait_max = 0.0
+        self.__timeouts = 0
+        self.__connects = 0
+        self.__connect_sum = 0.0
+        self.__connect_max = 0.0
+        self.__checkouts = 0
+        self.__checked_out = 0
+        self.__peak = 0
+        self.__invalidated = 0
+
+    def poolclass(self, base):
+        """returns the subclass of the pool class base timing its waits"""
+        return type("Timed" + base.__name__, (TimedPool, base),
+                    {"metrics": self})
+
+    def watch(self, engine):
+        """counts the connections of the pool of engine from now on"""
+        self.__engine = engine
+        event.listen(engine, "do_connect", self.__connecting)
+        event.listen(engine, "connect", self.__connected)
+        event.listen(engine, "checkout", self.__checkout)
+        event.listen(engine, "checkin", self.__checkin)
+        event.listen(engine, "invalidate", self.__invalidate)
+
+    def __connecting(self, dialect, record, cargs, cparams):
+        """notes when a new connection is asked for"""
+        self.__local.began = time.perf_counter()
+
+    def __connected(self, connection, record):
+        """records how long the new connection took to open"""
+        began = getattr(self.__local, "began", None)
+        if began is None:
+            return
+        self.__local.began = None
+        latency = time.perf_counter() - began
+        # not part of the wait of the checkout opening it
+        self.__local.connecting = getattr(self.__local, "connecting", 0.0) \
+            + latency
+        with self.__lock:
+            self.__connects += 1
+            self.__connect_sum += latency
+            self.__connect_max = max(self.__connect_max, latency)
+
+    def __checkout(self, connection, record, proxy):
+        """counts a connection leaving the pool"""
+        with self.__lock:
+            self.__checkouts += 1
+            self.__checked_out += 1
+            self.__peak = max(self.__peak, self.__checked_out)
+
+    def __checkin(self, connection, record):
+        """counts a connection back in the pool"""
+        with self.__lock:
+            self.__checked_out -= 1
+
+    def __invalidate(self, connection, record, exception):
+        """counts a connection dropped, e.g. found dead by a pre-ping"""
+        with self.__lock:
+            self.__invalidated += 1
+
+    def waited(self, seconds):
+        """records the wait of a checkout"""
+        seconds = max(0.0, seconds - getattr(self.__local, "connecting", 0.0))
+        self.__local.connecting = 0.0
+        with self.__lock:
+            self.__waits[bisect_left(self.buckets, seconds)] += 1
+            self.__wait_sum += seconds
+            self.__wait_max = max(self.__wait_max, seconds)
+
+    def timed_out(self):
+        """counts a checkout that gave up waiting"""
+        with self.__lock:
+            self.__timeouts += 1
+
+    def stats(self):
+        """
+        returns the state of the pool and what was counted so far
+
+        Returns:
+            dict - The connections checked out now and at most, the
+                   overflow and size of the pool when it has them, then
+                   the counts, total and highest seconds of the checkout
+                   waits (in a histogram of buckets by upper bound) and of
+                   the connections opened
+        """
+        pool = self.__engine.pool if self.__engine is not None else None
+        with self.__lock:
+            stats = {
+                "pool": type(pool).__name__ if pool is not None else None,
+                "checked_out": self.__checked_out,
+                "checked_out_peak": self.__peak,
+                "checkouts": self.__checkouts,
+                "invalidated": self.__invalidated,
+                "wait": {
+                    "count": sum(self.__waits),
+                    "sum": self.__wait_sum,
+                    "max": self.__wait_max,
+                    "timeouts": self.__timeouts,
+                    "histogram": [
+                        [bound, count] for bound, count in
+                        zip(self.buckets + (None,), self.__waits)],
+                },
+                "connect": {
+                    "count": self.__connects,
+                    "sum": self.__connect_sum,
+                    "max": self.__connect_max,
+                },
+            }
+        if hasattr(pool, "overflow"):
+            stats["size"] = pool.size()
+            stats["checked_in"] = pool.checkedin()
+            stats["overflow"] = max(0, pool.overflow())
+        return stats
@@ -0,0 +1,68 @@
+#!/usr/bin/python3
+"""
+Contains the criteria understood by the filter() method of the storage
+engines
+
+A criterion is a keyword argument, <attribute>=<value> for equality or
+<attribute>__<operator>=<value> for one of the operators below, e.g.
+storage.filter(Place, city_id=city.id, price_by_night__lte=100).
+"""
+
+import operator
+
+# dictionary - the operators of the criteria, applied as op(attribute, value)
+operators = {
+    "eq": operator.eq,
+    "ne": operator.ne,
+    "lt": operator.lt,
+    "lte": operator.le,
+    "gt": operator.gt,
+    "gte": operator.ge,
+    "in": lambda attr, values: attr in values,
+}
+
+
+def parse(criteria):
+    """
+    returns the (attribute, operator, value) of each criterion
+
+    Raises:
+        ValueError - if a criterion names an unknown operator
+    """
+    parsed = []
+    for name, value in criteria.items():
+        attr, sep, op = name.rpartition("__")
+        if not sep:
+            attr, op = name, "eq"
+        elif op not in operators:
+            raise ValueError("unknown operator in criterion: {}".format(name))
+        if op == "in":
+            value = list(value)
+        parsed.append((attr, op, value))
+    return parsed
+
+
+def matches(value, op, operand):
+    """tells whether the value of an attribute meets a criterion; a missing
+    value (None) is neither less nor greater than anything"""
+    if value is None and op not in ("eq", "ne", "in"):
+        return False
+    try:
+        return operators[op](value, operand)
+    except TypeError:
+        return False
+
+
+def ordering(order_by):
+    """
+    returns the (attribute, descending) pairs objects are sorted by
+
+    Parameters:
+        order_by(str or list) - Attribute names, each prefixed by "-" to
+                                sort in descending order.
+    """
+    if order_by is None:
+        return []
+    if isinstance(order_by, str):
+        order_by = [order_by]
+    return [(attr.lstrip("-"), attr.startswith("-")) for attr in order_by]
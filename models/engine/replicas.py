@@ -0,0 +1,113 @@
+#!/usr/bin/python3
+"""
+Contains the classes DBStorage uses to send reads to replicas of its
+database
+
+A session reads from a replica, each new session from the next one in
+turn, until it writes: its flushes and INSERT, UPDATE or DELETE
+statements go to the primary, which then serves the rest of the session
+as well, so that it reads what it wrote. Replicas further behind the
+primary than a threshold, or whose lag cannot be read, are skipped until
+they catch up; with none left, reads go to the primary.
+"""
+
+from itertools import count
+from sqlalchemy import Delete, Insert, Update
+from sqlalchemy.orm import Session
+import threading
+import time
+
+
+class Replicas:
+    """the replicas of a database, checked for lag"""
+
+    def __init__(self, engines, lag, max_lag=5.0, interval=1.0):
+        """
+        Instantiate a Replicas object
+
+        Parameters:
+            engines(list) - The engines connecting to the replicas.
+            lag(function) - Returns how many seconds an engine is behind
+                            the primary, None if it is not replicating.
+            max_lag(float) - The most seconds a replica read from may be
+                             behind.
+            interval(float) - The seconds a lag is trusted before being
+                              read again.
+        """
+        self.engines = list(engines)
+        self.__lag = lag
+        self.__max_lag = max_lag
+        self.__interval = interval
+        self.__turn = count()
+        self.__lock = threading.Lock()
+        # dictionary - engine -> (time it was checked, lag)
+        self.__checked = {}
+
+    def __len__(self):
+        """returns the number of replicas"""
+        return len(self.engines)
+
+    def lag(self, engine):
+        """returns the lag of a replica, read again once it is too old,
+        None if it cannot be read"""
+        now = time.monotonic()
+        with self.__lock:
+            checked = self.__checked.get(engine)
+        if checked is not None and now - checked[0] < self.__interval:
+            return checked[1]
+        try:
+            lag = self.__lag(engine)
+        except Exception:
+            lag = None
+        with self.__lock:
+            self.__checked[engine] = (now, lag)
+        return lag
+
+    def healthy(self, engine):
+        """tells whether a replica is close enough behind to be read"""
+        lag = self.lag(engine)
+        return lag is not None and lag <= self.__max_lag
+
+    def pick(self):
+        """returns the next replica in turn that is healthy, None if
+        there is none"""
+        if not self.engines:
+            return None
+        start = next(self.__turn)
+        for i in range(len(self.engines)):
+            engine = self.engines[(start + i) % len(self.engines)]
+            if self.healthy(engine):
+                return engine
+        return None
+
+    def stats(self):
+        """returns the URL (without password), last lag read and health of
+        each replica"""
+        with self.__lock:
+            checked = dict(self.__checked)
+        return [{"url": engine.url.render_as_string(hide_password=True),
+                 "lag": checked.get(engine, (None, None))[1],
+                 "healthy": self.healthy(engine)}
+                for engine in self.engines]
+
+
+class RoutingSession(Session):
+    """session reading from a replica until it writes to its bind, the
+    primary"""
+
+    def __init__(self, replicas=None, **kwargs):
+        """Instantiate a RoutingSession reading from replicas (Replicas)"""
+        super().__init__(**kwargs)
+        self.replicas = replicas
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        """returns the engine a statement or a flush is run on"""
+        if self.info.get("primary") or not self.replicas:
+            return self.bind
+        if self._flushing or isinstance(clause, (Insert, Update, Delete)):
+            # read what was written for the rest of the session
+            self.info["primary"] = True
+            return self.bind
+        if self.info.get("replica") is None:
+            self.info["replica"] = self.replicas.pick() or self.bind
+        return self.info["replica"]
@@ -0,0 +1,254 @@
+#!/usr/bin/python3
+"""
+Contains the serializers FileStorage can write its files with
+
+The format is picked with HBNB_FILE_FORMAT (json, compact, orjson,
+msgpack or indexed). Files are always read back whatever format wrote
+them, and a file can be converted from the command line:
+
+    python3 -m models.engine.serializers file.json file.msgpack msgpack
+"""
+
+import codecs
+import json
+from models.engine import snapshot
+import os
+import re
+import sys
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class JSONSerializer:
+    """stdlib json with its default separators, the historical format"""
+
+    name = "json"
+
+    def dumps(self, obj):
+        """returns obj encoded as bytes"""
+        return json.dumps(obj).encode("utf-8")
+
+    def loads(self, data):
+        """returns the object encoded in data"""
+        return json.loads(data)
+
+
+class CompactJSONSerializer(JSONSerializer):
+    """stdlib json without whitespace nor escaping of non-ASCII text"""
+
+    name = "compact"
+
+    def dumps(self, obj):
+        """returns obj encoded as bytes"""
+        return json.dumps(obj, separators=(",", ":"),
+                          ensure_ascii=False).encode("utf-8")
+
+
+class OrjsonSerializer:
+    """compact JSON through the orjson extension"""
+
+    name = "orjson"
+
+    def dumps(self, obj):
+        """returns obj encoded as bytes"""
+        return orjson.dumps(obj)
+
+    def loads(self, data):
+        """returns the object encoded in data"""
+        return orjson.loads(data)
+
+
+class MsgpackSerializer:
+    """binary MessagePack through the msgpack extension"""
+
+    name = "msgpack"
+
+    def dumps(self, obj):
+        """returns obj encoded as bytes"""
+        return msgpack.packb(obj, use_bin_type=True)
+
+    def loads(self, data):
+        """returns the object encoded in data"""
+        return msgpack.unpackb(data, raw=False)
+
+
+class IndexedSerializer:
+    """records indexed by key, see models/engine/snapshot.py"""
+
+    name = "indexed"
+
+    def dumps(self, obj):
+        """returns obj encoded as bytes"""
+        return snapshot.dumps(obj)
+
+    def loads(self, data):
+        """returns the object encoded in data"""
+        return snapshot.loads(data)
+
+
+serializers = {
+    "json": JSONSerializer,
+    "compact": CompactJSONSerializer,
+    "orjson": OrjsonSerializer,
+    "msgpack": MsgpackSerializer,
+    "indexed": IndexedSerializer,
+}
+
+# extension modules needed by some of the serializers
+requirements = {"orjson": orjson, "msgpack": msgpack}
+
+
+def get_serializer(name):
+    """
+    Returns the serializer registered under name
+
+    Raises:
+        ValueError - if there is no such serializer
+        ImportError - if the module it relies on is not installed
+    """
+    if name not in serializers:
+        raise ValueError("unknown file format: {}".format(name))
+    if name in requirements and requirements[name] is None:
+        raise ImportError("the {} file format needs the {} module"
+                          .format(name, name))
+    return serializers[name]()
+
+
+def loads(data):
+    """returns the object encoded in data by any of the serializers"""
+    if data[:len(snapshot.MAGIC)] == snapshot.MAGIC:
+        return snapshot.loads(data)
+    if data.lstrip()[:1] in (b"{", b"[", b""):
+        if orjson is not None:
+            return orjson.loads(data)
+        return json.loads(data)
+    return get_serializer("msgpack").loads(data)
+
+
+class JSONStream:
+    """reads the JSON values of a file one at a time, a chunk at a time"""
+
+    # regular expression - blanks allowed between JSON tokens
+    blanks = re.compile(r"[ \t\n\r]*")
+
+    def __init__(self, f, size):
+        """Instantiate a JSONStream reading f by chunks of size bytes"""
+        self.__f = f
+        self.__size = size
+        self.__text = codecs.getincrementaldecoder("utf-8")()
+        self.__decode = json.JSONDecoder().raw_decode
+        self.__buf = ""
+        self.__pos = 0
+        self.__eof = False
+
+    def __fill(self):
+        """reads the next chunk, dropping what was parsed; False at EOF"""
+        if self.__eof:
+            return False
+        data = self.__f.read(self.__size)
+        self.__eof = not data
+        self.__buf = self.__buf[self.__pos:] + self.__text.decode(
+            data, final=self.__eof)
+        self.__pos = 0
+        return True
+
+    def peek(self):
+        """returns the next character that is not blank"""
+        while True:
+            self.__pos = self.blanks.match(self.__buf, self.__pos).end()
+            if self.__pos < len(self.__buf):
+                return self.__buf[self.__pos]
+            if not self.__fill():
+                raise ValueError("unexpected end of JSON data")
+
+    def char(self):
+        """returns and consumes the next character that is not blank"""
+        char = self.peek()
+        self.__pos += 1
+        return char
+
+    def value(self):
+        """returns and consumes the next JSON value"""
+        self.peek()
+        while True:
+            try:
+                value, end = self.__decode(self.__buf, self.__pos)
+                # a number at the end of the chunk may go on in the next
+                if end < len(self.__buf) or self.__eof:
+                    self.__pos = end
+                    return value
+            except ValueError:
+                if self.__eof:
+                    raise
+            self.__fill()
+
+
+def iterload(path, size=1 << 20):
+    """
+    Yields the (key, value) pairs of the object in the file at path, in
+    any of the formats, without holding more than one value at a time
+
+    Raises:
+        ValueError - if the file does not hold an object
+    """
+    with open(path, "rb") as f:
+        head = f.read(len(snapshot.MAGIC))
+        f.seek(0)
+        if head == snapshot.MAGIC:
+            snap = snapshot.Snapshot(path)
+            try:
+                yield from snap.items()
+            finally:
+                snap.close()
+        elif head.lstrip()[:1] in (b"{", b"[", b""):
+            stream = JSONStream(f, size)
+            if stream.char() != "{":
+                raise ValueError("not a JSON object")
+            if stream.peek() == "}":
+                return
+            while True:
+                key = stream.value()
+                if stream.char() != ":":
+                    raise ValueError("':' expected in JSON object")
+                yield key, stream.value()
+                char = stream.char()
+                if char == "}":
+                    return
+                if char != ",":
+                    raise ValueError("',' expected in JSON object")
+        else:
+            get_serializer("msgpack")
+            unpacker = msgpack.Unpacker(f, raw=False, read_size=size)
+            for i in range(unpacker.read_map_header()):
+                yield unpacker.unpack(), unpacker.unpack()
+
+
+def convert(src, dst, name):
+    """
+    Rewrites the file at src to dst with the serializer registered as name
+
+    Returns:
+        tuple - The sizes in bytes of src and dst
+    """
+    with open(src, "rb") as f:
+        obj = loads(f.read())
+    data = get_serializer(name).dumps(obj)
+    with open(dst, "wb") as f:
+        f.write(data)
+    return os.path.getsize(src), len(data)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 4 or sys.argv[3] not in serializers:
+        print("Usage: {} <source> <destination> <{}>".format(
+            sys.argv[0], "|".join(serializers)))
+        sys.exit(1)
+    sizes = convert(*sys.argv[1:])
+    print("{}: {} bytes -> {}: {} bytes".format(
+        sys.argv[1], sizes[0], sys.argv[2], sizes[1]))
@@ -0,0 +1,237 @@
+#!/usr/bin/python3
+"""
+Contains the Snapshot class and the indexed snapshot format
+
+An indexed snapshot starts with a table of its records sorted by key, so
+that a single record can be found by binary search and decoded without
+reading the rest of the file:
+
+    magic      8 bytes   b"HBNBIDX1"
+    count      uint64    number of records
+    table      count x (key offset uint64, key length uint32,
+                        record offset uint64, record length uint32)
+    data       the keys and records, each record a compact JSON object
+
+Integers are little-endian and offsets are from the start of the file.
+"""
+
+import json
+import mmap
+import shutil
+import struct
+import tempfile
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+MAGIC = b"HBNBIDX1"
+HEADER = struct.Struct("<8sQ")
+ENTRY = struct.Struct("<QIQI")
+
+
+def encode(record):
+    """returns a record encoded as compact JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(record)
+    return json.dumps(record, separators=(",", ":"),
+                      ensure_ascii=False).encode("utf-8")
+
+
+def decode(data):
+    """returns the record encoded in data"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps(records):
+    """
+    Returns the indexed snapshot of a dictionary of records
+
+    Records already encoded as bytes, e.g. read with Snapshot.raw(), are
+    copied as they are.
+    """
+    entries = sorted((key.encode("utf-8"), record if type(record) is bytes
+                      else encode(record)) for key, record in records.items())
+    pos = HEADER.size + ENTRY.size * len(entries)
+    table = []
+    data = []
+    for key, record in entries:
+        table.append(ENTRY.pack(pos, len(key), pos + len(key), len(record)))
+        data += [key, record]
+        pos += len(key) + len(record)
+    return b"".join([HEADER.pack(MAGIC, len(entries))] + table + data)
+
+
+def dump(pairs, f):
+    """
+    Writes the indexed snapshot of (key, record) pairs to the binary file
+    f, holding only its table in memory
+
+    The pairs must come sorted by key; the records are spooled to a
+    temporary file until the table before them is known.
+    """
+    table = []
+    pos = 0
+    with tempfile.TemporaryFile() as data:
+        for key, record in pairs:
+            key = key.encode("utf-8")
+            if type(record) is not bytes:
+                record = encode(record)
+            table.append((pos, len(key), len(record)))
+            data.write(key)
+            data.write(record)
+            pos += len(key) + len(record)
+        start = HEADER.size + ENTRY.size * len(table)
+        f.write(HEADER.pack(MAGIC, len(table)))
+        for at, key_len, length in table:
+            f.write(ENTRY.pack(start + at, key_len, start + at + key_len,
+                               length))
+        data.seek(0)
+        shutil.copyfileobj(data, f)
+
+
+def loads(data):
+    """returns the dictionary of every record of an indexed snapshot"""
+    count = HEADER.unpack_from(data)[1]
+    records = {}
+    for i in range(count):
+        key_at, key_len, at, length = ENTRY.unpack_from(
+            data, HEADER.size + ENTRY.size * i)
+        key = bytes(data[key_at:key_at + key_len]).decode("utf-8")
+        records[key] = decode(data[at:at + length])
+    return records
+
+
+class Snapshot:
+    """read-only view of an indexed snapshot file, mapped in memory
+
+    Records are decoded one at a time, when asked for; the pages of the
+    file are shared by every process that maps it.
+    """
+
+    def __init__(self, path):
+        """
+        Maps the indexed snapshot at path
+
+        Raises:
+            FileNotFoundError - if there is no file at path
+            ValueError - if the file is not an indexed snapshot
+        """
+        self.path = path
+        with open(path, "rb") as f:
+            self.__map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.__map[:len(MAGIC)] != MAGIC:
+            self.__map.close()
+            raise ValueError("{} is not an indexed snapshot".format(path))
+        self.__count = HEADER.unpack_from(self.__map)[1]
+
+    def __len__(self):
+        """returns the number of records"""
+        return self.__count
+
+    def __contains__(self, key):
+        """tells whether there is a record under key"""
+        return self.__find(key) >= 0
+
+    def __entry(self, i):
+        """returns the (key offset, key length, offset, length) of entry i"""
+        return ENTRY.unpack_from(self.__map, HEADER.size + ENTRY.size * i)
+
+    def __key(self, i):
+        """returns the encoded key of entry i"""
+        at, length = self.__entry(i)[:2]
+        return self.__map[at:at + length]
+
+    def __bisect(self, probe, prefix=False):
+        """
+        returns the first entry whose key is past probe
+
+        Keys equal to probe, or starting with it when prefix is set, are
+        past it only when prefix is not set.
+        """
+        lo, hi = 0, self.__count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            key = self.__key(mid)
+            if prefix:
+                key = key[:len(probe)]
+            if key < probe or prefix and key == probe:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def __find(self, key):
+        """returns the entry holding key, -1 if there is none"""
+        probe = key.encode("utf-8")
+        i = self.__bisect(probe)
+        if i < self.__count and self.__key(i) == probe:
+            return i
+        return -1
+
+    def __range(self, prefix):
+        """returns the first and last + 1 entries whose key has prefix"""
+        probe = prefix.encode("utf-8")
+        return self.__bisect(probe), self.__bisect(probe, True)
+
+    def raw(self, key):
+        """returns the encoded record under key, None if there is none"""
+        i = self.__find(key)
+        if i < 0:
+            return None
+        at, length = self.__entry(i)[2:]
+        return self.__map[at:at + length]
+
+    def get(self, key):
+        """returns the record under key, None if there is none"""
+        data = self.raw(key)
+        if data is None:
+            return None
+        return decode(data)
+
+    def count(self, prefix=""):
+        """returns the number of records whose key starts with prefix"""
+        lo, hi = self.__range(prefix)
+        return hi - lo
+
+    def items(self, prefix="", raw=False):
+        """
+        Yields the (key, record) pairs whose key starts with prefix
+
+        With raw set, the records are left encoded.
+        """
+        lo, hi = self.__range(prefix)
+        for i in range(lo, hi):
+            key_at, key_len, at, length = self.__entry(i)
+            data = self.__map[at:at + length]
+            yield (self.__map[key_at:key_at + key_len].decode("utf-8"),
+                   data if raw else decode(data))
+
+    def select(self, prefix, attr, values):
+        """
+        Yields the (key, record) pairs whose key starts with prefix and
+        whose record holds one of values under attr
+
+        Only the records whose encoded bytes contain one of the values
+        (strings) are decoded, to be compared.
+        """
+        needles = [encode(value) for value in values if type(value) is str]
+        if len(needles) < len(values):
+            needles = None
+        lo, hi = self.__range(prefix)
+        for i in range(lo, hi):
+            key_at, key_len, at, length = self.__entry(i)
+            data = self.__map[at:at + length]
+            if needles is not None and not any(needle in data
+                                               for needle in needles):
+                continue
+            record = decode(data)
+            if record.get(attr) in values:
+                yield (self.__map[key_at:key_at + key_len].decode("utf-8"),
+                       record)
+
+    def close(self):
+        """unmaps the file"""
+        self.__map.close()
@@ -0,0 +1,59 @@
+#!/usr/bin/python3
+"""
+Contains the class SQLiteStorage
+"""
+
+from models.engine.db_storage import DBStorage
+from os import getenv
+from sqlalchemy import create_engine, event
+from sqlalchemy.pool import QueuePool, StaticPool
+
+
+class SQLiteStorage(DBStorage):
+    """interacts with an embedded SQLite database, in WAL mode
+
+    The database file is HBNB_SQLITE_DB (default hbnb.db), or ":memory:"
+    for a private in-memory database. The pool of a file is set up by the
+    HBNB_MYSQL_POOL_* variables as for MySQL. Reads may go to copies of
+    the file, HBNB_SQLITE_REPLICAS, kept in sync by other means.
+    """
+
+    def make_engine(self, url=None, metrics=None):
+        """returns the engine connecting to the SQLite database, or to the
+        replica at url, its pool counted by metrics"""
+        HBNB_SQLITE_DB = getenv("HBNB_SQLITE_DB", "hbnb.db")
+        url = url or "sqlite:///" + HBNB_SQLITE_DB
+        if url == "sqlite:///:memory:":
+            # a single connection, or each one would see its own database
+            options = self.pool_options(StaticPool, metrics)
+        else:
+            options = self.pool_options(QueuePool, metrics)
+        options["connect_args"] = {"check_same_thread": False}
+        engine = create_engine(url, **options)
+        event.listen(engine, "connect", self.configure)
+        return engine
+
+    def replica_urls(self):
+        """returns the URLs of the replicas, the database files of
+        HBNB_SQLITE_REPLICAS separated by commas"""
+        return ["sqlite:///" + path.strip() for path in getenv(
+            "HBNB_SQLITE_REPLICAS", "").split(",") if path.strip()]
+
+    def replica_lag(self, engine):
+        """returns 0: SQLite does not replicate, so how far behind a copy
+        is cannot be read"""
+        return 0.0
+
+    @staticmethod
+    def configure(connection, record):
+        """sets up each new connection to the database"""
+        cursor = connection.cursor()
+        # readers do not block the writer, nor the writer the readers
+        cursor.execute("PRAGMA journal_mode=WAL")
+        # WAL keeps the database consistent without a sync per commit
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        # checked by MySQL, but not by SQLite unless asked to
+        cursor.execute("PRAGMA foreign_keys=ON")
+        # wait for a concurrent writer instead of failing right away
+        cursor.execute("PRAGMA busy_timeout=5000")
+        cursor.close()
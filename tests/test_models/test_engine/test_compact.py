@@ -0,0 +1,196 @@
+#!/usr/bin/python3
+"""
+Contains the TestCompactDocs and TestCompact classes
+"""
+
+import inspect
+import json
+from models.engine import compact
+from models.engine import serializers
+from models.engine.locks import FileLock
+import os
+import pep8
+import subprocess
+import sys
+import tempfile
+import unittest
+
+
+def record(cls, id, **attrs):
+    """Returns the record of an object"""
+    return dict(attrs, __class__=cls, id=id,
+                created_at="2017-09-28T21:03:54.052298",
+                updated_at="2017-09-28T21:03:54.052298")
+
+
+records = {
+    "State.s2": record("State", "s2", name="Nevada"),
+    "State.s1": record("State", "s1", name="California"),
+    "City.c1": record("City", "c1", state_id="s1", name="Fremont"),
+    "City.c2": record("City", "c2", state_id="s2", name="Reno"),
+    "User.u1": record("User", "u1", email="a@b.c"),
+    "Place.p1": record("Place", "p1", city_id="c2", user_id="u1"),
+    "Review.r1": record("Review", "r1", place_id="p1", user_id="u1"),
+    "Review.r2": record("Review", "r2", place_id="p9", user_id="u1"),
+}
+
+
+class TestCompactDocs(unittest.TestCase):
+    """Tests to check the documentation and style of the compact module"""
+
+    def test_pep8_conformance_compact(self):
+        """Test that models/engine/compact.py conforms to PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(["models/engine/compact.py", "compact.py",
+                                    "tests/test_models/test_engine/\
+test_compact.py"])
+        self.assertEqual(
+            result.total_errors, 0, "Found code style errors (and warnings)."
+        )
+
+    def test_compact_module_docstring(self):
+        """Test for the compact.py module docstring"""
+        self.assertIsNot(compact.__doc__, None,
+                         "compact.py needs a docstring")
+        self.assertTrue(len(compact.__doc__) >= 1,
+                        "compact.py needs a docstring")
+
+    def test_compact_func_docstrings(self):
+        """Test for the presence of docstrings in compact functions"""
+        for func in inspect.getmembers(compact, inspect.isfunction):
+            self.assertIsNot(
+                func[1].__doc__,
+                None,
+                "{:s} method needs a docstring".format(func[0]),
+            )
+
+
+class TestCompact(unittest.TestCase):
+    """Test the offline compaction of the FileStorage files"""
+
+    def setUp(self):
+        """Writes the records and a journal to a temporary directory"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "file.json")
+        with open(self.path, "w") as f:
+            json.dump(records, f, indent=4)
+        with open(self.path + ".log", "w") as f:
+            for rec in [["-", "State.s2"],
+                        ["~", "City.c1", {"name": "San Francisco"}],
+                        ["+", "Amenity.a1", record("Amenity", "a1")],
+                        ["~", "Amenity.a1", {"name": "Wifi"}]]:
+                f.write(json.dumps(rec) + "\n")
+
+    def tearDown(self):
+        """Removes the temporary directory"""
+        self.tmp.cleanup()
+
+    def load(self, path=None):
+        """Returns the (key, record) pairs of a file, in order"""
+        return list(serializers.iterload(path or self.path))
+
+    def test_compact(self):
+        """Test that the journal is folded in and orphans are dropped"""
+        report = compact.compact(self.path, run_size=2)
+        pairs = self.load()
+        self.assertEqual([key for key, rec in pairs],
+                         ["Amenity.a1", "City.c1", "State.s1", "User.u1"])
+        self.assertEqual(dict(pairs)["City.c1"]["name"], "San Francisco")
+        self.assertEqual(dict(pairs)["Amenity.a1"]["name"], "Wifi")
+        self.assertEqual(os.path.getsize(self.path + ".log"), 0)
+        self.assertEqual(FileLock(self.path + ".lock").generation(), 1)
+        self.assertEqual(report["records_read"], 8)
+        self.assertEqual(report["deleted"], 1)
+        # City.c2 lost its state, then Place.p1 and Review.r1 their place
+        self.assertEqual(report["orphans"], 4)
+        self.assertEqual(report["records_written"], 4)
+        self.assertEqual(report["size_after"], os.path.getsize(self.path))
+        self.assertLess(report["size_after"], report["size_before"])
+        self.assertEqual(report["checksum"], compact.digest(pairs))
+
+    def test_keep_orphans(self):
+        """Test that orphans are kept on demand"""
+        report = compact.compact(self.path, keep_orphans=True)
+        self.assertEqual(report["orphans"], 0)
+        self.assertEqual(len(self.load()), 8)
+
+    def test_unset_foreign_keys(self):
+        """Test that records whose foreign keys are unset are kept"""
+        with open(self.path, "w") as f:
+            json.dump({"City.c3": record("City", "c3", state_id=""),
+                       "Place.p2": record("Place", "p2", city_id="c3",
+                                          user_id=None)}, f)
+        os.remove(self.path + ".log")
+        report = compact.compact(self.path)
+        self.assertEqual(report["orphans"], 0)
+        self.assertEqual([key for key, rec in self.load()],
+                         ["City.c3", "Place.p2"])
+
+    def test_formats(self):
+        """Test that every format reads back the same records"""
+        compact.compact(self.path)
+        expected = self.load()
+        for name in serializers.serializers:
+            if name in serializers.requirements and \
+                    serializers.requirements[name] is None:
+                continue
+            with self.subTest(name=name):
+                report = compact.compact(self.path, name)
+                self.assertEqual(self.load(), expected)
+                self.assertEqual(report["checksum"], compact.digest(expected))
+                with open(self.path, "rb") as f:
+                    self.assertEqual(serializers.loads(f.read()),
+                                     dict(expected))
+
+    def test_sharded(self):
+        """Test that each class is compacted to its own file"""
+        with open(self.path) as f:
+            objs = json.load(f)
+        os.remove(self.path)
+        for name in ["State", "City", "Review"]:
+            with open(compact.shard(self.path, name), "w") as f:
+                json.dump({key: rec for key, rec in objs.items()
+                           if key.startswith(name + ".")}, f)
+        compact.compact(self.path, sharded=True)
+        self.assertFalse(os.path.exists(self.path))
+        self.assertEqual(self.load(compact.shard(self.path, "Review")), [])
+        self.assertEqual([key for key, rec in
+                          self.load(compact.shard(self.path, "Amenity"))],
+                         ["Amenity.a1"])
+        self.assertEqual([key for key, rec in
+                          self.load(compact.shard(self.path, "City"))],
+                         ["City.c1"])
+        self.assertFalse(os.path.exists(compact.shard(self.path, "Place")))
+
+    def test_unknown_format(self):
+        """Test that the files are left alone for an unknown format"""
+        with open(self.path, "rb") as f:
+            data = f.read()
+        with self.assertRaises(ValueError):
+            compact.compact(self.path, "yaml")
+        with open(self.path, "rb") as f:
+            self.assertEqual(f.read(), data)
+        self.assertNotEqual(os.path.getsize(self.path + ".log"), 0)
+
+    def test_command(self):
+        """Test that compact.py compacts the files without the models
+        package loading them first"""
+        root = os.path.dirname(os.path.dirname(os.path.dirname(
+            os.path.dirname(os.path.abspath(__file__)))))
+        script = ("import runpy, sys; sys.argv = {!r}; "
+                  "runpy.run_path(sys.argv[0], run_name='__main__'); "
+                  "import models; print(models.storage)")
+        out = subprocess.run(
+            [sys.executable, "-c", script.format(
+                [os.path.join(root, "compact.py"), "file.json"])],
+            cwd=self.tmp.name, env=dict(os.environ, PYTHONPATH=root),
+            stdout=subprocess.PIPE, check=True).stdout.decode()
+        self.assertIn("records: 8 read, 1 deleted, 4 orphans dropped, "
+                      "4 written", out)
+        self.assertEqual(out.splitlines()[-1], "None")
+
+    def test_orphans(self):
+        """Test that orphans are found through chains of foreign keys"""
+        refs = {"A.1": [], "B.1": ["A.1"], "C.1": ["B.1"], "C.2": ["B.2"],
+                "D.1": ["C.2", "A.1"]}
+        self.assertEqual(compact.orphans(refs), {"C.2", "D.1"})
@@ -7,6 +7,9 @@ from datetime import datetime
 import inspect
 import models
 from models.engine import file_storage
+from models.engine.journal import Journal
+from models.engine.locks import FileLock
+from models.engine import serializers
 from models.amenity import Amenity
 from models.base_model import BaseModel
 from models.city import City
@@ -17,7 +20,12 @@ from models.user import User
 import json
 import os
 import pep8
+import tempfile
+import threading
+import time
+from types import MappingProxyType
 import unittest
+from unittest import mock
 
 FileStorage = file_storage.FileStorage
 classes = {
@@ -98,11 +106,11 @@ class TestFileStorage(unittest.TestCase):
 
     @unittest.skipIf(models.storage_t == "db", "not testing file storage")
     def test_all_returns_dict(self):
-        """Test that all returns the FileStorage.__objects attr"""
+        """Test that all returns a view of the FileStorage.__objects attr"""
         storage = FileStorage()
         new_dict = storage.all()
-        self.assertEqual(type(new_dict), dict)
-        self.assertIs(new_dict, storage._FileStorage__objects)
+        self.assertIsInstance(new_dict, MappingProxyType)
+        self.assertEqual(new_dict, storage._FileStorage__objects)
 
     @unittest.skipIf(models.storage_t == "db", "not testing file storage")
     def test_new(self):
@@ -168,3 +176,1271 @@ class TestFileStorage(unittest.TestCase):
         count_after = storage.count(User)
 
         self.assertEqual(count_before + 1, count_after)
+
+
+class IsolatedFileStorageTest(unittest.TestCase):
+    """Runs each test against an empty FileStorage in a temporary dir"""
+
+    # dictionary - FileStorage class attributes overridden for each test
+    overrides = {}
+
+    def setUp(self):
+        """Points FileStorage at an empty file in a temporary directory"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.saved = {}
+        values = {"file_path": os.path.join(self.tmp.name, "file.json"),
+                  "objects": {}, "classes": {}, "refs": {}, "pending": {},
+                  "signature": None, "journal": False, "lazy": False,
+                  "sharded": False, "dirty": set(), "changes": {},
+                  "cache": {}, "records": [], "commit_window": 0,
+                  "format": serializers.get_serializer("json"),
+                  "snapshots": {}, "hidden": set(), "pulled": set(),
+                  "selected": set(), "inflight": {}, "shared": False,
+                  "flock": None,
+                  "generation": None, "frozen": set(), "workers": 0,
+                  "timings": {}, "write_behind": 0, "raw": 0}
+        values.update(self.overrides)
+        for attr, value in values.items():
+            attr = "_FileStorage__" + attr
+            self.saved[attr] = getattr(FileStorage, attr)
+            setattr(FileStorage, attr, value)
+        self.storage = FileStorage()
+
+    def restart(self):
+        """Forgets every object, as a fresh process would, and reloads"""
+        for attr in ["objects", "classes", "refs", "pending", "changes",
+                     "cache", "inflight"]:
+            setattr(FileStorage, "_FileStorage__" + attr, {})
+        for attr in ["dirty", "hidden", "pulled", "selected", "frozen"]:
+            setattr(FileStorage, "_FileStorage__" + attr, set())
+        FileStorage._FileStorage__snapshots = {}
+        FileStorage._FileStorage__raw = 0
+        FileStorage._FileStorage__signature = None
+        FileStorage._FileStorage__generation = None
+        self.storage.reload()
+
+    def tearDown(self):
+        """Restores the FileStorage class attributes"""
+        for attr, value in self.saved.items():
+            setattr(FileStorage, attr, value)
+        self.tmp.cleanup()
+
+
+@unittest.skipIf(models.storage_t == "db", "not testing file storage")
+class TestFileStorageJournal(IsolatedFileStorageTest):
+    """Test the journaled mode of the FileStorage class"""
+
+    overrides = {"journal": True}
+
+    def reloaded(self):
+        """Returns the objects read back from disk by a fresh reload"""
+        self.restart()
+        return FileStorage._FileStorage__objects
+
+    def test_save_appends(self):
+        """Test that save appends to the journal, not the snapshot"""
+        state = State(name="California")
+        self.storage.new(state)
+        self.storage.save()
+        self.assertFalse(os.path.exists(FileStorage._FileStorage__file_path))
+        log = FileStorage._FileStorage__file_path + ".log"
+        with open(log) as f:
+            self.assertEqual(len(f.readlines()), 1)
+        self.storage.new(City(name="Fremont", state_id=state.id))
+        self.storage.save()
+        with open(log) as f:
+            self.assertEqual(len(f.readlines()), 2)
+
+    def test_reload_replays(self):
+        """Test that reload replays new, updated and deleted objects"""
+        state = State(name="California")
+        city = City(name="Fremont")
+        self.storage.new(state)
+        self.storage.new(city)
+        self.storage.save()
+        state.name = "Nevada"
+        state.save()
+        self.storage.delete(city)
+        self.storage.save()
+        objs = self.reloaded()
+        self.assertEqual(list(objs), ["State." + state.id])
+        self.assertEqual(objs["State." + state.id].name, "Nevada")
+
+    def test_compaction(self):
+        """Test that the journal is folded into the snapshot at the limit"""
+        limit = FileStorage._FileStorage__journal_limit
+        FileStorage._FileStorage__journal_limit = 512
+        try:
+            for i in range(10):
+                self.storage.new(State(name="State {}".format(i)))
+                self.storage.save()
+        finally:
+            FileStorage._FileStorage__journal_limit = limit
+        self.assertTrue(os.path.exists(FileStorage._FileStorage__file_path))
+        log = FileStorage._FileStorage__file_path + ".log"
+        self.assertLess(os.path.getsize(log), 512)
+        self.assertEqual(len(self.reloaded()), 10)
+
+
+@unittest.skipIf(models.storage_t == "db", "not testing file storage")
+class TestFileStorageClose(IsolatedFileStorageTest):
+    """Test that FileStorage.close only reads what changed on disk"""
+
+    def setUp(self):
+        """Points FileStorage at a file holding two states"""
+        super().setUp()
+        self.ca = State(name="California")
+        self.nv = State(name="Nevada")
+        self.storage.new(self.ca)
+        self.storage.new(self.nv)
+        self.storage.save()
+
+    def rewrite(self, **changes):
+        """Rewrites the file the way another process would"""
+        path = FileStorage._FileStorage__file_path
+        with open(path) as f:
+            jo = json.load(f)
+        for key, record in changes.items():
+            if record is None:
+                del jo[key]
+            else:
+                jo[key] = record
+        with open(path + ".tmp", "w") as f:
+            json.dump(jo, f)
+        os.replace(path + ".tmp", path)
+
+    def test_close_unchanged(self):
+        """Test that close does not re-read a file it wrote itself"""
+        self.ca.name = "Not saved"
+        self.storage.close()
+        objs = self.storage.all(State)
+        self.assertIs(objs["State." + self.ca.id], self.ca)
+        self.assertEqual(self.ca.name, "Not saved")
+
+    def test_close_applies_changes(self):
+        """Test that close rebuilds only the objects changed on disk"""
+        record = self.ca.to_dict()
+        record["name"] = "Oregon"
+        record["updated_at"] = "2100-01-01T00:00:00.000000"
+        self.rewrite(**{"State." + self.ca.id: record})
+        self.storage.close()
+        objs = self.storage.all(State)
+        self.assertEqual(objs["State." + self.ca.id].name, "Oregon")
+        self.assertIs(objs["State." + self.nv.id], self.nv)
+
+    def test_close_applies_deletes(self):
+        """Test that close drops objects deleted on disk"""
+        self.rewrite(**{"State." + self.nv.id: None})
+        self.storage.close()
+        self.assertEqual(list(self.storage.all(State)),
+                         ["State." + self.ca.id])
+
+    def test_close_replays_new_journal_records(self):
+        """Test that close only replays journal records it has not seen"""
+        FileStorage._FileStorage__journal = True
+        az = State(name="Arizona")
+        self.storage.new(az)
+        self.storage.save()
+        with open(FileStorage._FileStorage__file_path + ".log", "a") as f:
+            f.write(json.dumps(["-", "State." + self.nv.id]) + "\n")
+        self.storage.close()
+        objs = self.storage.all(State)
+        self.assertEqual(set(objs), {"State." + self.ca.id,
+                                     "State." + az.id})
+        self.assertIs(objs["State." + az.id], az)
+
+
+@unittest.skipIf(models.storage_t == "db", "not testing file storage")
+class TestFileStorageClasses(IsolatedFileStorageTest):
+    """Test the per-class lookups of the FileStorage class"""
+
+    def setUp(self):
+        """Stores a few objects of different classes"""
+        super().setUp()
+        self.states = [State(name="California"), State(name="Nevada")]
+        self.user = User(email="a@b.c", password="pwd")
+        for obj in self.states + [self.user, Amenity(name="Wifi")]:
+            self.storage.new(obj)
+
+    def test_all_by_class_or_name(self):
+        """Test that all accepts a class or a class name"""
+        expected = {"State." + s.id: s for s in self.states}
+        self.assertEqual(self.storage.all(State), expected)
+        self.assertEqual(self.storage.all("State"), expected)
+        self.assertEqual(self.storage.all("Review"), {})
+
+    def test_all_is_a_snapshot(self):
+        """Test that all returns read-only views that never change"""
+        states = self.storage.all(State)
+        objs = self.storage.all()
+        with self.assertRaises(TypeError):
+            states["State.1"] = self.user
+        for obj in objs.values():
+            self.storage.delete(obj)
+        self.storage.new(State(name="Oregon"))
+        self.assertEqual(len(states), 2)
+        self.assertEqual(len(objs), 4)
+        self.assertEqual(self.storage.count(State), 1)
+        self.assertEqual(len(self.storage.all(State)), 1)
+        self.assertEqual(len(self.storage.all()), 1)
+
+    def test_all_shares_until_changed(self):
+        """Test that views are only copied when the objects change"""
+        states = self.storage.all(State)
+        self.assertEqual(self.storage.all(State), states)
+        self.storage.new(State(name="Oregon"))
+        self.assertEqual(len(self.storage.all(State)), 3)
+        self.assertEqual(len(states), 2)
+
+    def test_count_by_class_or_name(self):
+        """Test that count accepts a class or a class name"""
+        self.assertEqual(self.storage.count(State), 2)
+        self.assertEqual(self.storage.count("User"), 1)
+        self.assertEqual(self.storage.count(Place), 0)
+        self.assertEqual(self.storage.count(), 4)
+
+    def test_get_by_class_or_name(self):
+        """Test that get accepts a class or a class name"""
+        self.assertIs(self.storage.get(User, self.user.id), self.user)
+        self.assertIs(self.storage.get("User", self.user.id), self.user)
+        self.assertIsNone(self.storage.get("State", self.user.id))
+
+    def test_delete_updates_class(self):
+        """Test that a deleted object leaves its class partition"""
+        self.storage.delete(self.states[0])
+        self.assertEqual(self.storage.count(State), 1)
+        self.assertNotIn("State." + self.states[0].id,
+                         self.storage.all(State))
+
+
+@unittest.skipIf(models.storage_t == "db", "not testing file storage")
+class TestFileStorageReferences(IsolatedFileStorageTest):
+    """Test the foreign-key reverse indexes of the FileStorage class"""
+
+    def setUp(self):
+        """Stores two states with a city each, a place and a review"""
+        super().setUp()
+        self.ca = State(name="California")
+        self.nv = State(name="Nevada")
+        self.sf = City(name="San Francisco", state_id=self.ca.id)
+        self.lv = City(name="Las Vegas", state_id=self.nv.id)
+        self.user = User(email="a@b.c", password="pwd")
+        self.place = Place(name="Loft", city_id=self.sf.id,
+                           user_id=self.user.id)
+        self.review = Review(text="Nice", place_id=self.place.id,
+                             user_id=self.user.id)
+        for obj in [self.ca, self.nv, self.sf, self.lv, self.user,
+                    self.place, self.review]:
+            self.storage.new(obj)
+
+    def test_relationships(self):
+        """Test that the relationship getters return the children"""
+        self.assertEqual(self.ca.cities, [self.sf])
+        self.assertEqual(self.sf.places, [self.place])
+        self.assertEqual(self.place.reviews, [self.review])
+        self.assertEqual(self.user.places, [self.place])
+        self.assertEqual(self.user.reviews, [self.review])
+
+    def test_attribute_change(self):
+        """Test that changing a foreign key moves the object"""
+        self.sf.state_id = self.nv.id
+        self.assertEqual(self.ca.cities, [])
+        self.assertCountEqual(self.nv.cities, [self.sf, self.lv])
+
+    def test_delete(self):
+        """Test that a deleted child leaves the index"""
+        self.storage.delete(self.lv)
+        self.assertEqual(self.nv.cities, [])
+
+    def test_reload(self):
+        """Test that the indexes are rebuilt by reload"""
+        self.storage.save()
+        self.restart()
+        state = self.storage.get(State, self.ca.id)
+        self.assertEqual([c.id for c in state.cities], [self.sf.id])
+
+    def test_lookup_unindexed(self):
+        """Test that lookup also works on attributes without an index"""
+        self.assertEqual(self.storage.lookup("City", "name", "Las Vegas"),
+                         [self.lv])
+
+    def test_amenities(self):
+        """Test that Place.amenities follows amenity_ids"""
+        wifi = Amenity(name="Wifi")
+        self.storage.new(wifi)
+        self.place.amenity_ids = [wifi.id, "missing"]
+        self.assertEqual(self.place.amenities, [wifi])
+
+
+@unittest.skipIf(models.storage_t == "db", "not testing file storage")
+class TestFileStorageFilter(IsolatedFileStorageTest):
+    """Test the filter method of the FileStorage class"""
+
+    def setUp(self):
+        """Stores a city with three places"""
+        super().setUp()
+        self.sf = City(name="San Francisco", state_id="ca")
+        self.la = City(name="Los Angeles", state_id="ca")
+        self.loft = Place(name="Loft", city_id=self.sf.id, number_rooms=2,
+                          price_by_night=120)
+        self.flat = Place(name="Flat", city_id=self.sf.id, number_rooms=1,
+                          price_by_night=80)
+        self.villa = Place(name="Villa", city_id=self.la.id, number_rooms=5,
+                           price_by_night=400)
+        for obj in [self.sf, self.la, self.loft, self.flat, self.villa]:
+            self.storage.new(obj)
+
+    def test_equality(self):
+        """Test that equality criteria use the indexes or compare"""
+        self.assertCountEqual(self.storage.filter(Place, city_id=self.sf.id),
+                              [self.loft, self.flat])
+        self.assertEqual(self.storage.filter("Place", name="Villa"),
+                         [self.villa])
+        self.assertEqual(self.storage.filter(Place, city_id=self.sf.id,
+                                             name="Villa"), [])
+
+    def test_range_and_in(self):
+        """Test the range and in criteria"""
+        self.assertCountEqual(
+            self.storage.filter(Place, price_by_night__lte=120),
+            [self.loft, self.flat])
+        self.assertEqual(
+            self.storage.filter(Place, number_rooms__gt=1,
+                                price_by_night__lt=400), [self.loft])
+        self.assertCountEqual(
+            self.storage.filter(Place, city_id__in=[self.la.id, "x"]),
+            [self.villa])
+        self.assertCountEqual(
+            self.storage.filter(Place, name__in=("Loft", "Villa")),
+            [self.loft, self.villa])
+        self.assertEqual(self.storage.filter(Place, description__gt=""), [])
+
+    def test_order_and_limit(self):
+        """Test that objects are sorted and limited"""
+        self.assertEqual(self.storage.filter(Place, order_by="name"),
+                         [self.flat, self.loft, self.villa])
+        self.assertEqual(
+            self.storage.filter(Place, order_by="-price_by_night", limit=2),
+            [self.villa, self.loft])
+        self.assertEqual(
+            self.storage.filter(Place, city_id=self.sf.id,
+                                order_by=["-number_rooms"], limit=1),
+            [self.loft])
+
+    def test_expand(self):
+        """Test that relationships to load along are taken and ignored"""
+        self.assertEqual(self.storage.filter(Place, name="Loft",
+                                             expand="reviews"), [self.loft])
+        self.assertEqual(list(self.storage.all(City, "places").values()),
+                         [self.sf, self.la])
+        self.assertIs(self.storage.get(City, self.la.id, ["places"]),
+                      self.la)
+
+    def test_unknown_operator(self):
+        """Test that an unknown operator is refused"""
+        with self.assertRaises(ValueError):
+            self.storage.filter(Place, name__like="L%")
+
+    def test_lazy(self):
+        """Test that raw records are compared and built when returned"""
+        self.storage.save()
+        FileStorage._FileStorage__lazy = True
+        self.restart()
+        places = self.storage.filter(Place, number_rooms__gte=2,
+                                     created_at__lte=datetime.now(),
+                                     order_by="name")
+        self.assertEqual([place.id for place in places],
+                         [self.loft.id, self.villa.id])
+        self.assertTrue(all(isinstance(place, Place) for place in places))
+
+
+@unittest.skipIf(models.storage_t == "db", "not testing file storage")
+class TestFileStorageBulk(IsolatedFileStorageTest):
+    """Test the bulk methods of the FileStorage class"""
+
+    def test_new_many(self):
+        """Test that new_many stores every object for the next save"""
+        states = [State(name="State {}".format(i)) for i in range(5)]
+        self.storage.new_many(iter(states))
+        self.assertEqual(self.storage.count(State), 5)
+        self.storage.save()
+        self.restart()
+        self.assertEqual(self.storage.count(State), 5)
+
+    def test_delete_many(self):
+        """Test that delete_many takes objects, or ids with a class"""
+        states = [State(name="State {}".format(i)) for i in range(5)]
+        self.storage.new_many(states)
+        self.storage.save()
+        self.storage.delete_many(states[:2])
+        self.storage.delete_many([states[2].id, "missing"], "State")
+        self.assertEqual(self.storage.count(State), 2)
+        self.storage.save()
+        self.restart()
+        self.assertCountEqual(self.storage.all(State).values(),
+                              [self.storage.get(State, states[3].id),
+                               self.storage.get(State, states[4].id)])
+
+    def test_get_many(self):
+        """Test that get_many returns the objects found, in order"""
+        states = [State(name="State {}".format(i)) for i in range(3)]
+        self.storage.new_many(states)
+        ids = [states[2].id, "missing", states[0].id, states[2].id]
+        self.assertEqual(self.storage.get_many("State", ids),
+                         [states[2], states[0]])
+        self.assertEqual(self.storage.get_many(City, ids), [])
+
+    def test_import_records(self):
+        """Test that records are built by batch and saved once"""
+        records = ({"__class__": "City", "name": "City {}".format(i),
+                    "state_id": "ca"} for i in range(25))
+        with mock.patch.object(FileStorage, "save", autospec=True,
+                               side_effect=FileStorage.save) as save:
+            self.assertEqual(self.storage.import_records(records, batch=10),
+                             25)
+        save.assert_called_once()
+        self.assertEqual(self.storage.import_records([{"name": "CA"}],
+                                                     cls=State), 1)
+        self.restart()
+        self.assertEqual(len(self.storage.lookup(City, "state_id", "ca")), 25)
+        self.assertEqual(self.storage.filter(State)[0].name, "CA")
+
+    def test_import_unknown_class(self):
+        """Test that records of no known class are refused"""
+        with self.assertRaises(ValueError):
+            self.storage.import_records([{"name": "CA"}], cls="Country")
+        records = [{"__class__": "State", "name": "State {}".format(i)}
+                   for i in range(5)]
+        for bad in [{"name": "CA"}, {"__class__": "Country"}]:
+            with self.subTest(bad=bad):
+                with self.assertRaises(ValueError):
+                    self.storage.import_records(records + [bad], batch=2)
+                self.assertEqual(self.storage.count(State), 0)
+
+
+@unittest.skipIf(models.storage_t == "db", "not testing file storage")
+class TestFileStoragePaging(IsolatedFileStorageTest):
+    """Test the iter_all and page methods of the FileStorage class"""
+
+    def setUp(self):
+        """Stores seven states and a city"""
+        super().setUp()
+        self.states = [State(name="State {}".format(i)) for i in range(7)]
+        self.city = City(name="Reno", state_id=self.states[0].id)
+        self.storage.new_many(self.states + [self.city])
+
+    def test_iter_all(self):
+        """Test that every object is yielded once, by class"""
+        self.assertCountEqual(self.storage.iter_all(State, batch_size=3),
+                              self.states)
+        self.assertCountEqual(self.storage.iter_all(batch_size=2),
+                              self.states + [self.city])
+        self.assertEqual(list(self.storage.iter_all("Place")), [])
+
+    def test_iter_all_lazy(self):
+        """Test that raw records are built as they are consumed"""
+        self.storage.save()
+        FileStorage._FileStorage__lazy = True
+        self.restart()
+        objs = self.storage.iter_all(State, batch_size=2)
+        first = next(objs)
+        self.assertIsInstance(first, State)
+        raw = [obj for obj in FileStorage._FileStorage__objects.values()
+               if type(obj) is dict]
+        self.assertEqual(len(raw), 6)
+        self.assertEqual(FileStorage._FileStorage__raw, len(raw))
+        self.assertCountEqual([first.id] + [obj.id for obj in objs],
+                              [state.id for state in self.states])
+        # only the city is left raw, until all() builds it
+        self.assertEqual(FileStorage._FileStorage__raw, 1)
+        self.storage.all()
+        self.assertEqual(FileStorage._FileStorage__raw, 0)
+
+    def test_page(self):
+        """Test that pages follow each other by id, up to the last one"""
+        ids = sorted(state.id for state in self.states)
+        pages = []
+        token = None
+        while True:
+            objs, token = self.storage.page(State, 3, token)
+            pages.append([obj.id for obj in objs])
+            if token is None:
+                break
+        self.assertEqual(pages, [ids[:3], ids[3:6], ids[6:]])
+        self.assertEqual(self.storage.page(State, 7), (
+            [self.storage.get(State, i) for i in ids], None))
+        self.assertEqual(self.storage.page("Place"), ([], None))
+        for limit in [0, -1]:
+            with self.assertRaises(ValueError):
+                self.storage.page(State, limit)
+
+
+@unittest.skipIf(models.storage_t == "db", "not testing file storage")
+class TestFileStorageLazy(IsolatedFileStorageTest):
+    """Test the lazy reload mode of the FileStorage class"""
+
+    overrides = {"lazy": True}
+
+    def setUp(self):
+        """Saves a state with a city and a user, then reloads lazily"""
+        super().setUp()
+        self.ca = State(name="California")
+        self.sf = City(name="San Francisco", state_id=self.ca.id)
+        self.user = User(email="a@b.c", password="pwd")
+        for obj in [self.ca, self.sf, self.user]:
+            self.storage.new(obj)
+        self.storage.save()
+        self.restart()
+
+    def built(self):
+        """Returns the keys of the objects that were materialized"""
+        objs = FileStorage._FileStorage__objects
+        return {key for key, obj in objs.items() if type(obj) is not dict}
+
+    def test_reload_builds_nothing(self):
+        """Test that reload only keeps raw records"""
+        self.assertEqual(self.built(), set())
+        self.assertEqual(self.storage.count(), 3)
+        self.assertEqual(self.storage.count(State), 1)
+
+    def test_get_builds_one(self):
+        """Test that get only builds the object asked for"""
+        state = self.storage.get(State, self.ca.id)
+        self.assertIsInstance(state, State)
+        self.assertEqual(state.created_at, self.ca.created_at)
+        self.assertIs(self.storage.get(State, self.ca.id), state)
+        self.assertEqual(self.built(), {"State." + self.ca.id})
+
+    def test_all_by_class_builds_class(self):
+        """Test that all(cls) only builds the objects of cls"""
+        self.assertIsInstance(self.storage.all(User)["User." + self.user.id],
+                              User)
+        self.assertEqual(self.built(), {"User." + self.user.id})
+        for obj in self.storage.all().values():
+            self.assertIsNot(type(obj), dict)
+
+    def test_lookup_builds_children(self):
+        """Test that the reverse indexes work on raw records"""
+        cities = self.storage.lookup(City, "state_id", self.ca.id)
+        self.assertEqual([city.id for city in cities], [self.sf.id])
+        self.assertEqual(self.built(), {"City." + self.sf.id})
+
+    def test_save_raw_records(self):
+        """Test that records never accessed are saved unchanged"""
+        self.storage.get(User, self.user.id).first_name = "Betty"
+        self.storage.save()
+        self.restart()
+        self.assertEqual(self.storage.get(State, self.ca.id).name,
+                         "California")
+        self.assertEqual(self.storage.get(User, self.user.id).first_name,
+                         "Betty")
+
+
+@unittest.skipIf(models.storage_t == "db", "not testing file storage")
+class TestFileStorageSharded(IsolatedFileStorageTest):
+    """Test the one-file-per-class mode of the FileStorage class"""
+
+    overrides = {"sharded": True}
+
+    def setUp(self):
+        """Saves a state and a user"""
+        super().setUp()
+        self.ca = State(name="California")
+        self.user = User(email="a@b.c", password="pwd")
+        self.storage.new(self.ca)
+        self.storage.new(self.user)
+        self.storage.save()
+
+    def shard(self, name):
+        """Returns the path of the file of a class"""
+        return os.path.join(self.tmp.name, "file.{}.json".format(name))
+
+    def test_one_file_per_class(self):
+        """Test that each class is saved to its own file"""
+        self.assertFalse(os.path.exists(os.path.join(self.tmp.name,
+                                                     "file.json")))
+        with open(self.shard("State")) as f:
+            self.assertEqual(list(json.load(f)), ["State." + self.ca.id])
+        with open(self.shard("User")) as f:
+            self.assertEqual(list(json.load(f)), ["User." + self.user.id])
+
+    def test_save_rewrites_dirty_classes(self):
+        """Test that save only rewrites the files of changed classes"""
+        before = os.stat(self.shard("User")).st_mtime_ns
+        self.storage.new(State(name="Nevada"))
+        self.storage.save()
+        self.assertEqual(os.stat(self.shard("User")).st_mtime_ns, before)
+        with open(self.shard("State")) as f:
+            self.assertEqual(len(json.load(f)), 2)
+
+    def test_delete_last_object(self):
+        """Test that a class emptied by a delete gets an empty file"""
+        self.storage.delete(self.user)
+        self.storage.save()
+        with open(self.shard("User")) as f:
+            self.assertEqual(json.load(f), {})
+
+    def test_reload_shards(self):
+        """Test that all shards are read back by reload"""
+        self.restart()
+        self.assertEqual(self.storage.count(), 2)
+        self.assertEqual(self.storage.get(User, self.user.id).email, "a@b.c")
+
+    def test_reload_changed_shards(self):
+        """Test that close only reads back the shards that changed"""
+        with open(self.shard("State")) as f:
+            jo = json.load(f)
+        jo["State." + self.ca.id]["name"] = "Oregon"
+        jo["State." + self.ca.id]["updated_at"] = "2100-01-01T00:00:00.000000"
+        with open(self.shard("State") + ".tmp", "w") as f:
+            json.dump(jo, f)
+        os.replace(self.shard("State") + ".tmp", self.shard("State"))
+        with mock.patch.object(serializers, "loads",
+                               wraps=serializers.loads) as load:
+            self.storage.close()
+        self.assertEqual(load.call_count, 1)
+        self.assertEqual(self.storage.get(State, self.ca.id).name, "Oregon")
+
+    def test_journal_replay_marks_dirty(self):
+        """Test that classes replayed from the journal are compacted"""
+        FileStorage._FileStorage__journal = True
+        self.user.first_name = "Betty"
+        self.user.save()
+        self.restart()
+        self.storage.compact()
+        FileStorage._FileStorage__journal = False
+        self.restart()
+        self.assertEqual(self.storage.get(User, self.user.id).first_name,
+                         "Betty")
+
+
+@unittest.skipIf(models.storage_t == "db", "not testing file storage")
+class TestFileStorageDirty(IsolatedFileStorageTest):
+    """Test that FileStorage only serializes what changed"""
+
+    overrides = {"journal": True}
+
+    def setUp(self):
+        """Saves a state and a city"""
+        super().setUp()
+        self.ca = State(name="California")
+        self.sf = City(name="San Francisco", state_id=self.ca.id)
+        self.storage.new(self.ca)
+        self.storage.new(self.sf)
+        self.storage.save()
+
+    def last_records(self, count=1):
+        """Returns the last records appended to the journal"""
+        with open(FileStorage._FileStorage__file_path + ".log") as f:
+            return [json.loads(line) for line in f.readlines()[-count:]]
+
+    def test_setattr_is_saved(self):
+        """Test that an attribute set on a stored object gets saved"""
+        self.ca.name = "Nevada"
+        self.storage.save()
+        self.assertEqual(self.last_records(),
+                         [["~", "State." + self.ca.id, {"name": "Nevada"}]])
+        self.restart()
+        self.assertEqual(self.storage.get(State, self.ca.id).name, "Nevada")
+
+    def test_model_save(self):
+        """Test that BaseModel.save only journals the changed attributes"""
+        self.sf.name = "Fremont"
+        self.sf.save()
+        rec = self.last_records()[0]
+        self.assertEqual(rec[0], "~")
+        self.assertCountEqual(rec[2], ["name", "updated_at"])
+
+    def test_unchanged_set(self):
+        """Test that setting an attribute to its value changes nothing"""
+        self.ca.name = "California"
+        self.assertEqual(FileStorage._FileStorage__pending, {})
+
+    def test_new_object_full_record(self):
+        """Test that a new object is journaled in full"""
+        nv = State(name="Nevada")
+        self.storage.new(nv)
+        nv.name = "Oregon"
+        self.storage.save()
+        self.assertEqual(self.last_records(),
+                         [["+", "State." + nv.id, nv.to_dict()]])
+
+    def test_only_changed_objects(self):
+        """Test that save only journals the changed objects"""
+        self.sf.name = "Fremont"
+        self.storage.save()
+        self.storage.save()
+        records = self.last_records(2)
+        self.assertEqual(records[1][1], "City." + self.sf.id)
+        self.assertEqual(records[0][0], "+")
+
+    def test_cached_records(self):
+        """Test that compact reuses the records of unchanged objects"""
+        self.storage.compact()
+        self.sf.name = "Fremont"
+        with mock.patch.object(State, "to_dict") as state_to_dict:
+            self.storage.compact()
+        self.assertFalse(state_to_dict.called)
+        FileStorage._FileStorage__journal = False
+        self.restart()
+        self.assertEqual(self.storage.get(City, self.sf.id).name, "Fremont")
+
+    def test_replay_changed_attributes(self):
+        """Test that close applies attributes changed by another process"""
+        with open(FileStorage._FileStorage__file_path + ".log", "a") as f:
+            f.write(json.dumps(["~", "State." + self.ca.id,
+                                {"name": "Oregon"}]) + "\n")
+        self.storage.close()
+        state = self.storage.get(State, self.ca.id)
+        self.assertEqual(state.name, "Oregon")
+        self.assertEqual(state.created_at, self.ca.created_at)
+
+    def test_sharded_setattr(self):
+        """Test that a changed attribute marks its class dirty"""
+        FileStorage._FileStorage__journal = False
+        FileStorage._FileStorage__sharded = True
+        self.storage.compact()
+        self.ca.name = "Nevada"
+        self.assertEqual(self.storage.count(), 2)
+        self.storage.save()
+        self.assertEqual(FileStorage._FileStorage__dirty, set())
+        self.restart()
+        self.assertEqual(self.storage.get(State, self.ca.id).name, "Nevada")
+
+
+@unittest.skipIf(models.storage_t == "db", "not testing file storage")
+class TestFileStorageThreads(IsolatedFileStorageTest):
+    """Test the FileStorage class under concurrent threads"""
+
+    def run_threads(self, target, count=8):
+        """Runs target in count threads and waits for all of them"""
+        threads = [threading.Thread(target=target) for i in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def create_states(self):
+        """Creates and saves 20 states, one save at a time"""
+        for i in range(20):
+            self.storage.new(State(name="State {}".format(i)))
+            self.storage.save()
+
+    def test_concurrent_saves(self):
+        """Test that no save is lost when threads save concurrently"""
+        self.run_threads(self.create_states)
+        self.assertEqual(os.listdir(self.tmp.name), ["file.json"])
+        self.restart()
+        self.assertEqual(self.storage.count(State), 160)
+
+    def test_group_commit(self):
+        """Test that concurrent journaled saves share their writes"""
+        FileStorage._FileStorage__journal = True
+        FileStorage._FileStorage__commit_window = 0.01
+        with mock.patch.object(Journal, "append", autospec=True,
+                               side_effect=Journal.append) as append:
+            self.run_threads(self.create_states)
+        self.assertLess(append.call_count, 160)
+        self.restart()
+        self.assertEqual(self.storage.count(State), 160)
+
+    def test_read_while_writing(self):
+        """Test that readers can walk the objects while writers run"""
+        errors = []
+
+        def read():
+            """Walks the states through all() while writers run"""
+            for i in range(200):
+                try:
+                    for obj in self.storage.all(State).values():
+                        obj.name
+                    for key in self.storage.all():
+                        key.partition(".")
+                except Exception as e:
+                    errors.append(e)
+        writers = threading.Thread(target=self.run_threads,
+                                   args=(self.create_states, 4))
+        writers.start()
+        self.run_threads(read, 4)
+        writers.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(self.storage.count(State), 80)
+
+
+@unittest.skipIf(models.storage_t == "db", "not testing file storage")
+class TestFileStorageWriteBehind(IsolatedFileStorageTest):
+    """Test the write-behind mode of the FileStorage class"""
+
+    overrides = {"write_behind": 60, "write_behind_limit": 3}
+
+    def tearDown(self):
+        """Writes what is left before restoring FileStorage"""
+        self.storage.flush()
+        super().tearDown()
+
+    def on_disk(self):
+        """Returns the keys written to the file"""
+        try:
+            with open(FileStorage._FileStorage__file_path) as f:
+                return set(json.load(f))
+        except FileNotFoundError:
+            return set()
+
+    def wait_for(self, key):
+        """Waits up to 5 seconds for key to be written"""
+        for i in range(500):
+            if key in self.on_disk():
+                return True
+            time.sleep(0.01)
+        return False
+
+    def test_save_returns_first(self):
+        """Test that save() leaves the write to flush()"""
+        state = State(name="California")
+        self.storage.new(state)
+        self.storage.save()
+        self.assertNotIn("State." + state.id, self.on_disk())
+        self.storage.flush()
+        self.assertIn("State." + state.id, self.on_disk())
+        self.restart()
+        self.assertEqual(self.storage.get(State, state.id).name,
+                         "California")
+
+    def test_delay(self):
+        """Test that the flusher writes the changes after the delay"""
+        FileStorage._FileStorage__write_behind = 0.05
+        state = State(name="California")
+        self.storage.new(state)
+        self.storage.save()
+        self.assertTrue(self.wait_for("State." + state.id))
+
+    def test_limit(self):
+        """Test that the flusher writes at once past the limit"""
+        states = [State(name="State {}".format(i)) for i in range(3)]
+        for state in states[:2]:
+            self.storage.new(state)
+            self.storage.save()
+        time.sleep(0.05)
+        self.assertEqual(self.on_disk(), set())
+        self.storage.new(states[2])
+        self.storage.save()
+        self.assertTrue(self.wait_for("State." + states[2].id))
+        self.assertEqual(len(self.on_disk()), 3)
+
+    def test_journal(self):
+        """Test that journaled changes are written behind too"""
+        FileStorage._FileStorage__journal = True
+        state = State(name="California")
+        self.storage.new(state)
+        self.storage.save()
+        state.name = "Nevada"
+        self.storage.save()
+        self.storage.flush()
+        self.restart()
+        self.assertEqual(self.storage.get(State, state.id).name, "Nevada")
+
+
+@unittest.skipIf(models.storage_t == "db", "not testing file storage")
+class TestFileStorageStreaming(IsolatedFileStorageTest):
+    """Test the reload of files streamed in by the FileStorage class"""
+
+    overrides = {"stream_size": 0, "journal": True}
+
+    def setUp(self):
+        """Saves a state with a city and folds them in the snapshot"""
+        super().setUp()
+        self.ca = State(name="California")
+        self.sf = City(name="San Francisco", state_id=self.ca.id)
+        for obj in [self.ca, self.sf]:
+            self.storage.new(obj)
+        self.storage.save()
+        self.storage.compact()
+
+    def test_reload(self):
+        """Test that a streamed file reloads like a parsed one"""
+        with mock.patch.object(serializers, "loads") as loads:
+            self.restart()
+        loads.assert_not_called()
+        self.assertEqual(self.storage.count(), 2)
+        self.assertEqual(self.storage.get(State, self.ca.id).to_dict(),
+                         self.ca.to_dict())
+
+    def test_journal_on_top(self):
+        """Test that the journal applies over the streamed records"""
+        self.ca.name = "Cali"
+        self.storage.delete(self.sf)
+        self.storage.new(City(name="Fresno", state_id=self.ca.id))
+        self.storage.save()
+        self.ca.name = "Nevada"
+        self.storage.save()
+        self.restart()
+        state = self.storage.get(State, self.ca.id)
+        self.assertEqual(state.name, "Nevada")
+        self.assertEqual([city.name for city in state.cities], ["Fresno"])
+
+    def test_unreadable(self):
+        """Test that a truncated file is read again by the next reload"""
+        path = FileStorage._FileStorage__file_path
+        with open(path, "rb") as f:
+            data = f.read()
+        with open(path, "wb") as f:
+            f.write(data[:-10])
+        self.restart()
+        self.assertIsNone(FileStorage._FileStorage__signature)
+        with open(path, "wb") as f:
+            f.write(data)
+        self.storage.reload()
+        self.assertEqual(self.storage.count(), 2)
+
+
+@unittest.skipIf(models.storage_t == "db", "not testing file storage")
+class TestFileStorageWorkers(IsolatedFileStorageTest):
+    """Test the reload of the FileStorage class on a pool of workers"""
+
+    overrides = {"workers": 2, "journal": True}
+
+    def setUp(self):
+        """Saves a state with a city and folds them in the snapshot"""
+        super().setUp()
+        self.ca = State(name="California")
+        self.sf = City(name="San Francisco", state_id=self.ca.id)
+        for obj in [self.ca, self.sf]:
+            self.storage.new(obj)
+        self.storage.save()
+        self.storage.compact()
+
+    def test_reload(self):
+        """Test that the objects built by the workers are stored"""
+        self.restart()
+        self.assertEqual(self.storage.count(), 2)
+        self.assertEqual(self.storage.get(State, self.ca.id).to_dict(),
+                         self.ca.to_dict())
+        state = self.storage.get(State, self.ca.id)
+        self.assertEqual([city.id for city in state.cities], [self.sf.id])
+        timings = self.storage.timings()
+        for phase in ["split", "load", "decode", "build", "merge", "total"]:
+            self.assertGreaterEqual(timings[phase], 0)
+
+    def test_journal_on_top(self):
+        """Test that the journal applies over the objects built"""
+        self.ca.name = "Cali"
+        self.storage.delete(self.sf)
+        self.storage.new(City(name="Fresno", state_id=self.ca.id))
+        self.storage.save()
+        self.ca.name = "Nevada"
+        self.storage.save()
+        self.restart()
+        state = self.storage.get(State, self.ca.id)
+        self.assertEqual(state.name, "Nevada")
+        self.assertEqual([city.name for city in state.cities], ["Fresno"])
+
+    def test_loaded_in_process(self):
+        """Test that the pool is only used when nothing is loaded yet"""
+        self.restart()
+        path = FileStorage._FileStorage__file_path
+        state = State(name="Nevada")
+        with open(path) as f:
+            content = json.load(f)
+        content["State." + state.id] = state.to_dict()
+        with open(path, "w") as f:
+            json.dump(content, f)
+        self.storage.reload()
+        self.assertEqual(self.storage.get(State, state.id).name, "Nevada")
+        self.assertIn("read", self.storage.timings())
+        self.assertNotIn("load", self.storage.timings())
+
+    def test_unreadable(self):
+        """Test that a truncated file is read again by the next reload"""
+        path = FileStorage._FileStorage__file_path
+        with open(path, "rb") as f:
+            data = f.read()
+        with open(path, "wb") as f:
+            f.write(data[:-10])
+        self.restart()
+        self.assertIsNone(FileStorage._FileStorage__signature)
+        with open(path, "wb") as f:
+            f.write(data)
+        self.storage.reload()
+        self.assertEqual(self.storage.count(), 2)
+
+
+@unittest.skipIf(models.storage_t == "db", "not testing file storage")
+class TestFileStorageFormats(IsolatedFileStorageTest):
+    """Test the file formats FileStorage can write"""
+
+    def test_formats(self):
+        """Test that every available format saves and reloads"""
+        for name, module in [("compact", json),
+                             ("orjson", serializers.orjson),
+                             ("msgpack", serializers.msgpack)]:
+            if module is None:
+                continue
+            with self.subTest(name=name):
+                FileStorage._FileStorage__format = \
+                    serializers.get_serializer(name)
+                state = State(name="California")
+                self.storage.new(state)
+                self.storage.save()
+                self.restart()
+                loaded = self.storage.get(State, state.id)
+                self.assertEqual(loaded.to_dict(), state.to_dict())
+
+    def test_switch_format(self):
+        """Test that a file written in one format reloads in another"""
+        state = State(name="California")
+        self.storage.new(state)
+        self.storage.save()
+        FileStorage._FileStorage__format = \
+            serializers.get_serializer("compact")
+        self.restart()
+        self.assertEqual(self.storage.get(State, state.id).name,
+                         "California")
+
+
+@unittest.skipIf(models.storage_t == "db", "not testing file storage")
+class TestFileStorageIndexed(IsolatedFileStorageTest):
+    """Test the memory-mapped indexed snapshots of the FileStorage class"""
+
+    overrides = {"format": serializers.get_serializer("indexed")}
+
+    def setUp(self):
+        """Saves a state with a city and a user, then maps the file"""
+        super().setUp()
+        self.ca = State(name="California")
+        self.sf = City(name="San Francisco", state_id=self.ca.id)
+        self.user = User(email="a@b.c", password="pwd")
+        for obj in [self.ca, self.sf, self.user]:
+            self.storage.new(obj)
+        self.storage.save()
+        self.restart()
+
+    def loaded(self):
+        """Returns the keys of the objects copied out of the snapshot"""
+        return set(FileStorage._FileStorage__objects)
+
+    def test_reload_maps(self):
+        """Test that reload copies nothing out of the snapshot"""
+        self.assertEqual(self.loaded(), set())
+        self.assertEqual(self.storage.count(), 3)
+        self.assertEqual(self.storage.count(State), 1)
+        self.assertEqual(self.storage.count("Place"), 0)
+
+    def test_get_loads_one(self):
+        """Test that get only decodes the object asked for"""
+        state = self.storage.get(State, self.ca.id)
+        self.assertEqual(state.to_dict(), self.ca.to_dict())
+        self.assertIs(self.storage.get(State, self.ca.id), state)
+        self.assertIsNone(self.storage.get(State, "missing"))
+        self.assertEqual(self.loaded(), {"State." + self.ca.id})
+        self.assertEqual(self.storage.count(), 3)
+
+    def test_all_and_lookup(self):
+        """Test that all(cls) and lookup copy the objects of cls"""
+        self.assertEqual(list(self.storage.all(User)),
+                         ["User." + self.user.id])
+        cities = self.ca.cities
+        self.assertEqual([city.id for city in cities], [self.sf.id])
+        self.assertEqual(self.loaded(), {"User." + self.user.id,
+                                         "City." + self.sf.id})
+        self.assertEqual(len(self.storage.all()), 3)
+
+    def test_lookup_selects(self):
+        """Test that a lookup on a foreign key only copies the matching
+        objects out of the snapshot"""
+        nv = State(name="Nevada")
+        self.storage.new(nv)
+        for i in range(3):
+            self.storage.new(City(name="City {}".format(i), state_id=nv.id))
+        self.storage.save()
+        self.restart()
+        self.assertEqual([city.id for city in self.ca.cities], [self.sf.id])
+        self.assertEqual(self.loaded(), {"City." + self.sf.id})
+        self.assertEqual(len(self.storage.filter(
+            City, state_id__in=[self.ca.id, nv.id])), 4)
+        self.assertEqual(len(self.loaded()), 4)
+        # an object changed in memory wins over its record in the file
+        self.storage.get(City, self.sf.id).state_id = nv.id
+        self.assertEqual(self.ca.cities, [])
+        self.assertEqual(len(nv.cities), 4)
+        self.storage.save()
+        self.assertEqual(len(nv.cities), 4)
+        self.restart()
+        self.assertEqual(len(nv.cities), 4)
+        self.assertEqual(self.loaded(), {key for key in self.loaded()
+                                         if key.startswith("City.")})
+
+    def test_overlay(self):
+        """Test that changes live in __objects until saved"""
+        self.storage.get(State, self.ca.id).name = "Cali"
+        self.storage.new(State(name="Nevada"))
+        self.storage.delete(self.storage.get(User, self.user.id))
+        self.assertEqual(self.storage.count(), 3)
+        self.assertEqual(self.storage.count(State), 2)
+        self.assertIsNone(self.storage.get(User, self.user.id))
+        self.storage.save()
+        self.assertEqual(self.loaded(), {"State." + self.ca.id} |
+                         {key for key in self.storage.all(State)})
+        self.restart()
+        self.assertEqual(self.storage.count(), 3)
+        self.assertEqual(self.storage.get(State, self.ca.id).name, "Cali")
+        self.assertIsNone(self.storage.get(User, self.user.id))
+
+    def test_compaction_drops_raw_records(self):
+        """Test that records merely copied are dropped once written"""
+        self.storage.all()
+        self.storage.new(State(name="Nevada"))
+        self.storage.save()
+        objs = FileStorage._FileStorage__objects
+        self.assertEqual([type(obj) for obj in objs.values()
+                          if type(obj) is dict], [])
+        self.assertEqual(self.storage.count(), 4)
+
+    def test_reload_keeps_objects(self):
+        """Test that unchanged objects survive a reload of a new file"""
+        state = self.storage.get(State, self.ca.id)
+        user = self.storage.get(User, self.user.id)
+        for path in self.storage._FileStorage__paths():
+            if not os.path.exists(path):
+                continue
+            with open(path, "rb") as f:
+                records = serializers.loads(f.read())
+            if "User." + self.user.id in records:
+                records["User." + self.user.id]["first_name"] = "Betty"
+            records.pop("City." + self.sf.id, None)
+            with open(path, "wb") as f:
+                f.write(serializers.get_serializer("indexed").dumps(records))
+        self.storage.reload()
+        self.assertIs(self.storage.get(State, self.ca.id), state)
+        self.assertIsNot(self.storage.get(User, self.user.id), user)
+        self.assertEqual(self.storage.get(User, self.user.id).first_name,
+                         "Betty")
+        self.assertEqual(self.storage.count(), 2)
+        self.assertEqual(self.ca.cities, [])
+
+    def test_journal(self):
+        """Test that the journal is replayed over the snapshot"""
+        FileStorage._FileStorage__journal = True
+        self.storage.get(State, self.ca.id).name = "Cali"
+        self.storage.delete(self.storage.get(City, self.sf.id))
+        self.storage.save()
+        self.restart()
+        self.assertEqual(self.storage.count(), 2)
+        self.assertEqual(self.storage.get(State, self.ca.id).name, "Cali")
+        self.assertEqual(self.loaded(), {"State." + self.ca.id})
+        self.storage.compact()
+        self.restart()
+        self.assertEqual(self.loaded(), set())
+        self.assertEqual(self.storage.count(), 2)
+
+    def test_switch_format(self):
+        """Test that a mapped file is rewritten whole in another format"""
+        FileStorage._FileStorage__format = serializers.get_serializer("json")
+        self.storage.new(State(name="Nevada"))
+        self.storage.save()
+        self.assertEqual(FileStorage._FileStorage__snapshots, {})
+        self.restart()
+        self.assertEqual(self.storage.count(), 4)
+        self.assertEqual(len(self.loaded()), 4)
+
+
+@unittest.skipIf(models.storage_t == "db", "not testing file storage")
+class TestFileStorageIndexedShards(TestFileStorageIndexed):
+    """Test the indexed snapshots of the FileStorage class, one per class"""
+
+    overrides = {"format": serializers.get_serializer("indexed"),
+                 "sharded": True}
+
+
+@unittest.skipIf(models.storage_t == "db", "not testing file storage")
+class TestFileStorageProcesses(IsolatedFileStorageTest):
+    """Test FileStorage shared between processes"""
+
+    overrides = {"shared": True}
+
+    def fork(self, target, *args):
+        """Runs target(*args) in a child process, returns its pid"""
+        pid = os.fork()
+        if pid == 0:
+            try:
+                target(*args)
+            finally:
+                os._exit(0)
+        return pid
+
+    def create(self, count):
+        """Creates and saves count states, one at a time"""
+        for i in range(count):
+            self.storage.new(State(name="State {}".format(i)))
+            self.storage.save()
+
+    def test_no_lost_updates(self):
+        """Test that processes saving at the same time keep every object"""
+        pids = [self.fork(self.create, 20) for i in range(4)]
+        self.create(20)
+        for pid in pids:
+            os.waitpid(pid, 0)
+        self.storage.reload()
+        self.assertEqual(self.storage.count(State), 100)
+        self.restart()
+        self.assertEqual(self.storage.count(State), 100)
+
+    def test_catch_up(self):
+        """Test that reload picks up what another process saved"""
+        state = State(name="California")
+        self.storage.new(state)
+        self.storage.save()
+
+        def rename():
+            """Renames the state and adds a city"""
+            self.storage.get(State, state.id).name = "Nevada"
+            self.storage.new(City(name="Reno", state_id=state.id))
+            self.storage.save()
+        os.waitpid(self.fork(rename), 0)
+        self.storage.close()
+        state = self.storage.get(State, state.id)
+        self.assertEqual(state.name, "Nevada")
+        self.assertEqual([city.name for city in state.cities], ["Reno"])
+
+    def test_generation(self):
+        """Test that a rewrite looking like the old file is still read"""
+        state = State(name="California")
+        self.storage.new(state)
+        self.storage.save()
+        self.storage.compact()
+        path = FileStorage._FileStorage__file_path
+        st = os.stat(path)
+        with open(path, "r+b") as f:
+            data = f.read().replace(b"California", b"Californib")
+            f.seek(0)
+            f.write(data)
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns))
+        self.storage.reload()
+        self.assertIs(self.storage.get(State, state.id), state)
+        lock = FileLock(path + ".lock")
+        with lock.exclusive():
+            lock.bump()
+        self.storage.reload()
+        self.assertEqual(self.storage.get(State, state.id).name,
+                         "Californib")
+
+    def test_unwritten_changes(self):
+        """Test that changes staged for a save survive a reload"""
+        state = State(name="California")
+        self.storage.new(state)
+        self.storage.save()
+        state.name = "Nevada"
+        with FileStorage._FileStorage__lock.writing():
+            self.storage._FileStorage__stage()
+        FileStorage._FileStorage__signature = None
+        self.storage.reload()
+        self.assertEqual(state.name, "Nevada")
+        self.storage.save()
+        self.restart()
+        self.assertEqual(self.storage.get(State, state.id).name, "Nevada")
+
+
+@unittest.skipIf(models.storage_t == "db", "not testing file storage")
+class TestFileStorageProcessesJournal(TestFileStorageProcesses):
+    """Test journaled FileStorage shared between processes"""
+
+    overrides = {"shared": True, "journal": True}
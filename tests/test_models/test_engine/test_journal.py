@@ -0,0 +1,102 @@
+#!/usr/bin/python3
+"""
+Contains the TestJournalDocs and TestJournal classes
+"""
+
+import inspect
+from models.engine import journal
+import os
+import pep8
+import tempfile
+import unittest
+
+Journal = journal.Journal
+
+
+class TestJournalDocs(unittest.TestCase):
+    """Tests to check the documentation and style of Journal class"""
+
+    @classmethod
+    def setUpClass(cls):
+        """Set up for the doc tests"""
+        cls.journal_f = inspect.getmembers(Journal, inspect.isfunction)
+
+    def test_pep8_conformance_journal(self):
+        """Test that models/engine/journal.py conforms to PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(["models/engine/journal.py",
+                                    "tests/test_models/test_engine/\
+test_journal.py"])
+        self.assertEqual(
+            result.total_errors, 0, "Found code style errors (and warnings)."
+        )
+
+    def test_journal_module_docstring(self):
+        """Test for the journal.py module docstring"""
+        self.assertIsNot(journal.__doc__, None, "journal.py needs a docstring")
+        self.assertTrue(len(journal.__doc__) >= 1,
+                        "journal.py needs a docstring")
+
+    def test_journal_class_docstring(self):
+        """Test for the Journal class docstring"""
+        self.assertIsNot(Journal.__doc__, None,
+                         "Journal class needs a docstring")
+
+    def test_journal_func_docstrings(self):
+        """Test for the presence of docstrings in Journal methods"""
+        for func in self.journal_f:
+            self.assertIsNot(
+                func[1].__doc__,
+                None,
+                "{:s} method needs a docstring".format(func[0]),
+            )
+
+
+class TestJournal(unittest.TestCase):
+    """Test the Journal class"""
+
+    def setUp(self):
+        """Creates a journal in a temporary directory"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.log = Journal(os.path.join(self.tmp.name, "file.json.log"))
+
+    def tearDown(self):
+        """Removes the temporary directory"""
+        self.tmp.cleanup()
+
+    def test_replay_missing_file(self):
+        """Test that a journal that was never written replays nothing"""
+        self.assertEqual(list(self.log.replay()), [])
+        self.assertEqual(self.log.size(), 0)
+
+    def test_append_replay(self):
+        """Test that appended records come back in order"""
+        self.log.append([["+", "State.1", {"id": "1"}], ["-", "State.2"]])
+        self.log.append([["-", "State.1"]])
+        self.assertEqual(list(self.log.replay()),
+                         [["+", "State.1", {"id": "1"}], ["-", "State.2"],
+                          ["-", "State.1"]])
+        self.assertEqual(self.log.offset, self.log.size())
+
+    def test_replay_from_offset(self):
+        """Test that replay only returns records after the offset"""
+        self.log.append([["-", "State.1"]])
+        offset = self.log.offset
+        self.log.append([["-", "State.2"]])
+        self.assertEqual(list(self.log.replay(offset)), [["-", "State.2"]])
+
+    def test_torn_record(self):
+        """Test that a partially written record is dropped and cut off"""
+        self.log.append([["-", "State.1"]])
+        size = self.log.size()
+        with open(self.log.path, "a") as f:
+            f.write('["+","State.2",{"id":')
+        self.assertEqual(list(self.log.replay()), [["-", "State.1"]])
+        self.assertEqual(self.log.size(), size)
+
+    def test_truncate(self):
+        """Test that truncate empties the log"""
+        self.log.append([["-", "State.1"]])
+        self.log.truncate()
+        self.assertEqual(self.log.size(), 0)
+        self.assertEqual(self.log.offset, 0)
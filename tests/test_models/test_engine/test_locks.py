@@ -0,0 +1,171 @@
+#!/usr/bin/python3
+"""
+Contains the TestReadWriteLockDocs, TestReadWriteLock and TestFileLock
+classes
+"""
+
+import inspect
+from models.engine import locks
+import os
+import pep8
+import tempfile
+import threading
+import time
+import unittest
+
+ReadWriteLock = locks.ReadWriteLock
+FileLock = locks.FileLock
+
+
+class TestReadWriteLockDocs(unittest.TestCase):
+    """Tests to check the documentation and style of the locks module"""
+
+    @classmethod
+    def setUpClass(cls):
+        """Set up for the doc tests"""
+        cls.lock_f = inspect.getmembers(ReadWriteLock, inspect.isfunction)
+        cls.lock_f += inspect.getmembers(FileLock, inspect.isfunction)
+
+    def test_pep8_conformance_locks(self):
+        """Test that models/engine/locks.py conforms to PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(["models/engine/locks.py",
+                                    "tests/test_models/test_engine/\
+test_locks.py"])
+        self.assertEqual(
+            result.total_errors, 0, "Found code style errors (and warnings)."
+        )
+
+    def test_locks_module_docstring(self):
+        """Test for the locks.py module docstring"""
+        self.assertIsNot(locks.__doc__, None, "locks.py needs a docstring")
+
+    def test_lock_func_docstrings(self):
+        """Test for the presence of docstrings in the locks methods"""
+        for func in self.lock_f:
+            self.assertIsNot(
+                func[1].__doc__,
+                None,
+                "{:s} method needs a docstring".format(func[0]),
+            )
+
+
+class TestReadWriteLock(unittest.TestCase):
+    """Test the ReadWriteLock class"""
+
+    def test_readers_share(self):
+        """Test that several threads can read at the same time"""
+        lock = ReadWriteLock()
+        inside = []
+        barrier = threading.Barrier(3, timeout=5)
+
+        def read():
+            """Holds the lock for reading until all readers are in"""
+            with lock.reading():
+                inside.append(1)
+                barrier.wait()
+        threads = [threading.Thread(target=read) for i in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(inside), 3)
+
+    def test_writer_excludes(self):
+        """Test that a writer runs alone"""
+        lock = ReadWriteLock()
+        events = []
+
+        def write():
+            """Holds the lock for writing for a little while"""
+            with lock.writing():
+                events.append("write start")
+                time.sleep(0.05)
+                events.append("write end")
+        with lock.reading():
+            writer = threading.Thread(target=write)
+            writer.start()
+            time.sleep(0.02)
+            events.append("read")
+        writer.join()
+        with lock.reading():
+            events.append("read again")
+        self.assertEqual(events, ["read", "write start", "write end",
+                                  "read again"])
+
+    def test_writer_reenters(self):
+        """Test that the writing thread can take the lock again"""
+        lock = ReadWriteLock()
+        with lock.writing():
+            with lock.writing():
+                with lock.reading():
+                    pass
+        with lock.writing():
+            pass
+
+
+@unittest.skipIf(locks.fcntl is None, "no flock() on this platform")
+class TestFileLock(unittest.TestCase):
+    """Test the FileLock class"""
+
+    def setUp(self):
+        """Creates a lock in a temporary directory"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "file.json.lock")
+        self.lock = FileLock(self.path)
+
+    def tearDown(self):
+        """Removes the temporary directory"""
+        self.tmp.cleanup()
+
+    def other(self, mode):
+        """Tells whether another open file may take the lock in mode"""
+        fd = os.open(self.path, os.O_RDWR)
+        try:
+            locks.fcntl.flock(fd, mode | locks.fcntl.LOCK_NB)
+            return True
+        except BlockingIOError:
+            return False
+        finally:
+            os.close(fd)
+
+    def test_exclusive(self):
+        """Test that a lock held for writing keeps everyone else out"""
+        with self.lock.exclusive():
+            with self.lock.shared():
+                self.assertFalse(self.other(locks.fcntl.LOCK_SH))
+            self.assertFalse(self.other(locks.fcntl.LOCK_SH))
+        self.assertTrue(self.other(locks.fcntl.LOCK_EX))
+
+    def test_shared(self):
+        """Test that a lock held for reading only keeps writers out"""
+        with self.lock.shared():
+            self.assertTrue(self.other(locks.fcntl.LOCK_SH))
+            self.assertFalse(self.other(locks.fcntl.LOCK_EX))
+
+    def test_generation(self):
+        """Test that the generation is kept in the file"""
+        self.assertEqual(self.lock.generation(), 0)
+        with self.lock.exclusive():
+            self.assertEqual(self.lock.bump(), 1)
+            self.assertEqual(self.lock.bump(), 2)
+        self.assertEqual(FileLock(self.path).generation(), 2)
+
+    def test_fork(self):
+        """Test that a forked child takes the lock on its own"""
+        with self.lock.shared():
+            pass
+        read, write = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read)
+            with self.lock.exclusive():
+                os.write(write, b"x")
+                time.sleep(0.2)
+            os._exit(0)
+        os.close(write)
+        os.read(read, 1)
+        os.close(read)
+        with self.lock.shared():
+            self.assertTrue(self.other(locks.fcntl.LOCK_SH))
+        os.waitpid(pid, 0)
@@ -0,0 +1,131 @@
+#!/usr/bin/python3
+"""
+Contains the TestParallelDocs and TestParallel classes
+"""
+
+import inspect
+from models.engine import parallel
+from models.engine import serializers
+from models.engine.file_storage import classes
+import os
+import pep8
+import tempfile
+import unittest
+
+records = {
+    "State.{}".format(i): {
+        "id": str(i), "__class__": "State",
+        "name": 'Île, "State.{}": {{"id": "{}"}}'.format(i + 1, i + 1),
+        "created_at": "2017-09-28T21:03:54.052298",
+        "updated_at": "2017-09-28T21:03:54.052298",
+    } for i in range(200)
+}
+
+
+class TestParallelDocs(unittest.TestCase):
+    """Tests to check the documentation and style of the parallel module"""
+
+    def test_pep8_conformance_parallel(self):
+        """Test that models/engine/parallel.py conforms to PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(["models/engine/parallel.py",
+                                    "tests/test_models/test_engine/\
+test_parallel.py"])
+        self.assertEqual(
+            result.total_errors, 0, "Found code style errors (and warnings)."
+        )
+
+    def test_parallel_module_docstring(self):
+        """Test for the parallel.py module docstring"""
+        self.assertIsNot(parallel.__doc__, None,
+                         "parallel.py needs a docstring")
+        self.assertTrue(len(parallel.__doc__) >= 1,
+                        "parallel.py needs a docstring")
+
+    def test_parallel_func_docstrings(self):
+        """Test for the presence of docstrings in parallel functions"""
+        for func in inspect.getmembers(parallel, inspect.isfunction):
+            self.assertIsNot(
+                func[1].__doc__,
+                None,
+                "{:s} method needs a docstring".format(func[0]),
+            )
+
+
+class TestParallel(unittest.TestCase):
+    """Test the functions cutting files into ranges of records"""
+
+    def setUp(self):
+        """Creates a temporary directory"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "file.json")
+
+    def tearDown(self):
+        """Removes the temporary directory"""
+        self.tmp.cleanup()
+
+    def write(self, name):
+        """Writes the records in a format"""
+        with open(self.path, "wb") as f:
+            f.write(serializers.get_serializer(name).dumps(records))
+
+    def load(self, ranges):
+        """Returns the records built from each range"""
+        built = {}
+        for start, stop in ranges:
+            objs = parallel.load(self.path, start, stop, classes)[0]
+            for key, obj in objs:
+                self.assertNotIn(key, built)
+                built[key] = obj.to_dict()
+        return built
+
+    def test_split(self):
+        """Test that the ranges hold every record once, in any JSON"""
+        for name in ["json", "compact"]:
+            with self.subTest(name=name):
+                self.write(name)
+                ranges = parallel.split(self.path, classes, 7)
+                self.assertEqual(len(ranges), 7)
+                self.assertEqual(self.load(ranges), records)
+
+    def test_whole(self):
+        """Test that a file which cannot be cut is loaded whole"""
+        self.write("json")
+        self.assertEqual(parallel.split(self.path, classes, 1),
+                         [(None, None)])
+        if serializers.msgpack is not None:
+            self.write("msgpack")
+            ranges = parallel.split(self.path, classes, 7)
+            self.assertEqual(ranges, [(None, None)])
+            self.assertEqual(self.load(ranges), records)
+
+    def test_empty(self):
+        """Test that there is no range without records"""
+        self.assertEqual(parallel.split(self.path, classes, 4), [])
+        with open(self.path, "w") as f:
+            f.write("{}\n")
+        self.assertEqual(parallel.split(self.path, classes, 4), [])
+
+    def test_spread(self):
+        """Test that forked workers send back every range, in order"""
+        self.write("json")
+        ranges = [(self.path,) + r
+                  for r in parallel.split(self.path, classes, 5)]
+        results = parallel.spread(ranges, classes, 2)
+        self.assertEqual(len(results), 5)
+        expected = [parallel.load(*r, classes)[0] for r in ranges]
+        self.assertEqual([[key for key, obj in result[0]]
+                          for result in results],
+                         [[key for key, obj in objs] for objs in expected])
+        self.assertEqual(parallel.spread([], classes, 2), [])
+
+    def test_spread_unreadable(self):
+        """Test that a range which cannot be read fails the whole load"""
+        self.write("json")
+        ranges = [(self.path,) + r
+                  for r in parallel.split(self.path, classes, 3)]
+        broken = os.path.join(self.tmp.name, "broken.json")
+        with open(broken, "w") as f:
+            f.write('{"State.1": {')
+        ranges.append((broken, None, None))
+        self.assertIsNone(parallel.spread(ranges, classes, 2))
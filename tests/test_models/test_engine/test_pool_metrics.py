@@ -0,0 +1,131 @@
+#!/usr/bin/python3
+"""
+Contains the TestPoolMetricsDocs and TestPoolMetrics classes
+"""
+
+import inspect
+from models.engine import pool_metrics
+import os
+import pep8
+from sqlalchemy import create_engine
+from sqlalchemy.exc import TimeoutError
+from sqlalchemy.pool import QueuePool
+import tempfile
+import threading
+import time
+import unittest
+
+PoolMetrics = pool_metrics.PoolMetrics
+
+
+class TestPoolMetricsDocs(unittest.TestCase):
+    """Tests to check the documentation and style of PoolMetrics class"""
+
+    @classmethod
+    def setUpClass(cls):
+        """Set up for the doc tests"""
+        cls.metrics_f = inspect.getmembers(PoolMetrics, inspect.isfunction)
+
+    def test_pep8_conformance_pool_metrics(self):
+        """Test that models/engine/pool_metrics.py conforms to PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(["models/engine/pool_metrics.py",
+                                    "tests/test_models/test_engine/\
+test_pool_metrics.py"])
+        self.assertEqual(
+            result.total_errors, 0, "Found code style errors (and warnings)."
+        )
+
+    def test_pool_metrics_module_docstring(self):
+        """Test for the pool_metrics.py module docstring"""
+        self.assertIsNot(pool_metrics.__doc__, None,
+                         "pool_metrics.py needs a docstring")
+        self.assertTrue(len(pool_metrics.__doc__) >= 1,
+                        "pool_metrics.py needs a docstring")
+
+    def test_pool_metrics_class_docstring(self):
+        """Test for the PoolMetrics class docstring"""
+        self.assertIsNot(PoolMetrics.__doc__, None,
+                         "PoolMetrics class needs a docstring")
+
+    def test_pool_metrics_func_docstrings(self):
+        """Test for the presence of docstrings in PoolMetrics methods"""
+        for func in self.metrics_f:
+            self.assertIsNot(
+                func[1].__doc__,
+                None,
+                "{:s} method needs a docstring".format(func[0]),
+            )
+
+
+class TestPoolMetrics(unittest.TestCase):
+    """Test the PoolMetrics class on a pool of one SQLite connection"""
+
+    def setUp(self):
+        """Creates an engine on a database in a temporary directory"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.metrics = PoolMetrics()
+        self.engine = create_engine(
+            "sqlite:///" + os.path.join(self.tmp.name, "hbnb.db"),
+            poolclass=self.metrics.poolclass(QueuePool), pool_size=1,
+            max_overflow=0, pool_timeout=0.1,
+            connect_args={"check_same_thread": False})
+        self.metrics.watch(self.engine)
+
+    def tearDown(self):
+        """Closes the connections and removes the temporary directory"""
+        self.engine.dispose()
+        self.tmp.cleanup()
+
+    def test_counts(self):
+        """Test that connections opened and checked out are counted"""
+        conn = self.engine.connect()
+        stats = self.metrics.stats()
+        self.assertEqual(stats["pool"], "TimedQueuePool")
+        self.assertEqual(stats["checked_out"], 1)
+        self.assertEqual(stats["checked_in"], 0)
+        self.assertEqual(stats["size"], 1)
+        self.assertEqual(stats["overflow"], 0)
+        self.assertEqual(stats["connect"]["count"], 1)
+        self.assertGreater(stats["connect"]["sum"], 0)
+        conn.close()
+        self.engine.connect().close()
+        stats = self.metrics.stats()
+        self.assertEqual(stats["checked_out"], 0)
+        self.assertEqual(stats["checked_out_peak"], 1)
+        self.assertEqual(stats["checkouts"], 2)
+        self.assertEqual(stats["connect"]["count"], 1)
+        self.assertEqual(stats["wait"]["count"], 2)
+
+    def test_wait(self):
+        """Test that a checkout waiting for a connection is timed"""
+        conn = self.engine.connect()
+        threading.Timer(0.02, conn.close).start()
+        self.engine.connect().close()
+        wait = self.metrics.stats()["wait"]
+        self.assertGreaterEqual(wait["max"], 0.015)
+        self.assertEqual(sum(count for bound, count in wait["histogram"]),
+                         wait["count"])
+        self.assertEqual(wait["histogram"][-1][0], None)
+        # the first checkout opened the connection without waiting for it
+        self.assertEqual(wait["histogram"][0][1], 1)
+
+    def test_timeout(self):
+        """Test that a checkout giving up is counted"""
+        conn = self.engine.connect()
+        with self.assertRaises(TimeoutError):
+            self.engine.connect()
+        conn.close()
+        wait = self.metrics.stats()["wait"]
+        self.assertEqual(wait["timeouts"], 1)
+        self.assertGreaterEqual(wait["max"], 0.09)
+
+    def test_invalidate(self):
+        """Test that dropped connections are counted"""
+        with self.engine.connect() as conn:
+            conn.invalidate()
+        self.engine.connect().close()
+        stats = self.metrics.stats()
+        self.assertEqual(stats["invalidated"], 1)
+        self.assertEqual(stats["connect"]["count"], 2)
+        self.assertEqual(stats["checked_out"], 0)
@@ -0,0 +1,73 @@
+#!/usr/bin/python3
+"""
+Contains the TestPredicatesDocs and TestPredicates classes
+"""
+
+import inspect
+from models.engine import predicates
+import pep8
+import unittest
+
+
+class TestPredicatesDocs(unittest.TestCase):
+    """Tests to check the documentation and style of the predicates module"""
+
+    def test_pep8_conformance_predicates(self):
+        """Test that models/engine/predicates.py conforms to PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(["models/engine/predicates.py",
+                                    "tests/test_models/test_engine/\
+test_predicates.py"])
+        self.assertEqual(
+            result.total_errors, 0, "Found code style errors (and warnings)."
+        )
+
+    def test_predicates_module_docstring(self):
+        """Test for the predicates.py module docstring"""
+        self.assertIsNot(predicates.__doc__, None,
+                         "predicates.py needs a docstring")
+        self.assertTrue(len(predicates.__doc__) >= 1,
+                        "predicates.py needs a docstring")
+
+    def test_predicates_func_docstrings(self):
+        """Test for the presence of docstrings in predicates functions"""
+        for func in inspect.getmembers(predicates, inspect.isfunction):
+            self.assertIsNot(
+                func[1].__doc__,
+                None,
+                "{:s} method needs a docstring".format(func[0]),
+            )
+
+
+class TestPredicates(unittest.TestCase):
+    """Test the parsing and matching of criteria"""
+
+    def test_parse(self):
+        """Test that criteria are split into attribute, operator, value"""
+        self.assertEqual(
+            predicates.parse({"name": "Loft", "number_rooms__gte": 2,
+                              "city_id__in": ("a", "b")}),
+            [("name", "eq", "Loft"), ("number_rooms", "gte", 2),
+             ("city_id", "in", ["a", "b"])])
+        with self.assertRaises(ValueError):
+            predicates.parse({"name__like": "L%"})
+
+    def test_matches(self):
+        """Test each operator, and values that are missing"""
+        self.assertTrue(predicates.matches(2, "eq", 2))
+        self.assertTrue(predicates.matches(2, "ne", 3))
+        self.assertTrue(predicates.matches(2, "lt", 3))
+        self.assertTrue(predicates.matches(3, "lte", 3))
+        self.assertFalse(predicates.matches(3, "gt", 3))
+        self.assertTrue(predicates.matches(3, "gte", 3))
+        self.assertTrue(predicates.matches("b", "in", ["a", "b"]))
+        self.assertFalse(predicates.matches(None, "lt", 3))
+        self.assertFalse(predicates.matches("a", "lt", 3))
+        self.assertTrue(predicates.matches(None, "eq", None))
+
+    def test_ordering(self):
+        """Test that "-" asks for a descending order"""
+        self.assertEqual(predicates.ordering(None), [])
+        self.assertEqual(predicates.ordering("-name"), [("name", True)])
+        self.assertEqual(predicates.ordering(["city_id", "-name"]),
+                         [("city_id", False), ("name", True)])
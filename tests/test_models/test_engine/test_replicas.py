@@ -0,0 +1,152 @@
+#!/usr/bin/python3
+"""
+Contains the TestReplicasDocs, TestReplicas and TestRoutingSession classes
+"""
+
+import inspect
+from models.engine import replicas
+import os
+import pep8
+from sqlalchemy import Column, MetaData, String, Table, create_engine
+from sqlalchemy import insert, select
+import tempfile
+import unittest
+
+Replicas = replicas.Replicas
+RoutingSession = replicas.RoutingSession
+table = Table("items", MetaData(), Column("id", String(60), primary_key=True))
+
+
+class TestReplicasDocs(unittest.TestCase):
+    """Tests to check the documentation and style of the replicas module"""
+
+    def test_pep8_conformance_replicas(self):
+        """Test that models/engine/replicas.py conforms to PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(["models/engine/replicas.py",
+                                    "tests/test_models/test_engine/\
+test_replicas.py"])
+        self.assertEqual(
+            result.total_errors, 0, "Found code style errors (and warnings)."
+        )
+
+    def test_replicas_module_docstring(self):
+        """Test for the replicas.py module docstring"""
+        self.assertIsNot(replicas.__doc__, None,
+                         "replicas.py needs a docstring")
+        self.assertTrue(len(replicas.__doc__) >= 1,
+                        "replicas.py needs a docstring")
+
+    def test_replicas_class_docstrings(self):
+        """Test for the docstrings of the classes and their methods"""
+        for cls in [Replicas, RoutingSession]:
+            self.assertIsNot(cls.__doc__, None,
+                             "{} class needs a docstring".format(cls))
+            for func in inspect.getmembers(cls, inspect.isfunction):
+                if func[1].__module__ == replicas.__name__:
+                    self.assertIsNot(
+                        func[1].__doc__,
+                        None,
+                        "{:s} method needs a docstring".format(func[0]),
+                    )
+
+
+class TestReplicas(unittest.TestCase):
+    """Test the Replicas class"""
+
+    def setUp(self):
+        """Creates three replicas, lagging as self.lags says"""
+        self.engines = ["r0", "r1", "r2"]
+        self.lags = {"r0": 0.0, "r1": 1.0, "r2": 0.5}
+        self.checks = []
+        self.replicas = Replicas(self.engines, self.lag, max_lag=2.0,
+                                 interval=0)
+
+    def lag(self, engine):
+        """Returns the lag set for an engine, raising if it is not one"""
+        self.checks.append(engine)
+        lag = self.lags[engine]
+        if isinstance(lag, Exception):
+            raise lag
+        return lag
+
+    def test_round_robin(self):
+        """Test that replicas are picked in turn"""
+        self.assertEqual([self.replicas.pick() for i in range(5)],
+                         ["r0", "r1", "r2", "r0", "r1"])
+        self.assertEqual(len(self.replicas), 3)
+
+    def test_lagging(self):
+        """Test that replicas behind or failing are skipped"""
+        self.lags["r1"] = 3.0
+        self.lags["r2"] = None
+        self.assertEqual([self.replicas.pick() for i in range(3)],
+                         ["r0", "r0", "r0"])
+        self.lags["r0"] = OSError("down")
+        self.assertIsNone(self.replicas.pick())
+        self.lags["r1"] = 2.0
+        self.assertEqual(self.replicas.pick(), "r1")
+        self.assertIsNone(Replicas([], self.lag).pick())
+
+    def test_interval(self):
+        """Test that a lag is read again once it is too old"""
+        replicas = Replicas(self.engines, self.lag, interval=60)
+        for i in range(6):
+            replicas.pick()
+        self.assertEqual(self.checks, ["r0", "r1", "r2"])
+        self.assertEqual(replicas.lag("r1"), 1.0)
+        self.assertEqual(len(self.checks), 3)
+
+
+class TestRoutingSession(unittest.TestCase):
+    """Test the RoutingSession class on a primary and a replica file"""
+
+    def setUp(self):
+        """Creates the table on both databases, with a row on the
+        primary only"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.primary, self.replica = [
+            create_engine("sqlite:///" + os.path.join(self.tmp.name, name))
+            for name in ["primary.db", "replica.db"]]
+        for engine in [self.primary, self.replica]:
+            table.metadata.create_all(engine)
+        with self.primary.begin() as conn:
+            conn.execute(insert(table), [{"id": "old"}])
+        self.replicas = Replicas([self.replica], lambda engine: 0.0)
+
+    def tearDown(self):
+        """Closes the connections and removes the temporary directory"""
+        self.primary.dispose()
+        self.replica.dispose()
+        self.tmp.cleanup()
+
+    def ids(self, session):
+        """Returns the ids of the rows a session reads"""
+        return session.execute(select(table.c.id)).scalars().all()
+
+    def test_reads(self):
+        """Test that reads go to the replica"""
+        with RoutingSession(bind=self.primary,
+                            replicas=self.replicas) as session:
+            self.assertEqual(self.ids(session), [])
+            self.assertIs(session.info["replica"], self.replica)
+
+    def test_read_your_writes(self):
+        """Test that a session reads from the primary once it wrote"""
+        with RoutingSession(bind=self.primary,
+                            replicas=self.replicas) as session:
+            session.execute(insert(table), [{"id": "new"}])
+            self.assertCountEqual(self.ids(session), ["old", "new"])
+            session.commit()
+            self.assertCountEqual(self.ids(session), ["old", "new"])
+        with RoutingSession(bind=self.primary,
+                            replicas=self.replicas) as session:
+            self.assertEqual(self.ids(session), [])
+
+    def test_no_replica(self):
+        """Test that reads go to the primary without a healthy replica"""
+        lagging = Replicas([self.replica], lambda engine: 10.0)
+        for replicas in [None, lagging]:
+            with RoutingSession(bind=self.primary,
+                                replicas=replicas) as session:
+                self.assertEqual(self.ids(session), ["old"])
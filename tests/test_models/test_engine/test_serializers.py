@@ -0,0 +1,136 @@
+#!/usr/bin/python3
+"""
+Contains the TestSerializersDocs and TestSerializers classes
+"""
+
+import inspect
+import json
+from models.engine import serializers
+import os
+import pep8
+import tempfile
+import unittest
+
+record = {"State.1": {"id": "1", "name": "Île-de-France",
+                      "created_at": "2024-01-11T16:34:08.957117",
+                      "__class__": "State"}}
+
+
+class TestSerializersDocs(unittest.TestCase):
+    """Tests to check the documentation and style of serializers.py"""
+
+    def test_pep8_conformance_serializers(self):
+        """Test that models/engine/serializers.py conforms to PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(["models/engine/serializers.py",
+                                    "tests/test_models/test_engine/\
+test_serializers.py"])
+        self.assertEqual(
+            result.total_errors, 0, "Found code style errors (and warnings)."
+        )
+
+    def test_serializers_module_docstring(self):
+        """Test for the serializers.py module docstring"""
+        self.assertIsNot(serializers.__doc__, None,
+                         "serializers.py needs a docstring")
+
+    def test_serializers_docstrings(self):
+        """Test for the presence of docstrings in the serializers"""
+        for cls in serializers.serializers.values():
+            self.assertIsNot(cls.__doc__, None)
+            for name, func in inspect.getmembers(cls, inspect.isfunction):
+                self.assertIsNot(func.__doc__, None,
+                                 "{:s} needs a docstring".format(name))
+        for func in [serializers.get_serializer, serializers.loads,
+                     serializers.convert, serializers.iterload]:
+            self.assertIsNot(func.__doc__, None)
+
+
+class TestSerializers(unittest.TestCase):
+    """Test the serializers FileStorage can use"""
+
+    def available(self):
+        """Returns the names of the serializers usable here"""
+        return [name for name in serializers.serializers
+                if serializers.requirements.get(name, True) is not None]
+
+    def test_round_trip(self):
+        """Test that each serializer reads back what it wrote"""
+        for name in self.available():
+            with self.subTest(name=name):
+                ser = serializers.get_serializer(name)
+                data = ser.dumps(record)
+                self.assertIs(type(data), bytes)
+                self.assertEqual(ser.loads(data), record)
+                self.assertEqual(serializers.loads(data), record)
+
+    def test_json_is_historical_format(self):
+        """Test that json writes what json.dump always wrote"""
+        data = serializers.get_serializer("json").dumps(record)
+        self.assertEqual(data.decode("utf-8"), json.dumps(record))
+
+    def test_compact_is_smaller(self):
+        """Test that the compact format drops whitespace"""
+        data = serializers.get_serializer("json").dumps(record)
+        compact = serializers.get_serializer("compact").dumps(record)
+        self.assertLess(len(compact), len(data))
+
+    def test_unknown(self):
+        """Test that an unknown format is refused"""
+        with self.assertRaises(ValueError):
+            serializers.get_serializer("yaml")
+
+    def test_missing_module(self):
+        """Test that a format whose module is missing is refused"""
+        saved = serializers.requirements["msgpack"]
+        serializers.requirements["msgpack"] = None
+        try:
+            with self.assertRaises(ImportError):
+                serializers.get_serializer("msgpack")
+        finally:
+            serializers.requirements["msgpack"] = saved
+
+    def test_convert(self):
+        """Test that convert rewrites a file in another format"""
+        with tempfile.TemporaryDirectory() as tmp:
+            src = os.path.join(tmp, "file.json")
+            with open(src, "w") as f:
+                json.dump(record, f)
+            for name in self.available():
+                with self.subTest(name=name):
+                    dst = os.path.join(tmp, "file." + name)
+                    sizes = serializers.convert(src, dst, name)
+                    self.assertEqual(sizes[1], os.path.getsize(dst))
+                    with open(dst, "rb") as f:
+                        self.assertEqual(serializers.loads(f.read()), record)
+
+    def test_iterload(self):
+        """Test that iterload yields the records of every format"""
+        records = {"State.{}".format(i): dict(record["State.1"], id=i)
+                   for i in range(100)}
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "file.json")
+            for name in self.available():
+                with open(path, "wb") as f:
+                    f.write(serializers.get_serializer(name).dumps(records))
+                for size in [1, 7, 1 << 20]:
+                    with self.subTest(name=name, size=size):
+                        pairs = serializers.iterload(path, size)
+                        self.assertEqual(dict(pairs), records)
+
+    def test_iterload_json(self):
+        """Test that iterload reads any JSON object, refusing the rest"""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "file.json")
+            for data, pairs in [(' { }\n', []),
+                                ('{"a": 12345, "b" :[1, {"c": "}"}]}',
+                                 [("a", 12345), ("b", [1, {"c": "}"}])])]:
+                with open(path, "w") as f:
+                    f.write(data)
+                self.assertEqual(list(serializers.iterload(path, 2)), pairs)
+            for data in ['', '{"a": 1', '{"a" 1}', '{"a": 1 "b": 2}', '[]']:
+                with open(path, "w") as f:
+                    f.write(data)
+                with self.subTest(data=data):
+                    with self.assertRaises(ValueError):
+                        list(serializers.iterload(path, 2))
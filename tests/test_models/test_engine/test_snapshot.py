@@ -0,0 +1,145 @@
+#!/usr/bin/python3
+"""
+Contains the TestSnapshotDocs and TestSnapshot classes
+"""
+
+import inspect
+from models.engine import snapshot
+import os
+import pep8
+import tempfile
+import unittest
+
+Snapshot = snapshot.Snapshot
+records = {
+    "State.2": {"id": "2", "name": "Nevada", "__class__": "State"},
+    "City.1": {"id": "1", "name": "Reno", "__class__": "City"},
+    "State.1": {"id": "1", "name": "Île-de-France", "__class__": "State"},
+    "User.1": {"id": "1", "email": "a@b.c", "__class__": "User"},
+}
+
+
+class TestSnapshotDocs(unittest.TestCase):
+    """Tests to check the documentation and style of Snapshot class"""
+
+    @classmethod
+    def setUpClass(cls):
+        """Set up for the doc tests"""
+        cls.snapshot_f = inspect.getmembers(Snapshot, inspect.isfunction)
+
+    def test_pep8_conformance_snapshot(self):
+        """Test that models/engine/snapshot.py conforms to PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(["models/engine/snapshot.py",
+                                    "tests/test_models/test_engine/\
+test_snapshot.py"])
+        self.assertEqual(
+            result.total_errors, 0, "Found code style errors (and warnings)."
+        )
+
+    def test_snapshot_module_docstring(self):
+        """Test for the snapshot.py module docstring"""
+        self.assertIsNot(snapshot.__doc__, None,
+                         "snapshot.py needs a docstring")
+        self.assertTrue(len(snapshot.__doc__) >= 1,
+                        "snapshot.py needs a docstring")
+
+    def test_snapshot_class_docstring(self):
+        """Test for the Snapshot class docstring"""
+        self.assertIsNot(Snapshot.__doc__, None,
+                         "Snapshot class needs a docstring")
+
+    def test_snapshot_func_docstrings(self):
+        """Test for the presence of docstrings in Snapshot methods"""
+        for func in self.snapshot_f + [("dumps", snapshot.dumps),
+                                       ("loads", snapshot.loads)]:
+            self.assertIsNot(
+                func[1].__doc__,
+                None,
+                "{:s} method needs a docstring".format(func[0]),
+            )
+
+
+class TestSnapshot(unittest.TestCase):
+    """Test the Snapshot class"""
+
+    def setUp(self):
+        """Writes the records to a snapshot in a temporary directory"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "file.json")
+        with open(self.path, "wb") as f:
+            f.write(snapshot.dumps(records))
+        self.snap = Snapshot(self.path)
+
+    def tearDown(self):
+        """Unmaps the snapshot and removes the temporary directory"""
+        self.snap.close()
+        self.tmp.cleanup()
+
+    def test_loads(self):
+        """Test that loads reads back every record"""
+        with open(self.path, "rb") as f:
+            self.assertEqual(snapshot.loads(f.read()), records)
+
+    def test_get(self):
+        """Test that single records are found by key"""
+        self.assertEqual(len(self.snap), 4)
+        for key, record in records.items():
+            self.assertIn(key, self.snap)
+            self.assertEqual(self.snap.get(key), record)
+        self.assertNotIn("State.3", self.snap)
+        self.assertIsNone(self.snap.get("State.3"))
+        self.assertIsNone(self.snap.raw("A.1"))
+        self.assertIsNone(self.snap.raw("Z.1"))
+
+    def test_prefix(self):
+        """Test that the records of a class are found by prefix"""
+        self.assertEqual(self.snap.count("State."), 2)
+        self.assertEqual(self.snap.count("Place."), 0)
+        self.assertEqual(self.snap.count(), 4)
+        self.assertEqual(dict(self.snap.items("State.")),
+                         {"State.1": records["State.1"],
+                          "State.2": records["State.2"]})
+
+    def test_select(self):
+        """Test that the records of a class are selected by an attribute"""
+        self.assertEqual(list(self.snap.select("State.", "name",
+                                               ["Île-de-France", "Reno"])),
+                         [("State.1", records["State.1"])])
+        self.assertEqual(list(self.snap.select("State.", "id", ["2"])),
+                         [("State.2", records["State.2"])])
+        self.assertEqual(list(self.snap.select("City.", "name", [None])),
+                         [])
+        self.assertEqual(list(self.snap.select("User.", "missing", [None])),
+                         [("User.1", records["User.1"])])
+
+    def test_raw_copy(self):
+        """Test that encoded records are copied as they are"""
+        copy = dict(self.snap.items(raw=True))
+        self.assertEqual(copy["City.1"], self.snap.raw("City.1"))
+        self.assertEqual(snapshot.loads(snapshot.dumps(copy)), records)
+
+    def test_dump(self):
+        """Test that dump streams the same snapshot as dumps"""
+        with open(self.path, "wb") as f:
+            snapshot.dump(sorted(records.items()), f)
+        with open(self.path, "rb") as f:
+            self.assertEqual(f.read(), snapshot.dumps(records))
+
+    def test_empty(self):
+        """Test that a snapshot may hold no records"""
+        with open(self.path, "wb") as f:
+            f.write(snapshot.dumps({}))
+        empty = Snapshot(self.path)
+        self.assertEqual(len(empty), 0)
+        self.assertIsNone(empty.get("State.1"))
+        empty.close()
+
+    def test_not_indexed(self):
+        """Test that other files are refused"""
+        with open(self.path, "w") as f:
+            f.write("{}")
+        with self.assertRaises(ValueError):
+            Snapshot(self.path)
+        with self.assertRaises(FileNotFoundError):
+            Snapshot(self.path + ".missing")
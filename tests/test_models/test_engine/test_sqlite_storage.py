@@ -0,0 +1,455 @@
+#!/usr/bin/python3
+"""
+Contains the TestSQLiteStorageDocs and TestSQLiteStorage classes
+"""
+
+import inspect
+import models
+import os
+from models.engine import sqlite_storage
+from models.city import City
+from models.place import Place
+from models.state import State
+from models.user import User
+import pep8
+from sqlalchemy import event
+import sqlite3
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+SQLiteStorage = sqlite_storage.SQLiteStorage
+
+
+class TestSQLiteStorageDocs(unittest.TestCase):
+    """Tests to check the documentation and style of SQLiteStorage class"""
+
+    @classmethod
+    def setUpClass(cls):
+        """Set up for the doc tests"""
+        cls.sqlite_f = inspect.getmembers(SQLiteStorage, inspect.isfunction)
+
+    def test_pep8_conformance_sqlite_storage(self):
+        """Test that models/engine/sqlite_storage.py conforms to PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(["models/engine/sqlite_storage.py",
+                                    "tests/test_models/test_engine/\
+test_sqlite_storage.py"])
+        self.assertEqual(
+            result.total_errors, 0, "Found code style errors (and warnings)."
+        )
+
+    def test_sqlite_storage_module_docstring(self):
+        """Test for the sqlite_storage.py module docstring"""
+        self.assertIsNot(sqlite_storage.__doc__, None,
+                         "sqlite_storage.py needs a docstring")
+        self.assertTrue(len(sqlite_storage.__doc__) >= 1,
+                        "sqlite_storage.py needs a docstring")
+
+    def test_sqlite_storage_class_docstring(self):
+        """Test for the SQLiteStorage class docstring"""
+        self.assertIsNot(SQLiteStorage.__doc__, None,
+                         "SQLiteStorage class needs a docstring")
+
+    def test_sqlite_func_docstrings(self):
+        """Test for the presence of docstrings in SQLiteStorage methods"""
+        for func in self.sqlite_f:
+            self.assertIsNot(
+                func[1].__doc__,
+                None,
+                "{:s} method needs a docstring".format(func[0]),
+            )
+
+
+@unittest.skipIf(not isinstance(models.storage, SQLiteStorage),
+                 "not testing sqlite storage")
+class TestSQLiteStorage(unittest.TestCase):
+    """Test the SQLiteStorage class"""
+
+    def setUp(self):
+        """Saves a state with a city"""
+        self.storage = models.storage
+        self.state = State(name="California")
+        self.storage.new(self.state)
+        self.storage.save()
+        self.city = City(name="Fremont", state_id=self.state.id)
+        self.storage.new(self.city)
+        self.storage.save()
+
+    def tearDown(self):
+        """Removes the state and its city"""
+        self.storage.delete(self.city)
+        self.storage.delete(self.state)
+        self.storage.save()
+        self.storage.close()
+
+    def test_pragmas(self):
+        """Test that connections run in WAL mode with foreign keys"""
+        engine = self.storage._DBStorage__engine
+        with engine.connect() as conn:
+            mode = conn.exec_driver_sql("PRAGMA journal_mode").scalar()
+            fks = conn.exec_driver_sql("PRAGMA foreign_keys").scalar()
+        self.assertIn(mode, ["wal", "memory"])
+        self.assertEqual(fks, 1)
+
+    def test_get_count(self):
+        """Test that get and count take classes or class names"""
+        self.assertIs(self.storage.get(State, self.state.id), self.state)
+        self.assertIs(self.storage.get("City", self.city.id), self.city)
+        self.assertIsNone(self.storage.get(State, "missing"))
+        self.assertGreaterEqual(self.storage.count("State"), 1)
+        self.assertEqual(self.storage.count(State),
+                         len(self.storage.all(State)))
+
+    def test_count_cached(self):
+        """Test that every class is counted by one query until a change"""
+        statements = []
+
+        def record(conn, cursor, statement, *args):
+            """Records the statements sent to the database"""
+            statements.append(statement)
+        engine = self.storage._DBStorage__engine
+        event.listen(engine, "before_cursor_execute", record)
+        try:
+            self.storage.close()
+            counts = [self.storage.count(name) for name in
+                      ["Amenity", "City", "Place", "Review", "State", "User"]]
+            self.assertEqual(self.storage.count(), sum(counts))
+            self.assertEqual(len(statements), 1)
+            state = State(name="Nevada")
+            self.storage.new(state)
+            self.storage.save()
+            self.assertEqual(self.storage.count(State), counts[4] + 1)
+            self.storage.delete(state)
+            self.storage.save()
+            self.assertEqual(self.storage.count("State"), counts[4])
+        finally:
+            event.remove(engine, "before_cursor_execute", record)
+
+    def test_count_threads(self):
+        """Test that each thread counts in its own session"""
+        with tempfile.TemporaryDirectory() as tmp:
+            env = {"HBNB_SQLITE_DB": os.path.join(tmp, "hbnb.db")}
+            with mock.patch.dict(os.environ, env):
+                storage = SQLiteStorage()
+            storage.reload()
+            storage.new(State(name="California"))
+            storage.save()
+            storage.close()
+            storage.new(State(name="Nevada"))
+            found = []
+            counted = threading.Event()
+            done = threading.Event()
+
+            def count():
+                """Counts the states from another thread, closing its
+                session once this thread counted too"""
+                found.append(storage.count(State))
+                counted.set()
+                done.wait(5)
+                storage.close()
+            thread = threading.Thread(target=count)
+            thread.start()
+            counted.wait(5)
+            try:
+                self.assertEqual(found, [1])
+                self.assertEqual(storage.count(State), 2)
+            finally:
+                done.set()
+                thread.join()
+                storage.close()
+                storage._DBStorage__engine.dispose()
+
+    def test_get_identity_map(self):
+        """Test that get only queries objects not in the session yet"""
+        statements = []
+
+        def record(conn, cursor, statement, *args):
+            """Records the statements sent to the database"""
+            statements.append(statement)
+        engine = self.storage._DBStorage__engine
+        event.listen(engine, "before_cursor_execute", record)
+        try:
+            self.storage.close()
+            state = self.storage.get("State", self.state.id)
+            self.assertEqual(state.id, self.state.id)
+            self.assertIs(self.storage.get(State, self.state.id), state)
+            self.assertEqual(len(statements), 1)
+            self.assertIsNone(self.storage.get("Nothing", self.state.id))
+            self.assertIsNone(self.storage.get(State, None))
+            self.assertEqual(len(statements), 1)
+        finally:
+            event.remove(engine, "before_cursor_execute", record)
+
+    def test_get_many(self):
+        """Test that get_many fetches the objects with one query"""
+        states = [State(name="State {}".format(i)) for i in range(3)]
+        self.storage.new_many(states)
+        self.storage.save()
+        self.storage.close()
+        statements = []
+
+        def record(conn, cursor, statement, *args):
+            """Records the statements sent to the database"""
+            statements.append(statement)
+        engine = self.storage._DBStorage__engine
+        event.listen(engine, "before_cursor_execute", record)
+        try:
+            ids = [states[2].id, "missing", states[0].id, states[2].id]
+            self.assertEqual(
+                [state.id for state in self.storage.get_many("State", ids)],
+                [states[2].id, states[0].id])
+            self.assertEqual(len(statements), 1)
+            self.assertIn(" IN ", statements[0])
+        finally:
+            event.remove(engine, "before_cursor_execute", record)
+        self.assertEqual(self.storage.get_many("Nothing", ids), [])
+        self.storage.delete_many([state.id for state in states], State)
+        self.storage.save()
+        self.assertEqual(self.storage.get_many(State, ids), [])
+
+    def test_expand(self):
+        """Test that relationships are loaded along with their objects"""
+        states = [State(name="State {}".format(i)) for i in range(5)]
+        self.storage.new_many(states)
+        self.storage.save()
+        cities = [City(name="City", state_id=state.id) for state in states]
+        self.storage.new_many(cities)
+        self.storage.save()
+        self.storage.close()
+        statements = []
+
+        def record(conn, cursor, statement, *args):
+            """Records the statements sent to the database"""
+            statements.append(statement)
+        engine = self.storage._DBStorage__engine
+        event.listen(engine, "before_cursor_execute", record)
+        try:
+            objs = self.storage.all(State, expand="cities").values()
+            self.assertTrue(all(len(state.cities) == 1 for state in objs))
+            self.assertEqual(len(statements), 2)
+            self.storage.close()
+            objs = self.storage.filter(State, name__in=["State 1"],
+                                       expand=["cities.places"])
+            self.assertEqual(objs[0].cities[0].places, [])
+            self.assertEqual(len(statements), 5)
+            self.storage.close()
+            state = self.storage.get("State", self.state.id, "cities")
+            self.assertEqual(state.cities[0].id, self.city.id)
+            self.assertEqual(len(statements), 6)
+        finally:
+            event.remove(engine, "before_cursor_execute", record)
+        with self.assertRaises(ValueError):
+            self.storage.filter(State, expand="name")
+        with self.assertRaises(ValueError):
+            self.storage.all("City", expand="cities")
+        self.storage.delete_many([city.id for city in cities], City)
+        self.storage.delete_many([state.id for state in states], State)
+        self.storage.save()
+        self.storage.close()
+
+    def test_relationship(self):
+        """Test that a state lists its cities"""
+        self.storage.close()
+        state = self.storage.get(State, self.state.id)
+        self.assertEqual([city.id for city in state.cities], [self.city.id])
+
+    def test_threads(self):
+        """Test that each thread gets its own session"""
+        found = []
+
+        def read():
+            """Reads the state from another thread"""
+            found.append(self.storage.get(State, self.state.id).name)
+            self.storage.close()
+        thread = threading.Thread(target=read)
+        thread.start()
+        thread.join()
+        self.assertEqual(found, ["California"])
+
+    def test_delete(self):
+        """Test that a deleted user is gone once committed"""
+        user = User(email="a@b.c", password="pwd")
+        self.storage.new(user)
+        self.storage.save()
+        self.storage.delete(user)
+        self.storage.save()
+        self.storage.close()
+        self.assertIsNone(self.storage.get(User, user.id))
+
+    def test_filter(self):
+        """Test that criteria, order and limit are run by the database"""
+        user = User(email="a@b.c", password="pwd")
+        self.storage.new(user)
+        self.storage.save()
+        places = [Place(name=name, city_id=self.city.id, user_id=user.id,
+                        number_rooms=rooms)
+                  for name, rooms in [("Loft", 2), ("Flat", 1), ("Villa", 5)]]
+        for place in places:
+            self.storage.new(place)
+        self.storage.save()
+        try:
+            found = self.storage.filter(Place, city_id=self.city.id,
+                                        order_by="name")
+            self.assertEqual([p.name for p in found],
+                             ["Flat", "Loft", "Villa"])
+            found = self.storage.filter("Place", number_rooms__gte=2,
+                                        order_by="-number_rooms", limit=1)
+            self.assertEqual([p.name for p in found], ["Villa"])
+            found = self.storage.filter(Place, name__in=["Flat", "Loft"],
+                                        number_rooms__lt=2)
+            self.assertEqual([p.name for p in found], ["Flat"])
+            with self.assertRaises(ValueError):
+                self.storage.filter(Place, name__like="L%")
+        finally:
+            for obj in places + [user]:
+                self.storage.delete(obj)
+            self.storage.save()
+
+    def test_bulk(self):
+        """Test new_many, import_records and delete_many"""
+        users = [User(email="{}@b.c".format(i), password="pwd")
+                 for i in range(3)]
+        self.storage.new_many(users)
+        self.storage.save()
+        count = self.storage.import_records(
+            [{"__class__": "Place", "name": "Place {}".format(i),
+              "city_id": self.city.id, "user_id": users[0].id}
+             for i in range(25)] + [{"name": "Nevada"}],
+            cls="State", batch=10)
+        self.assertEqual(count, 26)
+        self.storage.close()
+        places = self.storage.filter(Place, city_id=self.city.id)
+        self.assertEqual(len(places), 25)
+        self.assertEqual({place.number_rooms for place in places}, {0})
+        self.storage.delete_many([place.id for place in places], Place)
+        self.storage.delete_many(
+            users + self.storage.filter(State, name="Nevada"))
+        self.storage.save()
+        self.assertEqual(self.storage.filter(Place, city_id=self.city.id), [])
+        self.assertEqual(self.storage.filter(State, name="Nevada"), [])
+        self.assertIsNone(self.storage.get(User, users[1].id))
+
+    def test_import_unknown_class(self):
+        """Test that records of no known class are refused"""
+        before = self.storage.count(State)
+        with self.assertRaises(ValueError):
+            self.storage.import_records([{"name": "CA"}], cls="Country")
+        for bad in [{"name": "CA"}, {"__class__": "Country"}]:
+            with self.subTest(bad=bad):
+                with self.assertRaises(ValueError):
+                    self.storage.import_records(
+                        [{"__class__": "State", "name": "Nevada"}, bad])
+                self.assertEqual(self.storage.count(State), before)
+
+    def test_iter_all_page(self):
+        """Test that objects are streamed, and paged by id"""
+        states = [State(name="State {}".format(i)) for i in range(4)]
+        self.storage.new_many(states)
+        self.storage.save()
+        self.storage.close()
+        ids = sorted(state.id for state in states + [self.state])
+        self.assertCountEqual(
+            [state.id for state in self.storage.iter_all(State, 2)], ids)
+        self.assertIn(self.city.id, [obj.id for obj in
+                                     self.storage.iter_all(batch_size=2)])
+        self.assertCountEqual([state.id for state in self.storage.iter_all(
+            "".join(["Sta", "te"]))], ids)
+        objs, token = self.storage.page("State", 2)
+        self.assertEqual([state.id for state in objs], ids[:2])
+        self.assertEqual(token, ids[1])
+        objs, token = self.storage.page(State, 2, token)
+        self.assertEqual([state.id for state in objs], ids[2:4])
+        objs, token = self.storage.page(State, 2, token)
+        self.assertEqual([state.id for state in objs], ids[4:])
+        self.assertIsNone(token)
+        with self.assertRaises(ValueError):
+            self.storage.page(State, 0)
+        self.storage.delete_many([state.id for state in states], State)
+        self.storage.save()
+
+    def test_pool_stats(self):
+        """Test that the connections of the pool are counted"""
+        self.storage.close()
+        before = self.storage.pool_stats()
+        self.storage.count(State)
+        self.storage.close()
+        stats = self.storage.pool_stats()
+        self.assertEqual(stats["checkouts"], before["checkouts"] + 1)
+        self.assertEqual(stats["checked_out"], 0)
+        self.assertEqual(stats["wait"]["count"], before["wait"]["count"] + 1)
+
+    def test_pool_options(self):
+        """Test that the pool of a database file is set up by HBNB_MYSQL_*"""
+        with tempfile.TemporaryDirectory() as tmp:
+            env = {"HBNB_SQLITE_DB": os.path.join(tmp, "hbnb.db"),
+                   "HBNB_MYSQL_POOL_SIZE": "2",
+                   "HBNB_MYSQL_MAX_OVERFLOW": "1",
+                   "HBNB_MYSQL_POOL_TIMEOUT": "0.5",
+                   "HBNB_MYSQL_POOL_RECYCLE": "60",
+                   "HBNB_MYSQL_POOL_PRE_PING": "1"}
+            with mock.patch.dict(os.environ, env):
+                storage = SQLiteStorage()
+            pool = storage._DBStorage__engine.pool
+            self.assertEqual(pool.size(), 2)
+            self.assertEqual(pool._max_overflow, 1)
+            self.assertEqual(pool._timeout, 0.5)
+            self.assertEqual(pool._recycle, 60)
+            self.assertTrue(pool._pre_ping)
+            storage.reload()
+            self.assertEqual(storage.count(State), 0)
+            storage.close()
+            stats = storage.pool_stats()
+            self.assertEqual(stats["size"], 2)
+            self.assertEqual(stats["checked_in"], 1)
+            self.assertEqual(stats["connect"]["count"], 1)
+            storage._DBStorage__engine.dispose()
+
+    def test_replicas(self):
+        """Test that reads go to a replica until the session writes"""
+        with tempfile.TemporaryDirectory() as tmp:
+            env = {"HBNB_SQLITE_DB": os.path.join(tmp, "hbnb.db"),
+                   "HBNB_SQLITE_REPLICAS": os.path.join(tmp, "copy.db"),
+                   "HBNB_MYSQL_REPLICA_CHECK": "0"}
+            lag = [0.0]
+            with mock.patch.dict(os.environ, env), \
+                    mock.patch.object(SQLiteStorage, "replica_lag",
+                                      side_effect=lambda engine: lag[0]):
+                storage = SQLiteStorage()
+            storage.reload()
+            storage.new(State(name="Old"))
+            storage.save()
+            storage.close()
+            primary = sqlite3.connect(env["HBNB_SQLITE_DB"])
+            copy = sqlite3.connect(env["HBNB_SQLITE_REPLICAS"])
+            primary.backup(copy)
+            primary.close()
+            copy.close()
+            state = State(name="New")
+            storage.new(state)
+            storage.save()
+            storage.close()
+            self.assertIsNone(storage.get(State, state.id))
+            self.assertEqual(storage.count(State), 1)
+            storage.close()
+            storage.new(State(name="Mine"))
+            storage.save()
+            self.assertEqual(storage.count(State), 3)
+            self.assertIsNotNone(storage.get(State, state.id))
+            storage.close()
+            lag[0] = 60.0
+            self.assertIsNotNone(storage.get(State, state.id))
+            stats = storage.pool_stats()["replicas"]
+            self.assertEqual(len(stats), 1)
+            self.assertEqual(stats[0]["lag"], 60.0)
+            self.assertFalse(stats[0]["healthy"])
+            storage.close()
+            lag[0] = 0.0
+            stats = storage.pool_stats()["replicas"][0]
+            self.assertTrue(stats["healthy"])
+            # a single session read from it
+            self.assertEqual(stats["pool"]["checkouts"], 1)
+            for engine in storage._DBStorage__replicas.engines + \
+                    [storage._DBStorage__engine]:
+                engine.dispose()